@@ -1,12 +1,20 @@
+import numpy as np
 import pandas as pd
 from scipy import stats
+from scipy.interpolate import CubicSpline
+from statsmodels.stats.multitest import multipletests
+
+# Studentized range values at which the Tukey HSD survival function is evaluated exactly and then
+# interpolated (log scale); denser near 0, exact evaluation beyond the last point
+tukey_grid = np.linspace(0, 1, 81) ** 2 * 25
+
 
 def perform_anova_on_excel(excel_file, columns_to_analyze):
     """
     Perform one-way ANOVA on specified columns in an Excel file.
 
     Args:
-        excel_file (str): Path to the Excel file (.xlsx or .xls).
+        excel_file (str or pd.DataFrame): Path to the Excel file (.xlsx or .xls), or the already loaded sheet.
         columns_to_analyze (list of int): List of column indices to analyze (starting from 1).
 
     Returns:
@@ -14,8 +22,8 @@ def perform_anova_on_excel(excel_file, columns_to_analyze):
                Returns None, None if an error occurs.
     """
     try:
-        # 1. Read Excel file
-        df = pd.read_excel(excel_file)
+        # 1. Read Excel file (unless it was already loaded)
+        df = excel_file if isinstance(excel_file, pd.DataFrame) else pd.read_excel(excel_file)
 
         # 2. Extract data columns to be analyzed
         data_columns = []
@@ -44,27 +52,211 @@ def perform_anova_on_excel(excel_file, columns_to_analyze):
         print(f"An unknown error occurred: {e}")
         return None, None
 
+
+def group_summaries(df, groups, by=None):
+    """
+    Per-test, per-group observation counts, means and sums of squared deviations.
+
+    Args:
+        df (pd.DataFrame): Loaded sheet.
+        groups (dict): Group name -> list of column indices (starting from 1) holding that group's values.
+        by (str, optional): Column with a test label (e.g. an mfuzz cluster). Without it every row is a test
+                            and its replicate columns are the observations; with it all rows sharing a label
+                            form one test.
+
+    Returns:
+        tuple: (tests, n, mean, m2) where tests labels the tests and n, mean, m2 are test x group arrays.
+    """
+    if by is None:
+        tests = df.index
+        codes = np.arange(len(df))
+    else:
+        codes, tests = pd.factorize(df[by])
+        keep = codes >= 0  # Rows without a label are not part of any test
+        df, codes = df[keep], codes[keep]
+    n_tests = len(tests)
+
+    n, mean, m2 = (np.zeros((n_tests, len(groups))) for _ in range(3))
+    for g, columns in enumerate(groups.values()):
+        values = df.iloc[:, [c - 1 for c in columns]].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        n[:, g] = np.bincount(codes, weights=valid.sum(axis=1), minlength=n_tests)
+        sums = np.bincount(codes, weights=np.where(valid, values, 0).sum(axis=1), minlength=n_tests)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean[:, g] = sums / n[:, g]
+        # Second pass around the group means, which avoids the cancellation of sum(x^2) - sum(x)^2 / n
+        deviations = np.where(valid, values - mean[codes, g][:, None], 0)
+        m2[:, g] = np.bincount(codes, weights=(deviations ** 2).sum(axis=1), minlength=n_tests)
+    return tests, n, mean, m2
+
+
+def anova_from_summaries(n, mean, m2):
+    """
+    One-way ANOVA of many tests at once from group summaries (same results as stats.f_oneway per test).
+    Empty groups are left out of a test; tests with fewer than two groups or no residual degrees of freedom give NaN.
+
+    Returns:
+        tuple: (F, p, df_between, df_within, ms_within) arrays.
+    """
+    present = n > 0
+    k = present.sum(axis=1)
+    total = n.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grand_mean = np.where(present, n * np.nan_to_num(mean), 0).sum(axis=1) / total
+        ss_between = np.where(present, n * (np.nan_to_num(mean) - grand_mean[:, None]) ** 2, 0).sum(axis=1)
+        ss_within = m2.sum(axis=1)
+        df_between, df_within = k - 1, total - k
+        ms_within = ss_within / df_within
+        F = (ss_between / df_between) / ms_within
+    F = np.where(ss_within == 0, np.where(ss_between > 0, np.inf, np.nan), F)
+    F = np.where((k < 2) | (df_within < 1), np.nan, F)
+    p = stats.f.sf(F, df_between, df_within)
+    return F, p, df_between, df_within, ms_within
+
+
+def _studentized_range_sf(q, k, df):
+    """
+    Survival function of the studentized range, interpolated on tukey_grid (one spline per (k, df) pair).
+    """
+    q, k, df = np.broadcast_arrays(np.asarray(q, dtype=float), k, df)
+    p = np.full(q.shape, np.nan)
+    for k_value, df_value in set(zip(k.ravel().tolist(), df.ravel().tolist())):
+        selected = (k == k_value) & (df == df_value) & np.isfinite(q)
+        grid_sf = stats.studentized_range.sf(tukey_grid, k_value, df_value)
+        grid = tukey_grid[grid_sf > 0]  # The tail can underflow to 0 for large df
+        spline = CubicSpline(grid, np.log(grid_sf[grid_sf > 0]))
+        inside = selected & (q <= grid[-1])
+        p[inside] = np.minimum(np.exp(spline(q[inside])), 1.0)
+        beyond = selected & (q > grid[-1])
+        if beyond.any():
+            p[beyond] = stats.studentized_range.sf(q[beyond], k_value, df_value)
+    p[np.isposinf(q)] = 0.0
+    return p
+
+
+def tukey_hsd_from_summaries(tests, group_names, n, mean, ms_within, df_within, alpha=0.05):
+    """
+    Tukey HSD (Tukey-Kramer for unequal group sizes) of every group pair in every given test, vectorized.
+
+    Returns:
+        pd.DataFrame: One row per (test, group pair) with 'Test', 'Group 1', 'Group 2', 'Mean Difference',
+                      'Lower CI', 'Upper CI', 'P-value' and 'Reject' (P-value < alpha).
+    """
+    first, second = np.triu_indices(len(group_names), k=1)
+    k = (n > 0).sum(axis=1)
+    difference = mean[:, first] - mean[:, second]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        standard_error = np.sqrt(ms_within[:, None] / 2 * (1 / n[:, first] + 1 / n[:, second]))
+        q = np.abs(difference) / standard_error
+    q = np.where((standard_error == 0) & (difference == 0), 0, q)
+    k_pairs, df_pairs = np.broadcast_to(k[:, None], q.shape), np.broadcast_to(df_within[:, None], q.shape)
+    p = _studentized_range_sf(q, k_pairs, df_pairs)
+
+    critical = np.full(len(k), np.nan)
+    for k_value, df_value in set(zip(k.tolist(), df_within.tolist())):
+        critical[(k == k_value) & (df_within == df_value)] = stats.studentized_range.ppf(1 - alpha, k_value, df_value)
+    margin = critical[:, None] * standard_error
+
+    group_names = np.asarray(list(group_names), dtype=object)
+    results = pd.DataFrame({
+        'Test': np.repeat(np.asarray(tests, dtype=object), len(first)),
+        'Group 1': np.tile(group_names[first], len(k)),
+        'Group 2': np.tile(group_names[second], len(k)),
+        'Mean Difference': difference.ravel(),
+        'Lower CI': (difference - margin).ravel(),
+        'Upper CI': (difference + margin).ravel(),
+        'P-value': p.ravel(),
+    })
+    results['Reject'] = results['P-value'] < alpha
+    # Pairs with an empty group are not compared
+    return results[np.isfinite(difference.ravel())].reset_index(drop=True)
+
+
+def batch_anova(df, groups, by=None, alpha=0.05, fdr_method='fdr_bh'):
+    """
+    One-way ANOVA across groups for every row (e.g. gene) or every label of `by` (e.g. mfuzz cluster),
+    with FDR correction and Tukey HSD post-hoc comparisons of the significant tests.
+
+    Args:
+        df (pd.DataFrame): Loaded sheet (read once, e.g. with pd.read_excel).
+        groups (dict): Group name -> list of column indices (starting from 1) holding that group's values.
+        by (str, optional): Column with a test label; see group_summaries.
+        alpha (float): Significance level of the FDR-adjusted p-values and of the Tukey HSD.
+        fdr_method (str): Multiple testing correction passed to statsmodels' multipletests.
+
+    Returns:
+        tuple: (anova_df, tukey_df). anova_df has one row per test with 'Test', 'F Statistic', 'P-value',
+               'FDR', 'df Between', 'df Within' and one mean column per group; tukey_df holds the pairwise
+               comparisons of the tests with FDR < alpha.
+
+    Raises:
+        ValueError: For per-row tests (by=None) where every group is a single column, which leaves no
+                    within-group degrees of freedom.
+    """
+    if by is None and all(len(columns) < 2 for columns in groups.values()):
+        raise ValueError("Per-row ANOVA needs replicate columns per group (e.g. {'Close': [2, 3, 4], ...}); "
+                         "with one column per group, set `by` to a cluster column instead.")
+    tests, n, mean, m2 = group_summaries(df, groups, by)
+    F, p, df_between, df_within, ms_within = anova_from_summaries(n, mean, m2)
+
+    fdr = np.full(len(p), np.nan)
+    tested = ~np.isnan(p)
+    if tested.any():
+        fdr[tested] = multipletests(p[tested], method=fdr_method)[1]
+
+    anova_df = pd.DataFrame({'Test': tests, 'F Statistic': F, 'P-value': p, 'FDR': fdr,
+                             'df Between': df_between, 'df Within': df_within})
+    for g, name in enumerate(groups):
+        anova_df[f'Mean {name}'] = mean[:, g]
+
+    significant = np.nonzero(fdr < alpha)[0]
+    tukey_df = tukey_hsd_from_summaries(np.asarray(tests)[significant], list(groups), n[significant], mean[significant],
+                                        ms_within[significant], df_within[significant], alpha)
+    return anova_df, tukey_df
+
+
 if __name__ == "__main__":
     excel_file_path = "mfuzz_anova.xlsx"  # Replace with your Excel file path
     columns_to_analyze = [1, 2, 3, 4, 5]  # Columns to be analyzed, here are columns 1-5
 
-    f_stat, p_val = perform_anova_on_excel(excel_file_path, columns_to_analyze)
-
-    if f_stat is not None and p_val is not None:
-        print("One-way ANOVA results:")
-        print(f"F Statistic: {f_stat:.4f}") # Keep 4 decimal places
-        print(f"P-value: {p_val:.4f}")   # Keep 4 decimal places
-
-        alpha = 0.05  # Common significance level
-        if p_val < alpha:
-            print(f"P-value ({p_val:.4f}) is less than the significance level ({alpha}), reject the null hypothesis.")
-            print("Conclusion: There is a significant difference in the means of gene expression levels among different co-culture distance groups.")
-            print("Suggestion: If you need to further understand which groups have specific differences, please perform post-hoc tests (e.g., Tukey's HSD).")
-        else:
-            print(f"P-value ({p_val:.4f}) is greater than or equal to the significance level ({alpha}), fail to reject the null hypothesis.")
-            print("Conclusion: There is not enough evidence to show a significant difference in the means of gene expression levels among different co-culture distance groups.")
-            print("Note: This does not mean there is no difference between groups, but the current data cannot provide sufficient statistical evidence.")
-
-        print("\nPlease note: ANOVA has prerequisite assumptions (normality and homogeneity of variance).")
-        print("For the reliability of the results, please ensure to check if your data meets these assumptions.")
-        print("If not met, data transformation or non-parametric tests may need to be considered.")
+    # Batch mode: one ANOVA per row (gene) or per cluster, with FDR correction and Tukey HSD
+    batch_mode = False
+    batch_groups = None   # Group name -> replicate column indices, e.g. {"Close": [2, 3, 4], "Far": [5, 6, 7]};
+                          # None (only together with batch_by) uses every column of columns_to_analyze as one group
+    batch_by = None       # Column with the cluster label (e.g. "Cluster" from fuzzy_cmeans.py): one ANOVA per cluster instead of per row
+    batch_alpha = 0.05
+
+    # Read the workbook once (a CSV such as fuzzy_cmeans_clusters.csv from fuzzy_cmeans.py also works)
+    df = pd.read_csv(excel_file_path) if excel_file_path.endswith(".csv") else pd.read_excel(excel_file_path)
+
+    if batch_mode:
+        if batch_groups is None and batch_by is None:
+            raise ValueError("Batch mode needs batch_groups (replicate columns per group) for one ANOVA per row, "
+                             "or batch_by (cluster column) for one ANOVA per cluster.")
+        groups = batch_groups or {df.columns[c - 1]: [c] for c in columns_to_analyze if c <= len(df.columns)}
+        anova_df, tukey_df = batch_anova(df, groups, by=batch_by, alpha=batch_alpha)
+        anova_df.to_csv("ANOVA_batch_results.csv", index=False)
+        tukey_df.to_csv("ANOVA_batch_TukeyHSD.csv", index=False)
+        print(f"{len(anova_df)} tests, {int((anova_df['FDR'] < batch_alpha).sum())} significant at FDR < {batch_alpha}.")
+        print("Results saved to 'ANOVA_batch_results.csv' and 'ANOVA_batch_TukeyHSD.csv'.")
+    else:
+        f_stat, p_val = perform_anova_on_excel(df, columns_to_analyze)
+
+        if f_stat is not None and p_val is not None:
+            print("One-way ANOVA results:")
+            print(f"F Statistic: {f_stat:.4f}") # Keep 4 decimal places
+            print(f"P-value: {p_val:.4f}")   # Keep 4 decimal places
+
+            alpha = 0.05  # Common significance level
+            if p_val < alpha:
+                print(f"P-value ({p_val:.4f}) is less than the significance level ({alpha}), reject the null hypothesis.")
+                print("Conclusion: There is a significant difference in the means of gene expression levels among different co-culture distance groups.")
+                print("Suggestion: If you need to further understand which groups have specific differences, please perform post-hoc tests (e.g., Tukey's HSD).")
+            else:
+                print(f"P-value ({p_val:.4f}) is greater than or equal to the significance level ({alpha}), fail to reject the null hypothesis.")
+                print("Conclusion: There is not enough evidence to show a significant difference in the means of gene expression levels among different co-culture distance groups.")
+                print("Note: This does not mean there is no difference between groups, but the current data cannot provide sufficient statistical evidence.")
+
+            print("\nPlease note: ANOVA has prerequisite assumptions (normality and homogeneity of variance).")
+            print("For the reliability of the results, please ensure to check if your data meets these assumptions.")
+            print("If not met, data transformation or non-parametric tests may need to be considered.")
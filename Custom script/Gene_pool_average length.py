@@ -1,31 +1,18 @@
-import pandas as pd
+from presence_store import first_strain_column, open_presence_store
+from gene_pool_engine import cumulative_threshold_table, gene_pool_average_length
 
-# Read CSV file
+# Read CSV file through its presence store (built on the first run, rebuilt only when the file content changes)
 file_path = 'All_HGT_present_absence.csv'
-data = pd.read_csv(file_path)
+first_strain_col_index = first_strain_column(file_path)  # Roary layout: strain columns follow 'Avg group size nuc'
+store = open_presence_store(file_path, first_strain_col_index, metadata_columns=['No. isolates', 'COG', 'Avg group size nuc'])
+data = store.metadata_frame()
 
-# Initialize dictionary for statistical results
-cog_functions = 'J.K.L.C.E.F.G.H.I.P.Q.D.M.N.O.T.U.V.S'.split('.')
-cog_avg_nuc = {func: {i: 0 for i in range(1, 307)} for func in cog_functions}
-overall_avg_nuc = {i: 0 for i in range(1, 307)}
+# Calculate the average 'Avg group size nuc' of genes containing specified functions in COG for each 'No. isolates' threshold
+# (thresholds run from 1 to the observed maximum of 'No. isolates'; COG categories come from the COG index kept in the store)
+table = cumulative_threshold_table(data, store.cog_index('COG'))
+output_df = gene_pool_average_length(table)
 
-# Iterate through data to calculate the average 'Avg group size nuc' when 'No. isolates' column containing specified functions in COG is greater than or equal to a specified value
-for i in range(1, 307):
-    filtered_data = data[data['No. isolates'] >= i]
-    overall_avg_nuc[i] = filtered_data['Avg group size nuc'].mean()
-    for func in cog_functions:
-        cog_filtered_data = filtered_data[filtered_data['COG'].str.contains(func, na=False)]
-        if not cog_filtered_data.empty:
-            cog_avg_nuc[func][i] = cog_filtered_data['Avg group size nuc'].mean()
-
-# Prepare output data
-output_data = {'No. isolates': list(range(1, 307))}
-for func in cog_functions:
-    output_data[f'{func}_Avg_Nuc'] = [cog_avg_nuc[func][i] for i in range(1, 307)]
-output_data['Overall_Avg_Nuc'] = [overall_avg_nuc[i] for i in range(1, 307)]
-
-# Create DataFrame and save to CSV file
-output_df = pd.DataFrame(output_data)
+# Save to CSV file
 output_file_path = 'HGT_Average_Length.csv'
 output_df.to_csv(output_file_path, index=False)
 print(f'Results saved to {output_file_path}')
@@ -1,33 +1,18 @@
-import pandas as pd
+from presence_store import first_strain_column, open_presence_store
+from gene_pool_engine import cumulative_threshold_table, gene_pool_counts
 
-# Read CSV file
+# Read CSV file through its presence store (built on the first run, rebuilt only when the file content changes)
 file_path = 'All_HGT_present_absence.csv'
-data = pd.read_csv(file_path)
+first_strain_col_index = first_strain_column(file_path)  # Roary layout: strain columns follow 'Avg group size nuc'
+store = open_presence_store(file_path, first_strain_col_index, metadata_columns=['No. isolates', 'COG', 'Avg group size nuc'])
+data = store.metadata_frame()
 
-# Initialize dictionary for statistical results
-cog_functions = 'J.K.L.C.E.F.G.H.I.P.Q.D.M.N.O.T.U.V.S'.split('.')
-cog_counts = {func: {i: 0 for i in range(1, 307)} for func in cog_functions}
-total_counts = {i: 0 for i in range(1, 307)}
+# Count the occurrences of specified functions in the COG column for each 'No. isolates' threshold
+# (thresholds run from 1 to the observed maximum of 'No. isolates'; COG categories come from the COG index kept in the store)
+table = cumulative_threshold_table(data, store.cog_index('COG'))
+output_df = gene_pool_counts(table)
 
-# Iterate through data to count the occurrences of specified functions in the COG column for each 'No. isolates' value
-for index, row in data.iterrows():
-    no_isolates = row['No. isolates']
-    cog_value = str(row['COG'])  # Convert the COG column value to a string
-    for i in range(1, 307):
-        if no_isolates >= i:
-            total_counts[i] += 1  # Count the total number of entries for each 'No. isolates' value
-            for func in cog_functions:
-                if func in cog_value:
-                    cog_counts[func][i] += 1
-
-# Prepare output data
-output_data = {'No. isolates': list(range(1, 307))}
-for func in cog_functions:
-    output_data[f'{func}_Count'] = [cog_counts[func][i] for i in range(1, 307)]
-output_data['Total_Count'] = [total_counts[i] for i in range(1, 307)]
-
-# Create DataFrame and save to CSV file
-output_df = pd.DataFrame(output_data)
+# Save to CSV file
 output_file_path = 'HGT_Functional_Gene_Counts.csv'
 output_df.to_csv(output_file_path, index=False)
 print(f'Results saved to {output_file_path}')
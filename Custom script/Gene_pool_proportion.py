@@ -1,38 +1,18 @@
-import pandas as pd
+from presence_store import first_strain_column, open_presence_store
+from gene_pool_engine import cumulative_threshold_table, gene_pool_proportion
 
-# Read CSV file
+# Read CSV file through its presence store (built on the first run, rebuilt only when the file content changes)
 file_path = 'All_HGT_present_absence.csv'
-data = pd.read_csv(file_path)
+first_strain_col_index = first_strain_column(file_path)  # Roary layout: strain columns follow 'Avg group size nuc'
+store = open_presence_store(file_path, first_strain_col_index, metadata_columns=['No. isolates', 'COG', 'Avg group size nuc'])
+data = store.metadata_frame()
 
-# COG functional gene cluster classification
-cog_functions = 'J.K.L.C.E.F.G.H.I.P.Q.D.M.N.O.T.U.V.S'.split('.')
-cog_functions.append('Total')
+# Calculate the proportion of each COG functional gene cluster classification for each 'No. isolates' threshold
+# (thresholds run from 1 to the observed maximum of 'No. isolates'; COG categories come from the COG index kept in the store)
+table = cumulative_threshold_table(data, store.cog_index('COG'))
+output_df = gene_pool_proportion(table)
 
-# Initialize result dictionary
-cog_ratios = {func: {i: 0 for i in range(1, 307)} for func in cog_functions}
-
-# Iterate through each No. isolates value
-for i in range(1, 307):
-    filtered_data = data[data['No. isolates'] >= i]
-    total_genes = len(filtered_data)
-
-    for func in cog_functions:
-        if func == 'Total':
-            cog_ratios[func][i] = total_genes
-        else:
-            cog_filtered_data = filtered_data[filtered_data['COG'].str.contains(func, na=False)]
-            if total_genes > 0:
-                cog_ratios[func][i] = len(cog_filtered_data) / total_genes
-            else:
-                cog_ratios[func][i] = 0
-
-# Prepare output data
-output_data = {'No. isolates': list(range(1, 307))}
-for func in cog_functions:
-    output_data[f'{func}_Ratio'] = [cog_ratios[func][i] for i in range(1, 307)]
-
-# Create DataFrame and save to CSV file
-output_df = pd.DataFrame(output_data)
+# Save to CSV file
 output_file_path = 'HGT_Functional_Gene_Ratio.csv'
 output_df.to_csv(output_file_path, index=False)
 print(f'Results saved to {output_file_path}')
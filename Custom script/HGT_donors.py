@@ -1,8 +1,8 @@
-from urllib.parse import quote_plus
 from Bio import Entrez
 import os
 import pandas as pd
-import time
+from donor_cache import DonorCache
+from ncbi_fetcher import EntrezFetcher, eutils_base_url
 
 # --- Configuration ---
 # Set your email address (required by NCBI)
@@ -11,10 +11,22 @@ Entrez.email = 'harukaru1337@gmail.com' # Please replace with your actual email
 # Set your NCBI API key (optional, but recommended)
 Entrez.api_key = "" # Optional, use after registering with NCBI to increase request rate limit
 
+# --- Request Settings ---
+# Requests from all threads share one rate limit: 3 requests/second without an API key, 10 with one
+base_url = eutils_base_url # E-utilities base URL (can point to a local stand-in server for testing)
+n_workers = 8              # Number of concurrent request threads
+efetch_batch_size = 200    # Number of sequences downloaded per epost/efetch call
+max_retries = 5            # Retries (with exponential backoff) for network errors and HTTP 429/5xx
+
 # --- File and Folder Path Settings ---
 input_csv = r"id_16s.csv"  # Input CSV file containing IDs
 output_csv = r"id_16s_result.csv" # Output CSV file for results
 output_folder = r"donor_16s" # Folder to save downloaded sequences
+cache_db = r"donor_16s_cache.sqlite" # Local cache of resolved lookups (reruns skip IDs already resolved)
+
+# --- Cache Settings ---
+retry_failed = False  # True: query NCBI again for IDs cached as uid_not_found / fasta_download_failed / error
+rebuild_only = False  # True: rebuild the results CSV (and missing FASTA files) from the cache without any network access
 
 # --- Script Execution ---
 # Create the output folder if it doesn't exist
@@ -38,11 +50,53 @@ except Exception as e:
     exit()
 
 
-# Initialize the results list
-results = []
+def fasta_filename(species_id):
+    """
+    Path of the FASTA file of a species: '<output_folder>/<species>_16s.fasta'.
+    """
+    # Basic sanitization: replace spaces with underscores, remove potentially problematic chars
+    safe_species_id = species_id.replace(" ", "_").replace("/", "-").replace("\\", "-")
+    return os.path.join(output_folder, f"{safe_species_id}_16s.fasta")
+
+
+def save_fasta(species_id, fasta_data):
+    """
+    Saves a FASTA record of a species to the output folder.
+    """
+    with open(fasta_filename(species_id), "w", encoding='utf-8') as fasta_file:
+        fasta_file.write(fasta_data)
+
+
+cache = DonorCache(cache_db)
+valid_ids = list(dict.fromkeys(species_id for species_id in ids if isinstance(species_id, str)))
 
-# Loop through each ID
-print("Starting to process IDs and download 16S sequences...")
+if not rebuild_only:
+    fetcher = EntrezFetcher(Entrez.email, Entrez.api_key, base_url=base_url, max_retries=max_retries, n_workers=n_workers)
+
+    # Look up the top 16S hit of every ID not resolved yet, concurrently; each result is checkpointed in the cache
+    # Search term looks for the organism and "16S" in the title
+    to_search = cache.pending_searches(valid_ids, retry_failed)
+    print(f"Searching nuccore for {len(to_search)} IDs ({len(valid_ids) - len(to_search)} already resolved in {cache_db})...")
+    fetcher.search_all(to_search, on_result=cache.record_search)
+
+    # Download the FASTA sequences of all found UIDs in batches (one epost + one efetch per batch)
+    to_download = cache.pending_downloads(valid_ids)
+    species_of_uid = {}
+    for species_id, uid in to_download.items():
+        species_of_uid.setdefault(uid, []).append(species_id)
+
+    def record_batch(batch, records, error):
+        for uid in batch:
+            for species_id in species_of_uid[uid]:
+                if uid in records and error is None:
+                    save_fasta(species_id, records[uid])
+                cache.record_download(species_id, uid, records.get(uid), error)
+
+    print(f"Fetching FASTA sequences for {len(species_of_uid)} UIDs...")
+    fetcher.fetch_all(list(species_of_uid), batch_size=efetch_batch_size, on_batch=record_batch)
+
+# Build the results (in input order) from the cache
+results = []
 for i, species_id in enumerate(ids):
     # Ensure species_id is a string, skip if it's not (e.g., if NaN slipped through)
     if not isinstance(species_id, str):
@@ -50,67 +104,24 @@ for i, species_id in enumerate(ids):
         results.append({"id": species_id, "16s_file": "invalid_id"})
         continue
 
-    print(f"\nProcessing {i+1}/{len(ids)}: {species_id}")
-    status = "not_found" # Default status
-
-    try:
-        # URL-encode the species ID/name for the query
-        encoded_species = quote_plus(species_id)
-
-        # Use Entrez esearch to find 16S sequences in the nuccore database
-        # Search term looks for the organism and "16S" in the title
-        search_term = f"{encoded_species}[Organism] AND 16S[Title]"
-        print(f"Searching nuccore with term: {search_term}")
-        handle = Entrez.esearch(db="nuccore", term=search_term, retmax=1) # Get only the top hit
-        record = Entrez.read(handle)
-        handle.close()
-
-        # Get the UID (Unique Identifier) from the search results
-        uid = record['IdList'][0] if record['IdList'] else None
-
-        if uid:
-            print(f"Found UID: {uid}")
-            # Use the UID to download the 16S sequence using efetch
-            print(f"Fetching FASTA sequence for UID {uid}...")
-            handle = Entrez.efetch(db="nuccore", id=uid, rettype="fasta", retmode="text")
-            fasta_data = handle.read()
-            handle.close()
-
-            # Check if FASTA data was successfully retrieved
-            if fasta_data and fasta_data.startswith(">"):
-                # Prepare the filename
-                # Basic sanitization: replace spaces with underscores, remove potentially problematic chars
-                safe_species_id = species_id.replace(" ", "_").replace("/", "-").replace("\\", "-")
-                fasta_filename_base = f"{safe_species_id}_16s.fasta"
-                fasta_filename = os.path.join(output_folder, fasta_filename_base)
-
-                # Save the sequence to the target folder
-                with open(fasta_filename, "w", encoding='utf-8') as fasta_file:
-                    fasta_file.write(fasta_data)
-
-                status = os.path.basename(fasta_filename) # Record the actual filename saved
-                results.append({"id": species_id, "16s_file": status})
-                print(f"Success: Downloaded and saved 16S sequence for {species_id} to {fasta_filename}")
-            else:
-                status = "fasta_download_failed"
-                results.append({"id": species_id, "16s_file": status})
-                print(f"Warning: Found UID {uid} for {species_id}, but failed to download valid FASTA data.")
-        else:
-            status = "uid_not_found"
-            results.append({"id": species_id, "16s_file": status})
-            print(f"Info: No matching UID found for {species_id} with the specified criteria.")
-
-        # Control the request frequency to avoid overloading NCBI servers
-        # (Approx. 2 requests per second maximum without API key, potentially more with key)
-        time.sleep(0.5)
-
-    except Exception as e:
-        # Catch and record any exceptions during processing
-        status = f"error:_{str(e)[:50]}" # Record a truncated error message
-        results.append({"id": species_id, "16s_file": status})
-        print(f"Error processing {species_id}: {e}")
-        # Wait a bit longer after an error
-        time.sleep(1)
+    record = cache.get(species_id)
+    if record is None:
+        status = "not_found" # Not looked up yet (rebuild_only)
+    elif record["status"] == "ok":
+        # Rewrite the FASTA file from the cache if it is missing
+        if not os.path.exists(fasta_filename(species_id)):
+            save_fasta(species_id, record["fasta"])
+        status = os.path.basename(fasta_filename(species_id)) # Record the actual filename saved
+    elif record["status"] == "error":
+        status = f"error:_{(record['message'] or '')[:50]}" # Record a truncated error message
+        print(f"Error processing {species_id}: {record['message']}")
+    elif record["status"] == "uid_found":
+        status = "fasta_download_failed" # Download interrupted; it is resumed on the next run
+    else:
+        status = record["status"]
+    results.append({"id": species_id, "16s_file": status})
+
+cache.close()
 
 # Write the results to a new CSV file
 print("\n--- Processing complete ---")
@@ -1,6 +1,22 @@
 import pandas as pd
-import scipy.stats as stats
-from statsmodels.stats.multitest import multipletests
+
+from fisher_engine import fisher_enrichment, read_count_matrix
+
+# Build the COG x taxonomic level table from the HGT donor list and a local NCBI taxonomy dump
+# (nodes.dmp/names.dmp from https://ftp.ncbi.nlm.nih.gov/pub/taxonomy/taxdump.tar.gz) instead of the table below
+use_taxonomy_dump = False
+taxdump_dir = "taxdump"                 # Folder with the extracted nodes.dmp and names.dmp
+donor_list_file = "HGT_donor_list.csv"  # One row per HGT gene: COG category and donor (species name or taxonomy ID)
+donor_cog_col = "COG"
+donor_col = "Donor"
+
+# Test any category x group count matrix instead (CSV or Excel, first column = category, e.g. KEGG orthologs
+# or gene clusters; an optional "Total" column gives the category totals, otherwise the row sums are used)
+count_matrix_file = None
+alternative = "two-sided"  # "two-sided", "greater" (enrichment) or "less" (depletion)
+# Bottom-right cell of every 2x2 table: "group_complement" (all genes minus the genes of the taxonomic level,
+# as in the published results) or "remainder" (genes outside both the COG category and the level)
+d_cell = "group_complement"
 
 # Read data
 data = pd.DataFrame({
@@ -14,18 +30,28 @@ data = pd.DataFrame({
     "Total": [277, 1187, 2777, 514, 906, 381, 1225, 421, 220, 815, 196, 295, 1321, 63, 177, 220, 319, 523]
 })
 
-# Perform Fisher's Exact Test
-enrichment_results = []
-for level in ["Species", "Genus", "Family", "Order", "Class", "Phylum"]:
-    for i, row in data.iterrows():
-        table = [[row[level], row["Total"] - row[level]],
-                 [data[level].sum() - row[level], data["Total"].sum() - data[level].sum()]]
-        oddsratio, p_value = stats.fisher_exact(table)
-        enrichment_results.append([row["Level"], level, p_value])
-
-# Adjust P-values (FDR correction)
-enrichment_df = pd.DataFrame(enrichment_results, columns=["Level", "Taxonomic Level", "P-value"])
-enrichment_df["FDR"] = multipletests(enrichment_df["P-value"], method='fdr_bh')[1]
+if use_taxonomy_dump:
+    from ncbi_taxonomy import load_taxonomy, level_counts
+
+    donors = pd.read_csv(donor_list_file)
+    data, unresolved = level_counts(donors, load_taxonomy(taxdump_dir), list(data["Level"]),
+                                    cog_col=donor_cog_col, donor_col=donor_col)
+    if unresolved:
+        print(f"{len(unresolved)} donors not found in the taxonomy or in the L. plantarum species were skipped: "
+              f"{', '.join(unresolved[:10])}{' ...' if len(unresolved) > 10 else ''}")
+    data.to_csv("HGT_taxonomic_level_counts.csv", index=False)
+
+if count_matrix_file is not None:
+    data = read_count_matrix(count_matrix_file).reset_index()
+    data = data.rename(columns={data.columns[0]: "Level"})
+    if "Total" not in data.columns:
+        data["Total"] = data.drop(columns="Level").sum(axis=1)
+
+# Perform Fisher's Exact Test for every COG category and taxonomic level in one batch, with FDR correction
+counts = data.set_index("Level").drop(columns="Total")
+enrichment_df = fisher_enrichment(counts, totals=data["Total"], alternative=alternative, d_cell=d_cell)
+enrichment_df = enrichment_df.rename(columns={"Category": "Level", "Group": "Taxonomic Level"})
+enrichment_df = enrichment_df[["Level", "Taxonomic Level", "Odds Ratio", "P-value", "FDR"]]
 
 # Output results
 enrichment_file_path = "Enrichment_Analysis_Results.csv"
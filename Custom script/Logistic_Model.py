@@ -1,40 +1,425 @@
+import io
+import os
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter, sleep
+
 import pandas as pd
 import numpy as np
-from scipy.optimize import curve_fit
+from scipy.optimize import OptimizeWarning, curve_fit
 
 # Define the Logistic growth model function
 def logistic(t, K, r, t0):
     return K / (1 + np.exp(-r * (t - t0)))
 
-# Read data file
-data = pd.read_csv('Logistic_Growth_Model.csv')
+# Analytic Jacobian of the Logistic model with respect to (K, r, t0)
+def logistic_jacobian(t, K, r, t0):
+    s = 1 / (1 + np.exp(-r * (t - t0)))  # Logistic curve scaled to 0-1
+    ds = s * (1 - s)
+    return np.column_stack([s, K * (t - t0) * ds, -K * r * ds])
+
+
+def initial_guess(time, OD):
+    """
+    Data-driven starting values for (K, r, t0).
+
+    K is the maximum OD, t0 the first time point where OD reaches K/2, and r follows from the
+    steepest observed slope, since the Logistic curve's maximum slope is K * r / 4.
+    Falls back to r = 0.1 and t0 = middle time when the curve gives no usable information.
+    """
+    K0 = np.max(OD)
+    above_half = np.nonzero(OD >= K0 / 2)[0]
+    t0_0 = time[above_half[0]] if len(above_half) else time[len(time) // 2]
+    slopes = np.diff(OD) / np.diff(time) if len(time) > 1 else np.array([])
+    max_slope = np.max(slopes) if len(slopes) else 0.0
+    r0 = 4 * max_slope / K0 if K0 > 0 and max_slope > 0 else 0.1
+    return [K0, r0, t0_0]
 
-# Extract the time column (assuming the first column is time)
-time = data['Time'].values
 
-# Extract OD value columns for each strain (assuming columns from the second column onwards are OD values for each strain)
-OD_data = data.drop(columns=['Time']).values  # Remove the time column and get the OD data matrix
+def fit_well(well, p0=None):
+    """
+    Fits the Logistic model to one well (strain column) with the analytic Jacobian.
 
-# Store fitting results for each strain
-results = []
+    Args:
+        well (tuple): (strain_name, time, OD); NaN time points are ignored.
+        p0 (list, optional): Starting values of (K, r, t0), e.g. a previous fit (defaults to initial_guess).
 
-# Fit each column (i.e., each strain)
-for i in range(OD_data.shape[1]):  # Iterate through all strains
-    OD = OD_data[:, i]  # OD values for the current strain
-    initial_guess = [max(OD), 0.1, time[len(time)//2]]  # Initial guess values: K=maximum value, r=0.1, t0=middle time
+    Returns:
+        dict: Strain name, fitted K, r, t0 (NaN on failure), convergence status,
+              number of function evaluations, fitting time in seconds and a status message.
+              A fit only counts as converged if the optimizer reports success, the parameter
+              covariance is finite and t0 lies within the observed time range; otherwise the
+              message gives the reason (degenerate fits, e.g. of flat wells, keep their parameters).
+    """
+    strain, time, OD = well
+    start = perf_counter()
+    result = {'Strain': strain, 'K': np.nan, 'r': np.nan, 't0': np.nan, 'Converged': False, 'N_eval': 0}
+    finite = np.isfinite(time) & np.isfinite(OD)
+    time, OD = time[finite], OD[finite]
     try:
-        # Perform fitting
-        popt, _ = curve_fit(logistic, time, OD, p0=initial_guess)
-        K_fit, r_fit, t0_fit = popt
-        results.append((K_fit, r_fit, t0_fit))
-        print(f"Fitting parameters for strain {i+1}: K = {K_fit}, r = {r_fit}, t0 = {t0_fit}")
+        if len(OD) < 3:
+            raise ValueError(f"only {len(OD)} valid time points, at least 3 are needed")
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', OptimizeWarning)  # Reported through Converged/Message instead
+            popt, pcov, infodict, message, ier = curve_fit(logistic, time, OD,
+                                                           p0=initial_guess(time, OD) if p0 is None else p0,
+                                                           jac=logistic_jacobian, full_output=True)
+        message = ' '.join(message.split())
+        if ier not in (1, 2, 3, 4) or not np.all(np.isfinite(popt)):
+            converged = False
+        elif not np.all(np.isfinite(pcov)):
+            converged, message = False, f"covariance of the parameters could not be estimated (degenerate fit); {message}"
+        elif not time.min() <= popt[2] <= time.max():
+            converged, message = False, (f"t0 = {popt[2]:.4g} outside the observed time range "
+                                         f"[{time.min():.4g}, {time.max():.4g}]; {message}")
+        else:
+            converged = True
+        result.update(K=popt[0], r=popt[1], t0=popt[2], Converged=converged,
+                      N_eval=int(infodict['nfev']), Message=message)
     except Exception as e:
-        print(f"Strain {i+1} fitting failed: {e}")
+        result['Message'] = str(e)
+    result['Fit_time_s'] = perf_counter() - start
+    return result
+
+
+def fit_all_wells(time, OD_df, n_workers=None):
+    """
+    Fits every strain column of `OD_df` in parallel across a process pool.
+
+    Args:
+        time (np.ndarray): Time points.
+        OD_df (pd.DataFrame): OD values, one column per strain (well).
+        n_workers (int, optional): Number of worker processes (defaults to the number of CPUs; 1 fits serially).
+
+    Returns:
+        pd.DataFrame: One row per strain, in column order, with 'Strain', 'K', 'r', 't0',
+                      'Converged', 'N_eval', 'Fit_time_s' and 'Message'.
+    """
+    time = np.asarray(time, dtype=float)
+    wells = [(strain, time, OD_df[strain].to_numpy(dtype=float)) for strain in OD_df.columns]
+    if n_workers == 1:
+        results = [fit_well(well) for well in wells]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(fit_well, wells, chunksize=max(1, len(wells) // 64)))
+    return pd.DataFrame(results, columns=['Strain', 'K', 'r', 't0', 'Converged', 'N_eval', 'Fit_time_s', 'Message'])
+
+
+def _bootstrap_chunk(task):
+    """
+    Refits `n_resamples` bootstrap resamples of one well, warm-started from the converged fit.
+    """
+    strain, time, OD, popt, n_resamples, method, seed = task
+    rng = np.random.default_rng(seed)
+    fitted = logistic(time, *popt)
+    residuals = OD - fitted
+    samples = []
+    for _ in range(n_resamples):
+        if method == 'residual':
+            # Residual bootstrap: fitted curve plus resampled residuals at the original time points
+            t, y = time, fitted + rng.choice(residuals, size=len(residuals), replace=True)
+        else:
+            # Case bootstrap: resample (time, OD) points
+            idx = rng.integers(0, len(time), size=len(time))
+            t, y = time[idx], OD[idx]
+        try:
+            p, _ = curve_fit(logistic, t, y, p0=popt, jac=logistic_jacobian)
+            samples.append(p)
+        except Exception:
+            continue  # Failed resamples are counted as the difference to n_resamples
+    return strain, np.array(samples).reshape(-1, 3)
+
+
+def bootstrap_all_wells(time, OD_df, fits, n_resamples=200, method='residual', ci=0.95, seed=0,
+                        chunk_size=50, n_workers=None):
+    """
+    Percentile bootstrap confidence intervals of K, r and t0 for every converged well.
+
+    Resamples are split into chunks that run across a process pool. Every chunk gets its own
+    child of np.random.SeedSequence(seed), so results do not depend on the number of workers.
+
+    Args:
+        time (np.ndarray): Time points.
+        OD_df (pd.DataFrame): OD values, one column per strain (well).
+        fits (pd.DataFrame): Point estimates from fit_all_wells (used as warm starts).
+        n_resamples (int): Number of bootstrap resamples per well.
+        method (str): 'residual' (resample residuals around the fitted curve) or 'case' (resample time points).
+        ci (float): Confidence level of the intervals.
+        seed (int): Seed for reproducible resampling.
+        chunk_size (int): Number of resamples per task.
+        n_workers (int, optional): Number of worker processes (defaults to the number of CPUs).
+
+    Returns:
+        pd.DataFrame: One row per strain with 'Strain', '<param>_CI_low' / '<param>_CI_high'
+                      for K, r and t0, and 'Bootstrap_N' (number of successful resamples).
+    """
+    if method not in ('residual', 'case'):
+        raise ValueError(f"Unknown bootstrap method '{method}'. Use 'residual' or 'case'.")
+    time = np.asarray(time, dtype=float)
+
+    tasks = []
+    for _, fit in fits[fits['Converged']].iterrows():
+        OD = OD_df[fit['Strain']].to_numpy(dtype=float)
+        finite = np.isfinite(time) & np.isfinite(OD)
+        tasks.append((fit['Strain'], time[finite], OD[finite], fit[['K', 'r', 't0']].to_numpy(dtype=float)))
+    chunks = [(start, min(chunk_size, n_resamples - start)) for start in range(0, n_resamples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks) * len(chunks))
+    chunk_tasks = [(strain, t, OD, popt, size, method, seeds[k * len(chunks) + c])
+                   for k, (strain, t, OD, popt) in enumerate(tasks) for c, (_, size) in enumerate(chunks)]
+
+    samples = {strain: [] for strain, _, _, _ in tasks}
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        for strain, chunk_samples in executor.map(_bootstrap_chunk, chunk_tasks):
+            samples[strain].append(chunk_samples)
+
+    alpha = (1 - ci) / 2
+    rows = []
+    for strain in fits['Strain']:
+        row = {'Strain': strain}
+        strain_samples = np.concatenate(samples[strain]) if samples.get(strain) else np.empty((0, 3))
+        for k, param in enumerate(['K', 'r', 't0']):
+            low, high = np.quantile(strain_samples[:, k], [alpha, 1 - alpha]) if len(strain_samples) else (np.nan, np.nan)
+            row[f'{param}_CI_low'], row[f'{param}_CI_high'] = low, high
+        row['Bootstrap_N'] = len(strain_samples)
+        rows.append(row)
+    return pd.DataFrame(rows, columns=['Strain', 'K_CI_low', 'K_CI_high', 'r_CI_low', 'r_CI_high',
+                                       't0_CI_low', 't0_CI_high', 'Bootstrap_N'])
+
+
+class CsvTail:
+    """
+    Follows a growing CSV file (e.g. written by a plate reader), returning only the rows appended since the last read.
+
+    Only complete lines (ending with a newline) are consumed; a partially written last line is read on the
+    next call. If the file shrinks (a new run replaced it), reading starts again from the top.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.header = None
+
+    def read_new_rows(self):
+        """
+        Returns the newly appended rows as a DataFrame (empty if there are none or the file does not exist yet).
+        """
+        if not os.path.exists(self.path):
+            return pd.DataFrame()
+        if os.path.getsize(self.path) < self.offset:
+            self.offset, self.header = 0, None
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        complete = data[:data.rfind(b'\n') + 1]
+        self.offset += len(complete)
+        lines = complete.decode('utf-8').splitlines(keepends=True)
+        if self.header is None and lines:
+            self.header, lines = lines[0], lines[1:]
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            return pd.DataFrame()
+        return pd.read_csv(io.StringIO(self.header + ''.join(lines)))
+
+
+class StreamingFitter:
+    """
+    Incremental Logistic fits of live growth curves.
+
+    New time points are appended to per-well buffers; only wells that received new data are refitted,
+    warm-started from their previous parameters. A well whose K, r and t0 change by less than `rtol`
+    (relative) over `stable_updates` consecutive refits is marked stable and no longer refitted.
+    Only plausible fits (K > 0, r > 0 and the inflection point t0 within the observed time range) are used
+    as warm starts or count towards stability, so wells still in the lag phase keep being refitted.
+
+    Args:
+        rtol (float): Relative parameter change below which a refit counts as unchanged.
+        stable_updates (int): Number of consecutive unchanged refits after which a well is skipped.
+        time_col (str): Name of the time column.
+    """
+
+    def __init__(self, rtol=1e-3, stable_updates=3, time_col='Time'):
+        self.rtol = rtol
+        self.stable_updates = stable_updates
+        self.time_col = time_col
+        self.buffers = {}   # strain -> (list of time points, list of OD values)
+        self.results = {}   # strain -> latest fit result (dict from fit_well plus streaming fields)
+        self.changed = set()
+
+    def append(self, rows):
+        """
+        Appends new rows (time column plus one OD column per strain) to the per-well buffers.
+        """
+        if rows.empty:
+            return
+        time = pd.to_numeric(rows[self.time_col], errors='coerce').to_numpy(dtype=float)
+        for strain in rows.columns.drop(self.time_col):
+            OD = pd.to_numeric(rows[strain], errors='coerce').to_numpy(dtype=float)
+            finite = np.isfinite(time) & np.isfinite(OD)
+            if not finite.any():
+                continue
+            buffer_time, buffer_OD = self.buffers.setdefault(strain, ([], []))
+            buffer_time.extend(time[finite])
+            buffer_OD.extend(OD[finite])
+            self.changed.add(strain)
+
+    def refit(self):
+        """
+        Refits the wells that changed since the last call (stable wells are skipped).
+
+        Returns:
+            list of dict: The updated results ('Strain', 'K', 'r', 't0', 'Converged', 'N_eval', 'Fit_time_s',
+                          'Message', 'Plausible', 'N_points', 'Updates', 'Stable').
+        """
+        updated = []
+        order = {strain: k for k, strain in enumerate(self.buffers)}
+        for strain in sorted(self.changed, key=order.get):
+            previous = self.results.get(strain)
+            if previous is not None and previous['Stable']:
+                continue
+            time, OD = (np.array(values, dtype=float) for values in self.buffers[strain])
+            warm = previous is not None and previous['Plausible']
+            p0 = [previous['K'], previous['r'], previous['t0']] if warm else None
+            result = fit_well((strain, time, OD), p0)
+            if warm and not self._plausible(result, time):
+                result = fit_well((strain, time, OD))  # Warm start failed, retry from the data-driven guess
+            result['Plausible'] = self._plausible(result, time)
+
+            unchanged = 0
+            if warm and result['Plausible']:
+                old = np.array(p0)
+                new = np.array([result['K'], result['r'], result['t0']])
+                if np.all(np.abs(new - old) <= self.rtol * np.maximum(np.abs(old), 1e-12)):
+                    unchanged = previous['Unchanged'] + 1
+            result.update(N_points=len(time), Updates=(previous['Updates'] if previous else 0) + 1,
+                          Unchanged=unchanged, Stable=unchanged >= self.stable_updates)
+            self.results[strain] = result
+            updated.append(result)
+        self.changed.clear()
+        return updated
+
+    @staticmethod
+    def _plausible(result, time):
+        return bool(result['Converged'] and result['K'] > 0 and result['r'] > 0
+                    and np.min(time) <= result['t0'] <= np.max(time))
+
+    def table(self):
+        """
+        Latest results of all wells as a DataFrame, in order of first appearance.
+        """
+        columns = ['Strain', 'K', 'r', 't0', 'Converged', 'N_eval', 'Fit_time_s', 'Message', 'Plausible', 'N_points',
+                   'Updates', 'Stable']
+        return pd.DataFrame([self.results[strain] for strain in self.buffers if strain in self.results], columns=columns)
+
+
+def stream_fit(csv_path, output_path='Fitting_Parameter_Results.csv', poll_interval=1.0, idle_timeout=None,
+               fitter=None, on_update=None):
+    """
+    Tails a growth CSV and keeps the fitted parameters up to date while the plate is still being read.
+
+    Every `poll_interval` seconds new rows are appended to the well buffers, changed wells are refitted
+    and the full results table is rewritten to `output_path` (replaced atomically).
+
+    Args:
+        csv_path (str): Growth CSV being written (time column 'Time', one OD column per strain).
+        output_path (str): Results CSV, rewritten after every update.
+        poll_interval (float): Seconds between checks for new rows.
+        idle_timeout (float, optional): Stop after this many seconds without new rows (None runs until interrupted).
+        fitter (StreamingFitter, optional): Fitter to use (defaults to StreamingFitter()).
+        on_update (callable, optional): Called with the list of updated results after every refit.
+
+    Returns:
+        StreamingFitter: The fitter with the final results.
+    """
+    fitter = fitter or StreamingFitter()
+    tail = CsvTail(csv_path)
+    last_data = perf_counter()
+    try:
+        while idle_timeout is None or perf_counter() - last_data < idle_timeout:
+            rows = tail.read_new_rows()
+            if rows.empty:
+                sleep(poll_interval)
+                continue
+            last_data = perf_counter()
+            fitter.append(rows)
+            updated = fitter.refit()
+            if updated:
+                fitter.table().to_csv(output_path + '.tmp', index=False)
+                os.replace(output_path + '.tmp', output_path)
+                if on_update is not None:
+                    on_update(updated)
+    except KeyboardInterrupt:
+        pass
+    return fitter
+
+
+def replay_growth_csv(source_path, target_path, rows_per_step=1, interval=1.0):
+    """
+    Plate-reader simulator for testing the streaming mode: writes the rows of a finished growth CSV into
+    `target_path` a few at a time, as a reader would append new time points.
+    """
+    with open(source_path, encoding='utf-8') as f:
+        header, *lines = [line if line.endswith('\n') else line + '\n' for line in f if line.strip()]
+    with open(target_path, 'w', encoding='utf-8') as f:
+        f.write(header)
+        f.flush()
+        for start in range(0, len(lines), rows_per_step):
+            sleep(interval)
+            f.writelines(lines[start:start + rows_per_step])
+            f.flush()
+
+
+if __name__ == "__main__":
+    # Streaming mode: follow the growth CSV while the plate is still in the reader and refit changed wells only
+    streaming_mode = False
+    poll_interval = 5.0          # Seconds between checks for new time points
+    idle_timeout = None          # Stop after this many seconds without new data (None: run until Ctrl+C)
+    replay_source = None         # Test without a reader: replay a finished CSV into 'Logistic_Growth_Model_replay.csv'
+
+    if streaming_mode:
+        growth_csv = 'Logistic_Growth_Model.csv'
+        if replay_source is not None:
+            growth_csv = 'Logistic_Growth_Model_replay.csv'
+            threading.Thread(target=replay_growth_csv, args=(replay_source, growth_csv, 1, poll_interval / 2),
+                             daemon=True).start()
+
+        def report(updated):
+            for row in updated:
+                state = 'stable' if row['Stable'] else ('fitted' if row['Converged'] else f"failed: {row['Message']}")
+                print(f"{row['Strain']} ({row['N_points']} points, {state}): K = {row['K']}, r = {row['r']}, t0 = {row['t0']}")
+
+        stream_fit(growth_csv, poll_interval=poll_interval, idle_timeout=idle_timeout, on_update=report)
+        print("Streaming stopped, latest parameters saved as 'Fitting_Parameter_Results.csv'.")
+    else:
+        # Read data file
+        data = pd.read_csv('Logistic_Growth_Model.csv')
+
+        # Extract the time column (assuming the first column is time)
+        time = data['Time'].values
+
+        # Extract OD value columns for each strain (assuming columns from the second column onwards are OD values for each strain)
+        OD_data = data.drop(columns=['Time'])  # Remove the time column, keeping the strain column names
+
+        # Bootstrap confidence intervals (set bootstrap_resamples = 0 to skip)
+        bootstrap_resamples = 0         # Number of resamples per strain, e.g. 200
+        bootstrap_method = 'residual'   # 'residual' or 'case'
+        bootstrap_seed = 1337           # Fixed seed for reproducible intervals
+
+        # Fit all strains in parallel
+        results_df = fit_all_wells(time, OD_data)
+
+        for _, row in results_df.iterrows():
+            if row['Converged']:
+                print(f"Fitting parameters for strain {row['Strain']}: K = {row['K']}, r = {row['r']}, t0 = {row['t0']}")
+            else:
+                print(f"Strain {row['Strain']} fitting failed: {row['Message']}")
 
-# Save the fitting results as a DataFrame
-results_df = pd.DataFrame(results, columns=['K', 'r', 't0'])
+        # Add 95% bootstrap confidence intervals alongside the point estimates
+        if bootstrap_resamples > 0:
+            ci_df = bootstrap_all_wells(time, OD_data, results_df, bootstrap_resamples, bootstrap_method, seed=bootstrap_seed)
+            results_df = results_df.merge(ci_df, on='Strain', how='left')
 
-# Save fitting parameters to CSV file
-results_df.to_csv('Fitting_Parameter_Results.csv', index=False)
+        # Save fitting parameters to CSV file (failed fits are kept with Converged = False and the reason in Message)
+        results_df.to_csv('Fitting_Parameter_Results.csv', index=False)
 
-print("Fitting process completed, results saved as 'Fitting_Parameter_Results.csv'.")
+        print("Fitting process completed, results saved as 'Fitting_Parameter_Results.csv'.")
@@ -1,18 +1,130 @@
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-from scipy.spatial.distance import pdist, squareform
+from scipy.spatial.distance import cdist, pdist, squareform
+
+# Output name of each supported metric
+metric_names = {"cityblock": "Manhattan", "euclidean": "Euclidean", "standardized": "Standardized_Euclidean"}
+
+
+def normalize_parameters(data, method="zscore"):
+    """
+    Normalizes each phenotypic parameter column (e.g. K, r, t0) so that no parameter dominates the distance.
+
+    Args:
+        data (pd.DataFrame): Phenotypic parameters, one row per strain.
+        method (str or None): "zscore" (mean 0, standard deviation 1), "minmax" (range 0-1) or None (unchanged).
+
+    Returns:
+        pd.DataFrame: Normalized parameters. Constant columns are set to 0.
+    """
+    if method is None:
+        return data
+    if method == "zscore":
+        center, scale = data.mean(), data.std(ddof=1)
+    elif method == "minmax":
+        center, scale = data.min(), data.max() - data.min()
+    else:
+        raise ValueError(f"Unknown normalization method '{method}'. Use 'zscore', 'minmax' or None.")
+    return (data - center).div(scale.replace(0, np.nan)).fillna(0)
+
+
+def metric_arguments(values, metric):
+    """
+    Translates a metric name into SciPy's metric name and keyword arguments.
+    "standardized" is the standardized Euclidean distance, using the variance of each parameter over all strains.
+    """
+    if metric in ("cityblock", "euclidean"):
+        return metric, {}
+    if metric == "standardized":
+        return "seuclidean", {"V": np.var(values, axis=0, ddof=1)}
+    raise ValueError(f"Unknown metric '{metric}'. Use one of: {', '.join(metric_names)}.")
+
+
+# Per-process state of the tile workers (set once by the pool initializer)
+_tile_context = {}
+
+
+def _init_tile_worker(values, output_path, metric, metric_kwargs):
+    _tile_context["values"] = values
+    _tile_context["output"] = np.load(output_path, mmap_mode="r+")
+    _tile_context["metric"] = (metric, metric_kwargs)
+
+
+def _compute_tile(tile):
+    row_start, row_stop, col_start, col_stop = tile
+    values, output = _tile_context["values"], _tile_context["output"]
+    metric, metric_kwargs = _tile_context["metric"]
+    block = cdist(values[row_start:row_stop], values[col_start:col_stop], metric=metric, **metric_kwargs).astype(np.float32)
+    output[row_start:row_stop, col_start:col_stop] = block
+    output[col_start:col_stop, row_start:row_stop] = block.T
+    output.flush()
+    return tile
+
+
+def blocked_distance_matrix(values, output_path, metric="cityblock", block_size=2048, n_workers=None):
+    """
+    Computes a square distance matrix tile by tile across a process pool, writing into a float32 memory-mapped .npy file.
+
+    Only tiles on or above the diagonal are computed; each one is mirrored into its transposed position.
+
+    Args:
+        values (np.ndarray): Strain x parameter matrix.
+        output_path (str): Path of the .npy file to create.
+        metric (str): "cityblock", "euclidean" or "standardized".
+        block_size (int): Number of strains per tile side.
+        n_workers (int, optional): Number of worker processes (defaults to the number of CPUs).
+
+    Returns:
+        np.memmap: The (read-only) memory-mapped distance matrix.
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    n = len(values)
+    scipy_metric, metric_kwargs = metric_arguments(values, metric)
+
+    output = np.lib.format.open_memmap(output_path, mode="w+", dtype=np.float32, shape=(n, n))
+    del output  # Workers reopen the file themselves
+
+    bounds = [(start, min(start + block_size, n)) for start in range(0, n, block_size)]
+    tiles = [(r0, r1, c0, c1) for i, (r0, r1) in enumerate(bounds) for (c0, c1) in bounds[i:]]
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_tile_worker,
+                             initargs=(values, output_path, scipy_metric, metric_kwargs)) as executor:
+        for _ in executor.map(_compute_tile, tiles):
+            pass
+
+    return np.load(output_path, mmap_mode="r")
+
+
+if __name__ == "__main__":
+    # Read phenotypic data
+    file_path = "Phenotypic_Results.csv"  # Please ensure this file is in the current directory
+    data = pd.read_csv(file_path, index_col=0)  # Read data, the first column is strain ID
+
+    # --- Options ---
+    distance_metric = "cityblock"  # "cityblock" (Manhattan), "euclidean" or "standardized" (standardized Euclidean)
+    normalization = None           # None, "zscore" or "minmax": normalize the parameters (K, r, t0) before computing distances
+    use_blocked_mode = False       # True for large tables: tiles across a process pool into a float32 memory-mapped .npy file
+    block_size = 2048              # Blocked mode: number of strains per tile side
 
-# Read phenotypic data
-file_path = "Phenotypic_Results.csv"  # Please ensure this file is in the current directory
-data = pd.read_csv(file_path, index_col=0)  # Read data, the first column is strain ID
+    data = normalize_parameters(data, normalization)
+    output_stem = f"Phenotypic_{metric_names[distance_metric]}_Distance_Matrix"
 
-# Calculate Manhattan distance matrix
-distance_matrix = squareform(pdist(data, metric="cityblock"))  # "cityblock" calculates Manhattan distance
+    if use_blocked_mode:
+        blocked_distance_matrix(data.to_numpy(), f"{output_stem}.npy", distance_metric, block_size)
+        # Strain order of the matrix rows/columns
+        with open(f"{output_stem}_labels.txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(map(str, data.index)) + "\n")
+        print(f"Phenotypic distance matrix has been saved as '{output_stem}.npy' (strain order in '{output_stem}_labels.txt')")
+    else:
+        # Calculate distance matrix ("cityblock" calculates Manhattan distance)
+        scipy_metric, metric_kwargs = metric_arguments(data.to_numpy(dtype=float), distance_metric)
+        distance_matrix = squareform(pdist(data, metric=scipy_metric, **metric_kwargs))
 
-# Convert to DataFrame
-distance_df = pd.DataFrame(distance_matrix, index=data.index, columns=data.index)
+        # Convert to DataFrame
+        distance_df = pd.DataFrame(distance_matrix, index=data.index, columns=data.index)
 
-# Save as CSV file
-distance_df.to_csv("Phenotypic_Manhattan_Distance_Matrix.csv")
+        # Save as CSV file
+        distance_df.to_csv(f"{output_stem}.csv")
 
-print("Phenotypic Manhattan distance matrix has been saved as 'Phenotypic_Manhattan_Distance_Matrix.csv'")
+        print(f"Phenotypic distance matrix has been saved as '{output_stem}.csv'")
@@ -1,24 +1,63 @@
-from ete3 import Tree
+import numpy as np
 import pandas as pd
 
-# Read phylogenetic tree file
-tree_file = "PAN_PHYLOGENY_MOD.nwk"  # Please ensure this file is in the current directory
-tree = Tree(tree_file, format=1)
+from newick_tree import load_tree
 
-# Get all leaf node names (strain names)
-leaf_names = [leaf.name for leaf in tree]
 
-# Calculate genetic distance between all strains
-distance_matrix = pd.DataFrame(index=leaf_names, columns=leaf_names)
+def patristic_distance_matrix(tree):
+    """
+    Calculates the genetic (patristic) distance between all pairs of leaves.
 
-for i in leaf_names:
-    for j in leaf_names:
-        if i == j:
-            distance_matrix.loc[i, j] = 0  # Distance to itself is 0
-        else:
-            distance_matrix.loc[i, j] = tree.get_distance(i, j)
+    distance = depth(leaf1) + depth(leaf2) - 2 * depth(ancestor), where depth is the root-to-node
+    branch length sum and ancestor the lowest common ancestor. With nodes numbered in preorder, the
+    lowest common ancestor of two consecutive leaves is the parent of the node following the first one,
+    and the ancestor of any two leaves is the one with the fewest branches to the root among those
+    between them, so every row of the matrix is one running minimum over the consecutive-leaf ancestors
+    (by node level, not depth, so negative branch lengths from neighbour-joining trees are handled):
+    O(n^2) without visiting pairs individually.
 
-# Save as CSV file
-distance_matrix.to_csv("Genetic_Distance_Matrix.csv")
+    Args:
+        tree (newick_tree.ArrayTree): Phylogenetic tree (see newick_tree.load_tree).
 
-print("Genetic distance matrix has been saved as 'Genetic_Distance_Matrix.csv'")
+    Returns:
+        tuple: (leaf_names, distance_matrix) where distance_matrix is a symmetric
+               float64 NumPy array in the order of leaf_names (preorder leaf order).
+    """
+    leaves = tree.leaves
+    leaf_depth = tree.depth[leaves]
+    n = len(leaves)
+    # Lowest common ancestor of leaves k and k + 1, keyed by (level, node): the minimum key over a range
+    # of leaves is their common ancestor (all nodes of that level in the range are the same node)
+    adjacent = tree.parent[leaves[:-1] + 1].astype(np.int64)
+    keys = tree.level[adjacent].astype(np.int64) * tree.n_nodes + adjacent
+
+    distance_matrix = np.zeros((n, n), dtype=np.float64)
+    for i in range(n - 1):
+        ancestors = np.minimum.accumulate(keys[i:]) % tree.n_nodes
+        distance_matrix[i, i + 1:] = leaf_depth[i] + leaf_depth[i + 1:] - 2 * tree.depth[ancestors]
+    distance_matrix += distance_matrix.T  # Symmetric by construction
+
+    return tree.leaf_names, distance_matrix
+
+
+if __name__ == "__main__":
+    # Read phylogenetic tree file (parsed once into 'PAN_PHYLOGENY_MOD.nwk.tree.npz' and reused while the file is unchanged)
+    tree_file = "PAN_PHYLOGENY_MOD.nwk"  # Please ensure this file is in the current directory
+    tree = load_tree(tree_file)
+
+    # Optional: restrict to the smallest clade containing these strains, and/or order leaves as in a list of strains
+    clade_strains = None    # e.g. ["WCFS1", "ST-III"]
+    leaf_order = None       # e.g. the strain order of another distance matrix
+    if clade_strains is not None:
+        tree = tree.clade(clade_strains)
+    if leaf_order is not None:
+        tree = tree.rotate(leaf_order)
+
+    # Calculate genetic distance between all strains (leaf names are the strain names)
+    leaf_names, distance_values = patristic_distance_matrix(tree)
+    distance_matrix = pd.DataFrame(distance_values, index=leaf_names, columns=leaf_names)
+
+    # Save as CSV file
+    distance_matrix.to_csv("Genetic_Distance_Matrix.csv")
+
+    print("Genetic distance matrix has been saved as 'Genetic_Distance_Matrix.csv'")
@@ -1,10 +1,69 @@
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
+import numpy as np
 from scipy import stats
 
+def _sorted_splits(df, target_col, r_col):
+    """
+    Sorts once by the target column and lists the candidate splits.
+
+    Returns:
+        tuple: (df_sorted, r, positions, n1) where r holds the r values of the rows with a
+               target value (in sorted order), positions the sorted positions 1 .. len(df) - 2
+               used as cut-offs, and n1 the size of group1 (target < cut-off) for each of them.
+    """
+    df_sorted = df.sort_values(target_col)
+    target = df_sorted[target_col].to_numpy(dtype=float)
+    n_valid = int(np.sum(~np.isnan(target)))  # NaN targets are sorted last and belong to neither group
+    target = target[:n_valid]
+    r = df_sorted[r_col].to_numpy(dtype=float)[:n_valid]
+
+    positions = np.arange(1, max(1, min(len(df_sorted) - 1, n_valid)))
+    n1 = np.searchsorted(target, target[positions], side='left')
+    return df_sorted, r, positions, n1
+
+def _welch_t(r, n1):
+    """
+    Welch's t statistic and degrees of freedom of every split, for a batch of r vectors at once.
+
+    Uses prefix sums of r and r^2 along each row (centered per row for numerical stability),
+    with the same conventions as stats.ttest_ind(..., equal_var=False).
+
+    Args:
+        r (np.ndarray): (n_vectors, n) array of NaN-free r values in target order.
+        n1 (np.ndarray): Group1 sizes of the splits (group1 = first n1 values of each row).
+
+    Returns:
+        tuple: (t_stat, dof), each of shape (n_vectors, len(n1)).
+    """
+    n = r.shape[1]
+    centered = r - r.mean(axis=1, keepdims=True)
+    zeros = np.zeros((len(r), 1))
+    sum_r = np.hstack([zeros, np.cumsum(centered, axis=1)])
+    sum_r2 = np.hstack([zeros, np.cumsum(centered ** 2, axis=1)])
+    n2 = n - n1
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean1 = sum_r[:, n1] / n1
+        mean2 = (sum_r[:, -1:] - sum_r[:, n1]) / n2
+        var1 = np.maximum((sum_r2[:, n1] - n1 * mean1 ** 2) / (n1 - 1), 0.0)
+        var2 = np.maximum((sum_r2[:, -1:] - sum_r2[:, n1] - n2 * mean2 ** 2) / (n2 - 1), 0.0)
+        vn1, vn2 = var1 / n1, var2 / n2
+        dof = (vn1 + vn2) ** 2 / (vn1 ** 2 / (n1 - 1) + vn2 ** 2 / (n2 - 1))
+        dof = np.where(np.isnan(dof), 1.0, dof)
+        t_stat = (mean1 - mean2) / np.sqrt(vn1 + vn2)
+    return t_stat, dof
+
 def find_cutoff(df, target_col='distantly', r_col='r', p_threshold=0.05):
     """
     Finds the cut-off and the direction of the r difference.
 
+    Every value of the target column is tried as a cut-off (group1: target < cut-off,
+    group2: target >= cut-off) with a Welch's t-test on r. The data are sorted once and
+    the t statistic, degrees of freedom and p-value of every split are computed in one
+    vectorized pass from prefix sums of r and r^2.
+
     Args:
         df (pd.DataFrame): Input DataFrame.
         target_col (str): Name of the target column.
@@ -18,35 +77,93 @@ def find_cutoff(df, target_col='distantly', r_col='r', p_threshold=0.05):
                             None if no significant cut-off.
     """
 
-    df_sorted = df.sort_values(target_col)
-    best_cutoff = None
-    best_p_value = 1.0
-    best_r_direction = None  # Store the direction
-
-    for i in range(1, len(df_sorted) - 1):
-        cutoff_value = df_sorted[target_col].iloc[i]
-        group1 = df_sorted[df_sorted[target_col] < cutoff_value]
-        group2 = df_sorted[df_sorted[target_col] >= cutoff_value]
+    df_sorted, r, positions, n1 = _sorted_splits(df, target_col, r_col)
+    # A missing r always falls into one of the two groups, which makes every t-test NaN
+    if len(positions) == 0 or np.isnan(r).any():
+        return None, None, None
 
-        if len(group1) >= 2 and len(group2) >= 2:
-            t_stat, p_value = stats.ttest_ind(group1[r_col], group2[r_col], equal_var=False)
+    t_stat, dof = _welch_t(r[np.newaxis, :], n1)
+    p_values = 2 * stats.t.sf(np.abs(t_stat[0]), dof[0])
 
-            if p_value < best_p_value:
-                best_p_value = p_value
-                best_cutoff = cutoff_value
+    # Both groups need at least 2 values
+    valid = (n1 >= 2) & (len(r) - n1 >= 2)
+    p_values = np.where(valid & ~np.isnan(p_values), p_values, np.inf)
 
-                # Calculate the means and determine the direction
-                mean_group1 = group1[r_col].mean()
-                mean_group2 = group2[r_col].mean()
-                best_r_direction = 1 if mean_group2 > mean_group1 else -1
+    best = int(np.argmin(p_values))  # First split with the smallest p-value
+    if not p_values[best] < 1.0:
+        return None, None, None
 
+    best_cutoff = df_sorted[target_col].iloc[positions[best]]
+    k = n1[best]
+    best_p_value = stats.ttest_ind(r[:k], r[k:], equal_var=False).pvalue  # Exact p-value of the chosen split
+    best_r_direction = 1 if np.mean(r[k:]) > np.mean(r[:k]) else -1
 
     if best_p_value < p_threshold:
         return best_cutoff, best_p_value, best_r_direction
     else:
         return None, None, None
 
-def analyze_single_sheet(excel_file, sheet_name, categories=['closely', 'intermediate', 'distantly'], r_col='r', p_threshold=0.05):
+def _min_log_p(r, n1):
+    """
+    Smallest log p-value (two-sided Welch's t-test) over the splits n1, for each row of r.
+    """
+    t_stat, dof = _welch_t(r, n1)
+    log_p = np.log(2) + stats.t.logsf(np.abs(t_stat), dof)
+    return np.min(np.where(np.isnan(log_p), np.inf, log_p), axis=1)
+
+def _count_permutation_exceedances(task):
+    """
+    Number of permutations in one batch whose best split is at least as significant as the observed one.
+    """
+    r, n1, observed, n_permutations, seed = task
+    rng = np.random.default_rng(seed)
+    permuted = rng.permuted(np.tile(r, (n_permutations, 1)), axis=1)
+    return int(np.sum(_min_log_p(permuted, n1) <= observed + 1e-9))
+
+def permutation_cutoff_pvalue(df, target_col='distantly', r_col='r', n_permutations=10000, seed=0,
+                              batch_size=500, n_workers=None):
+    """
+    Permutation p-value of the maximally-selected cut-off, adjusted for the search over all cut-offs
+    with the min-p null distribution (not max-|t|, so it is not comparable to max-|t| adjusted p-values).
+
+    The test statistic is the one find_cutoff maximizes: the smallest Welch's t-test p-value over all
+    valid splits, i.e. the largest |t| on the scale of each split's degrees of freedom (the raw |t|
+    would be dominated by the near-zero variances of two-value groups). r is permuted against the
+    sorted target column, and each batch of permutations is scored at once from 2-D prefix sums.
+    Batches run across a process pool, each with its own child of np.random.SeedSequence(seed).
+
+    Args:
+        df (pd.DataFrame): Input DataFrame.
+        target_col (str): Name of the target column.
+        r_col (str): Name of the r column.
+        n_permutations (int): Number of permutations.
+        seed (int): Seed for reproducible permutations.
+        batch_size (int): Number of permutations scored together.
+        n_workers (int, optional): Number of worker processes (defaults to the number of CPUs).
+
+    Returns:
+        float or None: (1 + number of permutations at least as significant as observed) / (1 + n_permutations),
+                       or None if no valid split exists.
+    """
+    _, r, positions, n1 = _sorted_splits(df, target_col, r_col)
+    n1 = np.unique(n1[(n1 >= 2) & (len(r) - n1 >= 2)])
+    if len(positions) == 0 or len(n1) == 0 or np.isnan(r).any():
+        return None
+
+    observed = _min_log_p(r[np.newaxis, :], n1)[0]
+    if np.isinf(observed):
+        return None
+
+    sizes = [min(batch_size, n_permutations - start) for start in range(0, n_permutations, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(r, n1, observed, size, batch_seed) for size, batch_seed in zip(sizes, seeds)]
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        exceedances = sum(executor.map(_count_permutation_exceedances, tasks))
+
+    return (1 + exceedances) / (1 + n_permutations)
+
+def analyze_single_sheet(excel_file, sheet_name, categories=['closely', 'intermediate', 'distantly'], r_col='r', p_threshold=0.05,
+                         n_permutations=0, seed=0):
     """
     Analyzes a single sheet in an Excel file, finding cut-offs and r direction.
 
@@ -56,6 +173,9 @@ def analyze_single_sheet(excel_file, sheet_name, categories=['closely', 'interme
         categories (list): List of category column names.
         r_col (str): Name of r column.
         p_threshold (float): P-value threshold.
+        n_permutations (int): If > 0, also report a permutation p-value adjusted for the cut-off search
+                              ('Min-p Adjusted P-value', see permutation_cutoff_pvalue).
+        seed (int): Seed for the permutations.
 
     Returns:
         pd.DataFrame: Results for each category in the single sheet.
@@ -74,7 +194,8 @@ def analyze_single_sheet(excel_file, sheet_name, categories=['closely', 'interme
                 'Category': category,
                 'Cut-off': None,
                 'P-value': None,
-                'R Direction': None  # Add R Direction to the results
+                'R Direction': None,  # Add R Direction to the results
+                **({'Min-p Adjusted P-value': None} if n_permutations > 0 else {})
             })
             continue
 
@@ -85,19 +206,27 @@ def analyze_single_sheet(excel_file, sheet_name, categories=['closely', 'interme
         else:
             print(f"  Category '{category}': No significant cut-off found.")
 
-        results_list.append({
+        result = {
             'Sheet Name': sheet_name,
             'Category': category,
             'Cut-off': cutoff,
             'P-value': p_value,
             'R Direction': r_direction  # Add R Direction to the results
-        })
+        }
+        if n_permutations > 0:
+            adjusted_p = permutation_cutoff_pvalue(df, category, r_col, n_permutations, seed)
+            result['Min-p Adjusted P-value'] = adjusted_p
+            if adjusted_p is not None:
+                print(f"  Category '{category}': Permutation p-value adjusted for the cut-off search (min-p null): {adjusted_p:.4f} ({n_permutations} permutations)")
+        results_list.append(result)
 
     return pd.DataFrame(results_list)
 
-# Example usage for a single sheet
-excel_file = "Growth_Curve_Parameters_and_Sequence_Contribution.xlsx"  # Replace with your file
-sheet_name_to_analyze = "Sheet1" # Replace "Sheet1" with the actual name of your sheet
-results_df_single_sheet = analyze_single_sheet(excel_file, sheet_name=sheet_name_to_analyze)
-results_df_single_sheet.to_csv("categories_single_sheet.csv", index=False)
-print("\nResults for single sheet saved to categories_single_sheet.csv")
+if __name__ == "__main__":
+    # Example usage for a single sheet
+    excel_file = "Growth_Curve_Parameters_and_Sequence_Contribution.xlsx"  # Replace with your file
+    sheet_name_to_analyze = "Sheet1" # Replace "Sheet1" with the actual name of your sheet
+    n_permutations = 0 # Set e.g. 10000 to add permutation p-values adjusted for the cut-off search (min-p null)
+    results_df_single_sheet = analyze_single_sheet(excel_file, sheet_name=sheet_name_to_analyze, n_permutations=n_permutations)
+    results_df_single_sheet.to_csv("categories_single_sheet.csv", index=False)
+    print("\nResults for single sheet saved to categories_single_sheet.csv")
@@ -1,5 +1,8 @@
 import pandas as pd
 import numpy as np
+from scipy import sparse
+from cog_index import cog_matrix, load_cog_index
+from presence_store import open_presence_store
 
 # --- Configuration Parameters ---
 # Consider using English filenames if appropriate for your workflow
@@ -14,27 +17,51 @@ gene_length_col_index = 5  # Sixth column (Gene length)
 cog_col_index = 4          # Fifth column (COG category)
 first_strain_col_index = 6 # Seventh column onwards (Strains)
 
+# Sparse mode: compute the whole strain x COG total-length table as one sparse matrix product
+# (strain x gene presence matrix times gene x COG length matrix), processing strains in blocks.
+# For CSV input only the gene metadata columns are kept in memory; strain columns are streamed once in row chunks.
+# Excel input without the presence store is read into memory as a whole.
+use_sparse_product = True
+strain_block_size = 1000   # Number of strain columns per block
+csv_chunk_rows = 20000     # Number of gene rows per chunk when streaming CSV input
+# Sparse mode only: read the input through its bit-packed presence store ('<input>.presence_store/'),
+# which is built on the first run and rebuilt only when the content of the input file changes
+use_presence_store = True
+
 # COG functional category list
 cog_categories = ['J', 'K', 'L', 'C', 'E', 'F', 'G', 'H', 'I', 'P', 'Q', 'D', 'M', 'N', 'O', 'T', 'U', 'V']
 
-# --- Read Excel File ---
+# --- Read Input File ---
+is_csv_input = input_filename.lower().endswith('.csv')
+store = None
 try:
     # Assume the first row is the header (header=0)
-    df = pd.read_excel(input_filename, header=0)
+    if use_sparse_product and use_presence_store:
+        # Gene metadata and strain presence come memory-mapped from the store
+        store = open_presence_store(input_filename, first_strain_col_index)
+        df = store.metadata_frame()
+        all_columns = pd.Index(store.columns + store.strains)
+    elif is_csv_input:
+        all_columns = pd.read_csv(input_filename, nrows=0).columns
+        # In sparse mode the strain columns are streamed block by block later on
+        df = pd.read_csv(input_filename, usecols=all_columns[:first_strain_col_index].tolist() if use_sparse_product else None)
+    else:
+        df = pd.read_excel(input_filename, header=0)
+        all_columns = df.columns
     print(f"Successfully read file: {input_filename}")
 except FileNotFoundError:
     print(f"Error: File '{input_filename}' not found. Please ensure the file is in the script's directory or provide the full path.")
     exit()
 except Exception as e:
-    print(f"Error reading Excel file: {e}")
+    print(f"Error reading input file: {e}")
     exit()
 
 # --- Data Preparation ---
 # Get necessary column names (using index for robustness)
 try:
-    gene_length_col_name = df.columns[gene_length_col_index]
-    cog_col_name = df.columns[cog_col_index]
-    strain_names = df.columns[first_strain_col_index:].tolist()
+    gene_length_col_name = all_columns[gene_length_col_index]
+    cog_col_name = all_columns[cog_col_index]
+    strain_names = all_columns[first_strain_col_index:].tolist()
     if not strain_names:
         print(f"Error: No strain columns found starting from column {first_strain_col_index + 1}. Please check the Excel file structure and 'first_strain_col_index' parameter.")
         exit()
@@ -55,51 +82,88 @@ if nan_count > 0:
     # For summation, filling NaN with 0 is appropriate, although .sum() also treats NaN as 0 by default.
     # df[gene_length_col_name] = df[gene_length_col_name].fillna(0) # Or let .sum() handle it
 
-# 2. Convert COG column to string type and treat NaN as empty strings
-df[cog_col_name] = df[cog_col_name].astype(str).fillna('')
+# 2. Encode the COG column once as a gene x category boolean matrix (cached next to the input file)
+cog_index = store.cog_index(cog_col_name) if store is not None else load_cog_index(input_filename, df[cog_col_name])
+in_category = pd.DataFrame(cog_matrix(cog_index, cog_categories), index=df.index, columns=cog_categories)
 
 # --- Calculate Total Length ---
-results = []
+if use_sparse_product:
+    # Gene x COG length matrix: the gene length wherever the gene belongs to the category (NaN lengths count as 0)
+    gene_lengths = df[gene_length_col_name].fillna(0).to_numpy(dtype=float)
+    length_matrix = sparse.csr_matrix(in_category.to_numpy() * gene_lengths[:, None])
+
+    total_lengths = np.zeros((len(strain_names), len(cog_categories)))
+    genes_per_strain = np.zeros(len(strain_names), dtype=np.int64)
+    if store is None and is_csv_input:
+        # One pass over the CSV rows: every chunk adds its genes' lengths to all strains
+        row = 0
+        for chunk in pd.read_csv(input_filename, usecols=strain_names, chunksize=csv_chunk_rows):
+            # Strain x gene presence matrix (a gene is present if the strain's cell is not blank/NaN)
+            presence = sparse.csr_matrix(chunk[strain_names].notna().to_numpy().T)
+            total_lengths += (presence @ length_matrix[row:row + len(chunk)]).toarray()
+            genes_per_strain += presence.getnnz(axis=1)
+            row += len(chunk)
+    else:
+        for start in range(0, len(strain_names), strain_block_size):
+            block = strain_names[start:start + strain_block_size]
+            # Strain x gene presence matrix (a gene is present if the strain's cell is not blank/NaN)
+            if store is not None:
+                presence = sparse.csr_matrix(store.strain_block(start, start + len(block)))
+            else:
+                presence = sparse.csr_matrix(df[block].notna().to_numpy().T)
+            total_lengths[start:start + len(block)] = (presence @ length_matrix).toarray()
+            genes_per_strain[start:start + len(block)] = presence.getnnz(axis=1)
 
-for strain in strain_names:
-    # 1. Filter for genes present in this strain (corresponding column value is not blank/NaN)
-    # Use .copy() to avoid SettingWithCopyWarning
-    present_genes_df = df[pd.notna(df[strain])].copy() 
+    for strain, n_present in zip(strain_names, genes_per_strain):
+        if n_present == 0:
+            print(f"Warning: Strain '{strain}' has no detected genes (based on its column). All COG total lengths will be set to 0.")
 
-    # Using English column name for output consistency
-    strain_total_lengths = {'Strain Name': strain} 
+    if pd.api.types.is_integer_dtype(df[gene_length_col_name]):
+        total_lengths = total_lengths.astype(np.int64)  # Keep integer lengths as integers, as pandas' sum() does
 
-    if not present_genes_df.empty:
-        # 2. For each COG category, calculate the total length of its genes in this strain
-        for category in cog_categories:
-            # Filter for genes belonging to this COG category (using .str.contains())
-            # na=False ensures NaNs in the COG column don't cause errors and are treated as non-matches
-            # regex=False for slight performance gain as we're matching literal characters
-            category_genes = present_genes_df[
-                present_genes_df[cog_col_name].str.contains(category, na=False, regex=False) 
-            ]
+    output_df = pd.DataFrame(total_lengths, columns=[f'{cat}_TotalLen' for cat in cog_categories])
+    output_df.insert(0, 'Strain Name', strain_names)
 
-            # Extract the lengths of these genes (already numeric, possibly including NaN)
-            lengths = category_genes[gene_length_col_name]
+else:
+    results = []
 
-            # Calculate the total length (pandas' sum() automatically treats NaN as 0)
-            # If no genes belong to this category, the result will be 0
-            total_length = lengths.sum() # Result is typically float or integer
+    for strain in strain_names:
+        # 1. Filter for genes present in this strain (corresponding column value is not blank/NaN)
+        # Use .copy() to avoid SettingWithCopyWarning
+        present_genes_df = df[pd.notna(df[strain])].copy() 
+        present_in_category = in_category.loc[present_genes_df.index]
 
-            # Store the result in the dictionary, column name format "Category_TotalLen"
-            strain_total_lengths[f'{category}_TotalLen'] = total_length
+        # Using English column name for output consistency
+        strain_total_lengths = {'Strain Name': strain} 
 
-    else:
-        # If the strain has no detected genes (based on non-empty values in its column)
-        print(f"Warning: Strain '{strain}' has no detected genes (based on its column). All COG total lengths will be set to 0.")
-        for category in cog_categories:
-            strain_total_lengths[f'{category}_TotalLen'] = 0
+        if not present_genes_df.empty:
+            # 2. For each COG category, calculate the total length of its genes in this strain
+            for category in cog_categories:
+                # Filter for genes belonging to this COG category (using the precomputed COG index mask)
+                # Genes without a COG annotation are treated as non-matches
+                category_genes = present_genes_df[present_in_category[category].to_numpy()]
 
-    results.append(strain_total_lengths)
+                # Extract the lengths of these genes (already numeric, possibly including NaN)
+                lengths = category_genes[gene_length_col_name]
 
-# --- Create and Save Output DataFrame ---
-output_df = pd.DataFrame(results)
+                # Calculate the total length (pandas' sum() automatically treats NaN as 0)
+                # If no genes belong to this category, the result will be 0
+                total_length = lengths.sum() # Result is typically float or integer
 
+                # Store the result in the dictionary, column name format "Category_TotalLen"
+                strain_total_lengths[f'{category}_TotalLen'] = total_length
+
+        else:
+            # If the strain has no detected genes (based on non-empty values in its column)
+            print(f"Warning: Strain '{strain}' has no detected genes (based on its column). All COG total lengths will be set to 0.")
+            for category in cog_categories:
+                strain_total_lengths[f'{category}_TotalLen'] = 0
+
+        results.append(strain_total_lengths)
+
+    output_df = pd.DataFrame(results)
+
+# --- Create and Save Output DataFrame ---
 # Reorder columns to ensure 'Strain Name' is first, followed by COG category total lengths
 output_columns = ['Strain Name'] + [f'{cat}_TotalLen' for cat in cog_categories]
 output_df = output_df[output_columns]
@@ -1,55 +1,184 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-from scipy.spatial.distance import jensenshannon
-from itertools import combinations
-
-# Read data
-file_path = "Single_Culture_tpm.xlsx"
-df = pd.read_excel(file_path)
-
-# Extract bacteria columns
-bacteria_cols = df.columns[3:]
-
-# Process COG categories
-cog_exp = {}
-for _, row in df.iterrows():
-    gene = row["Gene"]
-    cogs = str(row["COG_category"])  # Ensure it is a string
-    if cogs in ["nan", "None", ""] or pd.isna(cogs):
-        continue  # Skip genes without COG annotation
-
-    cogs = list(cogs)  # Parse COG categories, e.g., "KL" → ["K", "L"]
-    tpm_values = row[bacteria_cols]  # Get expression values of this gene in each bacteria
-
-    if tpm_values.isna().all():
-        continue  # Skip if no bacteria have this gene
-
-    for cog in cogs:
-        if cog not in cog_exp:
-            cog_exp[cog] = {bac: np.nan for bac in bacteria_cols}  # Initialize as NaN
-        for bac in bacteria_cols:
-            cog_exp[cog][bac] = tpm_values[bac] / len(cogs) if not pd.isna(tpm_values[bac]) else np.nan
-
-# Build COG expression matrix
-cog_df = pd.DataFrame.from_dict(cog_exp, orient="index")
-
-# Calculate Jensen-Shannon Divergence, using only **common genes**
-bacteria_pairs = list(combinations(bacteria_cols, 2))
-jsd_results = []
-
-for bac1, bac2 in bacteria_pairs:
-    common_genes = cog_df[[bac1, bac2]].dropna()  # Keep only genes that are **not empty** for both bacteria
-    if common_genes.empty:
-        jsd = np.nan  # Return NaN if no common genes
+from scipy import sparse
+from scipy.special import rel_entr
+from cog_index import build_cog_index
+
+# Number of genes (rows) read from the TPM table at a time
+tpm_chunk_rows = 50000
+
+
+def read_table_chunks(file_path, chunk_rows=tpm_chunk_rows, sheet_name=0):
+    """
+    Reads a table (CSV, Parquet or Excel) in chunks of `chunk_rows` rows, so memory does not grow with the table.
+
+    Yields:
+        pd.DataFrame: Consecutive row chunks with the table's header as columns.
+    """
+    lower = file_path.lower()
+    if lower.endswith((".csv", ".csv.gz", ".tsv", ".txt")):
+        yield from pd.read_csv(file_path, sep="\t" if lower.endswith((".tsv", ".txt")) else ",", chunksize=chunk_rows)
+    elif lower.endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq  # Only needed for Parquet input
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
     else:
-        p = common_genes[bac1].values
-        q = common_genes[bac2].values
-        jsd = jensenshannon(p, q, base=2)  # Calculate JSD
+        from openpyxl import load_workbook  # Read-only mode streams the rows instead of loading the whole sheet
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+            rows = sheet.iter_rows(values_only=True)
+            header = list(next(rows))
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == chunk_rows:
+                    yield pd.DataFrame(chunk, columns=header)
+                    chunk = []
+            if chunk:
+                yield pd.DataFrame(chunk, columns=header)
+        finally:
+            workbook.close()
+
+
+def cog_expression(chunks, cog_col="COG_category", first_sample_col=3):
+    """
+    COG-level expression: the sum over genes of each gene's expression divided by its number of COG letters.
+
+    For every chunk of genes, a sparse gene x COG weight matrix (1 / len(cogs) for each of the gene's letters)
+    is multiplied with the TPM matrix (NaN counted as 0); a companion product of the 0/1 membership matrix with
+    the non-NaN mask counts the contributing genes, and COG/sample entries without any stay NaN.
+    Genes without COG annotation are skipped.
+
+    Args:
+        chunks (iterable of pd.DataFrame): Row chunks of the TPM table (see read_table_chunks).
+        cog_col (str): Name of the COG category column.
+        first_sample_col (int): Index of the first sample (bacteria) column.
+
+    Returns:
+        pd.DataFrame: COG x sample expression, COGs in order of first appearance.
+    """
+    sums, counts, first_seen = {}, {}, {}
+    samples, offset = None, 0
+    for chunk in chunks:
+        if samples is None:
+            samples = chunk.columns[first_sample_col:]
+        tpm = chunk[samples].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        index = build_cog_index(chunk[cog_col])
+        n_genes, n_letters = len(chunk), len(index.letters)
+
+        # Sparse gene x COG membership (each annotated gene has a bit per letter)
+        bits = (index.bitmask[:, None] >> np.arange(n_letters, dtype=np.uint64)) & np.uint64(1)
+        genes, letters = np.nonzero(bits)
+        membership = sparse.csr_matrix((np.ones(len(genes)), (genes, letters)), shape=(n_genes, n_letters))
+        weights = sparse.csr_matrix((1.0 / index.n_chars[genes], (genes, letters)), shape=(n_genes, n_letters))
+
+        present = ~np.isnan(tpm)
+        chunk_sums = weights.T @ np.where(present, tpm, 0.0)
+        chunk_counts = membership.T @ present.astype(float)
+        for k, letter in enumerate(index.letters):
+            rows = genes[letters == k]
+            if len(rows) == 0:
+                continue
+            first_seen.setdefault(letter, offset + rows.min())
+            sums[letter] = sums.get(letter, 0) + chunk_sums[k]
+            counts[letter] = counts.get(letter, 0) + chunk_counts[k]
+        offset += n_genes
+
+    order = sorted(first_seen, key=first_seen.get)
+    values = np.array([np.where(counts[letter] > 0, sums[letter], np.nan) for letter in order]).reshape(len(order), -1)
+    return pd.DataFrame(values, index=order, columns=samples)
+
+
+# Per-process state of the JSD workers (set once by the pool initializer)
+_jsd_context = {}
+
+
+def _init_jsd_worker(values, present):
+    _jsd_context["values"] = values
+    _jsd_context["present"] = present
+
+
+def _jsd_rows(rows):
+    """
+    JSD between each column in `rows` and every later column, under each pair's shared non-NaN mask.
+    """
+    values, present = _jsd_context["values"], _jsd_context["present"]
+    results = []
+    for i in rows:
+        # Genes that are not empty in both bacteria, for every later bacteria at once
+        shared = present[:, i:i + 1] & present[:, i + 1:]
+        p = np.where(shared, values[:, i:i + 1], 0.0)
+        q = np.where(shared, values[:, i + 1:], 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            p = p / p.sum(axis=0)
+            q = q / q.sum(axis=0)
+            m = (p + q) / 2.0
+            js = (rel_entr(p, m).sum(axis=0) + rel_entr(q, m).sum(axis=0)) / np.log(2)
+            jsd = np.sqrt(js / 2.0)
+        jsd[~shared.any(axis=0)] = np.nan  # NaN if no common genes
+        results.append((i, jsd))
+    return results
+
+
+def jensen_shannon_matrix(expression, n_workers=None, n_blocks=None):
+    """
+    Calculates the Jensen-Shannon distance (base 2) between all pairs of columns of an expression matrix.
+
+    For each pair only the rows that are not NaN in both columns are used, and both distributions are
+    normalized over those shared rows, exactly as scipy's jensenshannon on the pair's dropna() data.
+    Each column is compared against all later columns with array operations; columns are spread over
+    a process pool in interleaved blocks so the triangular workload is balanced.
+
+    Args:
+        expression (np.ndarray): Row x sample matrix (e.g. COG x bacteria), NaN for missing values.
+        n_workers (int, optional): Number of worker processes (defaults to the number of CPUs).
+        n_blocks (int, optional): Number of column blocks (defaults to 4 per worker).
+
+    Returns:
+        np.ndarray: Symmetric sample x sample float64 matrix with zeros on the diagonal.
+    """
+    expression = np.asarray(expression, dtype=np.float64)
+    present = ~np.isnan(expression)
+    values = np.where(present, expression, 0.0)
+    n = expression.shape[1]
+
+    n_workers = n_workers or os.cpu_count() or 1
+    n_blocks = max(1, min(n, n_blocks or 4 * n_workers))
+    blocks = [list(range(k, n, n_blocks)) for k in range(n_blocks)]
+
+    distance_matrix = np.zeros((n, n), dtype=np.float64)
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_jsd_worker, initargs=(values, present)) as executor:
+        for block_results in executor.map(_jsd_rows, blocks):
+            for i, jsd in block_results:
+                distance_matrix[i, i + 1:] = jsd
+                distance_matrix[i + 1:, i] = jsd
+    return distance_matrix
+
+
+if __name__ == "__main__":
+    # Read data (CSV, Parquet or Excel), a chunk of genes at a time
+    file_path = "Single_Culture_tpm.xlsx"
+
+    # Build COG expression matrix: bacteria columns start at the fourth column; every COG sums the
+    # expression values of its genes, each divided by the gene's number of COG letters (e.g. "KL" → K and L get half)
+    cog_df = cog_expression(read_table_chunks(file_path), cog_col="COG_category", first_sample_col=3)
+    bacteria_cols = cog_df.columns
+
+    # Calculate Jensen-Shannon Divergence for all pairs at once, using only **common genes** of each pair
+    jsd_matrix = jensen_shannon_matrix(cog_df[bacteria_cols].to_numpy(dtype=float))
 
-    jsd_results.append([bac1, bac2, jsd])
+    # Long pair table, in the order of itertools.combinations(bacteria_cols, 2)
+    upper_i, upper_j = np.triu_indices(len(bacteria_cols), k=1)
+    output_df = pd.DataFrame({"Bacteria1": bacteria_cols[upper_i],
+                              "Bacteria2": bacteria_cols[upper_j],
+                              "JSD_distance": jsd_matrix[upper_i, upper_j]})
 
-# Save results
-output_df = pd.DataFrame(jsd_results, columns=["Bacteria1", "Bacteria2", "JSD_distance"])
-output_df.to_csv("Bacteria_Expression_Distance_Shared_Genes.csv", index=False)
+    # Save results
+    output_df.to_csv("Bacteria_Expression_Distance_Shared_Genes.csv", index=False)
+    pd.DataFrame(jsd_matrix, index=bacteria_cols, columns=bacteria_cols).to_csv("Bacteria_Expression_Distance_Matrix.csv")
 
-print("Calculation completed, JSD calculated based on common genes only, results saved to 'Bacteria_Expression_Distance_Common_Genes.csv'")
+    print("Calculation completed, JSD calculated based on common genes only, results saved to 'Bacteria_Expression_Distance_Shared_Genes.csv' (pairs) and 'Bacteria_Expression_Distance_Matrix.csv' (square matrix)")
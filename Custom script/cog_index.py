@@ -0,0 +1,117 @@
+import hashlib
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# COG functional categories used throughout the project
+cog_letters = 'J.K.L.C.E.F.G.H.I.P.Q.D.M.N.O.T.U.V.S'.split('.')
+
+# Annotation strings that mean "no COG category"
+missing_values = {'', 'nan', 'None'}
+
+# bitmask: one bit per entry of `letters` for every gene cluster
+# n_chars: length of the COG annotation string (0 for missing annotations), e.g. "KL" -> 2
+CogIndex = namedtuple('CogIndex', ['bitmask', 'n_chars', 'letters'])
+
+
+def build_cog_index(cog_values):
+    """
+    Encodes the COG annotation of every gene cluster once as an integer bitmask.
+
+    Only the distinct annotation strings are parsed; every gene cluster then picks up
+    the bitmask of its string. The alphabet holds the 19 standard letters first,
+    followed by any other character observed in the annotations.
+
+    Args:
+        cog_values (array-like): COG annotation per gene cluster (e.g. "K", "KL", NaN).
+
+    Returns:
+        CogIndex: Bitmask (uint64), annotation length (int32) and letter alphabet.
+    """
+    codes, uniques = pd.factorize(pd.Series(cog_values, dtype=object))
+    uniques = ['' if str(value) in missing_values else str(value) for value in uniques]
+
+    extra_letters = sorted(set(''.join(uniques)) - set(cog_letters))
+    letters = cog_letters + extra_letters
+    if len(letters) > 64:
+        raise ValueError(f"Too many distinct COG characters ({len(letters)}) to encode in a 64-bit mask.")
+    bit_of = {letter: np.uint64(1) << np.uint64(k) for k, letter in enumerate(letters)}
+
+    unique_masks = np.zeros(len(uniques) + 1, dtype=np.uint64)  # Last slot is for missing values (code -1)
+    unique_lengths = np.zeros(len(uniques) + 1, dtype=np.int32)
+    for k, value in enumerate(uniques):
+        for letter in set(value):
+            unique_masks[k] |= bit_of[letter]
+        unique_lengths[k] = len(value)
+
+    return CogIndex(unique_masks[codes], unique_lengths[codes], letters)
+
+
+def cog_matrix(index, letters=cog_letters):
+    """
+    Expands a COG index into a boolean gene cluster x category matrix.
+
+    Args:
+        index (CogIndex): Index from build_cog_index / load_cog_index.
+        letters (list of str): Categories to expand, in output column order.
+                               Letters absent from the index give all-False columns.
+
+    Returns:
+        np.ndarray: Boolean matrix of shape (n_gene_clusters, len(letters)).
+    """
+    position = {letter: k for k, letter in enumerate(index.letters)}
+    matrix = np.zeros((len(index.bitmask), len(letters)), dtype=bool)
+    for j, letter in enumerate(letters):
+        if letter in position:
+            matrix[:, j] = (index.bitmask >> np.uint64(position[letter])) & np.uint64(1)
+    return matrix
+
+
+def _values_hash(cog_values):
+    """
+    64-bit hash of the annotation strings, in order (identifies the encoded column).
+    """
+    hashes = pd.util.hash_pandas_object(pd.Series(cog_values, dtype=object).astype(str), index=False).to_numpy()
+    return np.frombuffer(hashlib.blake2b(hashes.tobytes(), digest_size=8).digest(), dtype=np.int64)[0]
+
+
+def load_cog_index(source_path, cog_values, column=None):
+    """
+    Loads the COG index saved next to `source_path`, building and saving it if needed.
+
+    The index is stored as '<source_path>.<column>.cog_index.npz' together with the size and
+    modification time of the source file and a hash of the annotations, and is rebuilt whenever
+    any of them changes (so indexing another column of the same file never returns a stale index).
+
+    Args:
+        source_path (str): Path of the table the COG annotations were read from.
+        cog_values (array-like): COG annotation per gene cluster.
+        column (str, optional): Name of the annotation column (defaults to the name of a pd.Series `cog_values`).
+
+    Returns:
+        CogIndex: The COG index of the table.
+    """
+    column = column if column is not None else getattr(cog_values, 'name', None)
+    suffix = f".{re.sub(r'[^A-Za-z0-9_-]+', '_', str(column))}" if column is not None else ''
+    index_path = f"{source_path}{suffix}.cog_index.npz"
+    stat = os.stat(source_path)
+    signature = np.array([stat.st_size, stat.st_mtime_ns, len(cog_values), _values_hash(cog_values)], dtype=np.int64)
+
+    if os.path.exists(index_path):
+        try:
+            with np.load(index_path) as cached:
+                if np.array_equal(cached['signature'], signature):
+                    return CogIndex(cached['bitmask'], cached['n_chars'], cached['letters'].tolist())
+        except Exception as e:
+            print(f"Warning: Could not read COG index '{index_path}' ({e}). It will be rebuilt.")
+
+    index = build_cog_index(cog_values)
+    try:
+        np.savez(index_path, bitmask=index.bitmask, n_chars=index.n_chars,
+                 letters=np.array(index.letters), signature=signature)
+    except OSError as e:
+        print(f"Warning: Could not save COG index to '{index_path}': {e}")
+    return index
@@ -0,0 +1,174 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cog_index import cog_letters, cog_matrix
+from presence_store import open_presence_store
+
+# Quantities stored per (strain, strain, COG) entry; one float32 .npy file each ('<stem>_<name>.npy')
+tensor_names = ['genes', 'length', 'ratio']
+
+
+def category_weights(store, cog_col, length_col, letters=cog_letters):
+    """
+    Gene x COG category membership (a gene with several letters belongs to each) and gene lengths.
+
+    Returns:
+        tuple: (membership, lengths) as a float32 (n_genes, len(letters)) 0/1 matrix and a float64 vector
+               (missing lengths count as 0).
+    """
+    membership = cog_matrix(store.cog_index(cog_col), letters).astype(np.float32)
+    lengths = np.nan_to_num(np.asarray(store.column(length_col), dtype=np.float64))
+    return membership, lengths
+
+
+# Per-process state of the tile workers (set once by the pool initializer)
+_tensor_context = {}
+
+
+def _init_tensor_worker(store, membership, lengths, output_stem):
+    # The store is reopened in every worker, so the presence words are mapped rather than copied
+    _tensor_context.update(words=store.words(), n_genes=store.n_genes, membership=membership, lengths=lengths,
+                           outputs={name: np.load(f"{output_stem}_{name}.npy", mmap_mode="r+") for name in tensor_names})
+
+
+def _presence(rows):
+    return np.unpackbits(rows.view(np.uint8), axis=1, count=_tensor_context["n_genes"]).astype(np.float32)
+
+
+def _tensor_tile(tile):
+    """
+    Complementarity of every ordered pair between two strain blocks, in both directions.
+    """
+    row_start, row_stop, col_start, col_stop = tile
+    context = _tensor_context
+    words, membership, lengths, outputs = context["words"], context["membership"], context["lengths"], context["outputs"]
+    rows, cols = _presence(words[row_start:row_stop]), _presence(words[col_start:col_stop])
+
+    # Genes and total length per strain and category
+    rows_genes, cols_genes = rows @ membership, cols @ membership
+    rows_length = rows.astype(np.float64) @ (membership * lengths[:, None])
+    cols_length = cols.astype(np.float64) @ (membership * lengths[:, None])
+
+    # Shared genes and shared length per pair and category: one X . diag(w) . Y^T product per category
+    n_categories = membership.shape[1]
+    shared_genes = np.empty((len(rows), len(cols), n_categories), dtype=np.float32)
+    shared_length = np.empty((len(rows), len(cols), n_categories), dtype=np.float64)
+    for c in range(n_categories):
+        selected = membership[:, c] > 0
+        shared_genes[:, :, c] = rows[:, selected] @ cols[:, selected].T
+        shared_length[:, :, c] = (rows[:, selected] * lengths[selected]).astype(np.float64) @ cols[:, selected].T
+
+    # Genes of the first strain that the second strain lacks, and the reverse direction
+    forward_genes = rows_genes[:, None, :] - shared_genes
+    backward_genes = cols_genes[None, :, :] - shared_genes
+    with np.errstate(invalid="ignore", divide="ignore"):
+        union = rows_genes[:, None, :] + cols_genes[None, :, :] - shared_genes
+        forward = {"genes": forward_genes, "length": rows_length[:, None, :] - shared_length, "ratio": forward_genes / union}
+        backward = {"genes": backward_genes, "length": cols_length[None, :, :] - shared_length, "ratio": backward_genes / union}
+    for name in tensor_names:
+        outputs[name][row_start:row_stop, col_start:col_stop] = forward[name]
+        outputs[name][col_start:col_stop, row_start:row_stop] = backward[name].transpose(1, 0, 2)
+        outputs[name].flush()
+    return tile
+
+
+def complementarity_tensor(store, output_stem, cog_col, length_col, letters=cog_letters, block_size=256, n_workers=None):
+    """
+    COG-resolved functional complementarity of every ordered strain pair.
+
+    For strains a, b and COG category c:
+        genes[a, b, c]  = number of category-c genes present in a and absent in b
+        length[a, b, c] = their total nucleotide length
+        ratio[a, b, c]  = genes[a, b, c] / number of category-c genes present in a or b
+                          (the share of the pair's category-c gene pool only a brings; NaN if the pool is empty)
+
+    Shared genes per pair come from presence-matrix products weighted by category membership
+    (and gene length), so no pair is visited individually. Upper-triangle tiles of strains run across a
+    process pool; each tile fills both directions of its pairs. The three n x n x len(letters) tensors are
+    written to float32 memory-mapped files '<output_stem>_genes.npy', '_length.npy' and '_ratio.npy'.
+
+    Args:
+        store (PresenceStore): Presence store of the presence/absence table.
+        output_stem (str): Path prefix of the output files.
+        cog_col (str): COG metadata column.
+        length_col (str): Gene length metadata column.
+        letters (list of str): COG categories (last tensor axis).
+        block_size (int): Number of strains per tile side.
+        n_workers (int, optional): Number of worker processes (defaults to the number of CPUs).
+
+    Returns:
+        dict: name -> (read-only) memory-mapped tensor.
+    """
+    membership, lengths = category_weights(store, cog_col, length_col, letters)
+    n = store.n_strains
+    for name in tensor_names:
+        output = np.lib.format.open_memmap(f"{output_stem}_{name}.npy", mode="w+", dtype=np.float32,
+                                           shape=(n, n, len(letters)))
+        del output  # Workers reopen the files themselves
+
+    bounds = [(start, min(start + block_size, n)) for start in range(0, n, block_size)]
+    tiles = [(r0, r1, c0, c1) for i, (r0, r1) in enumerate(bounds) for (c0, c1) in bounds[i:]]
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_tensor_worker,
+                             initargs=(store, membership, lengths, output_stem)) as executor:
+        for _ in executor.map(_tensor_tile, tiles):
+            pass
+
+    return {name: np.load(f"{output_stem}_{name}.npy", mmap_mode="r") for name in tensor_names}
+
+
+def export_long_format(output_stem, strains, output_path, letters=cog_letters, block_rows=64):
+    """
+    Streams the tensors into a long-format CSV (one row per ordered strain pair and COG category, the
+    pair of a strain with itself left out), a block of first strains at a time.
+
+    Columns: 'Strain 1', 'Strain 2', 'COG', 'Complementary genes', 'Complementary length', 'Complementary ratio'
+    (genes of Strain 1 absent in Strain 2). A '.gz' output path is compressed.
+    """
+    tensors = {name: np.load(f"{output_stem}_{name}.npy", mmap_mode="r") for name in tensor_names}
+    strains = np.asarray(strains, dtype=object)
+    n, n_categories = len(strains), len(letters)
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        first, second, category = np.meshgrid(np.arange(start, stop), np.arange(n), np.arange(n_categories), indexing="ij")
+        keep = (first != second).ravel()
+        block = pd.DataFrame({
+            'Strain 1': strains[first.ravel()[keep]],
+            'Strain 2': strains[second.ravel()[keep]],
+            'COG': np.asarray(letters, dtype=object)[category.ravel()[keep]],
+            'Complementary genes': np.asarray(tensors['genes'][start:stop]).ravel()[keep].astype(np.int64),
+            'Complementary length': np.asarray(tensors['length'][start:stop]).ravel()[keep],
+            'Complementary ratio': np.asarray(tensors['ratio'][start:stop]).ravel()[keep],
+        })
+        block.to_csv(output_path, mode='a', header=start == 0, index=False)
+
+
+if __name__ == "__main__":
+    # Same input and column layout as Total_sequence_length.py
+    input_filename = 'present_absent.xlsx'
+    cog_col_index = 4          # Fifth column (COG category)
+    gene_length_col_index = 5  # Sixth column (Gene length)
+    first_strain_col_index = 6 # Seventh column onwards (Strains)
+
+    output_stem = 'Complementarity_Tensor'   # Writes Complementarity_Tensor_{genes,length,ratio}.npy
+    export_long_table = True                 # Also write the long-format table (n x (n - 1) x 19 rows)
+    long_table_path = 'Complementarity_Long.csv.gz'
+    block_size = 256                         # Number of strains per tile side
+
+    store = open_presence_store(input_filename, first_strain_col_index)
+    complementarity_tensor(store, output_stem, store.columns[cog_col_index], store.columns[gene_length_col_index],
+                           block_size=block_size)
+    # Strain order of the first two tensor axes and COG order of the last one
+    with open(f"{output_stem}_labels.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(map(str, store.strains)) + "\n")
+    with open(f"{output_stem}_cogs.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(cog_letters) + "\n")
+    print(f"Complementarity tensors have been saved as '{output_stem}_<genes|length|ratio>.npy'")
+
+    if export_long_table:
+        export_long_format(output_stem, store.strains, long_table_path)
+        print(f"Long-format table has been saved as '{long_table_path}'")
@@ -1,14 +1,48 @@
+import numpy as np
 import pandas as pd
 from scipy.stats import fisher_exact
+from statsmodels.stats.multitest import multipletests
 
-def perform_fisher_enrichment_for_column(df, column_index):
+from fisher_engine import fisher_exact_batch
+
+def numeric_values(df):
     """
-    Perform Fisher's exact test to detect if data in the specified column of a DataFrame is enriched in the range > 0.5.
+    Converts every column of a DataFrame to numbers once (non-numeric entries become NaN).
+
+    Returns:
+        np.ndarray: float64 array with the shape of `df`.
+    """
+    return df.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+
+def column_threshold_counts(values, threshold=0.5):
+    """
+    Per-column counts of numeric values above and at-or-below a threshold.
+
+    Args:
+        values (np.ndarray): Numeric values from numeric_values (NaN = not numeric).
+        threshold (float): Threshold value.
+
+    Returns:
+        tuple: (above, below) integer arrays with one entry per column.
+    """
+    valid = ~np.isnan(values)
+    above = (values > threshold).sum(axis=0)
+    return above, valid.sum(axis=0) - above
+
+
+def perform_fisher_enrichment_for_column(df, column_index, threshold=0.5, counts=None):
+    """
+    Perform Fisher's exact test to detect if data in the specified column of a DataFrame is enriched in the range > threshold (0.5 by default).
     Background values are taken from all columns in the DataFrame except the specified column.
 
     Args:
         df (pd.DataFrame): DataFrame containing the data.
         column_index (int): Index of the column to be tested (starting from 0).
+        threshold (float): Threshold value.
+        counts (tuple, optional): Precomputed (above, below) per-column counts from
+                                  column_threshold_counts(numeric_values(df), threshold);
+                                  pass them when testing several columns so the data is converted only once.
 
     Returns:
         tuple: A tuple containing Fisher's exact test results (oddsratio, pvalue),
@@ -20,55 +54,95 @@ def perform_fisher_enrichment_for_column(df, column_index):
         print(f"Error: Specified column index {column_index} is out of range (0 to {num_cols-1}).")
         return None, None, None
 
-    try:
-        target_column = df.iloc[:, column_index]
-        background_columns_list = []
-        for i in range(num_cols):
-            if i != column_index:
-                background_columns_list.append(df.iloc[:, i])
-        background_columns = pd.concat(background_columns_list, axis=1).values.flatten()
-
-    except IndexError:
-        print("Error: Column index out of range. Please check DataFrame column count.")
-        return None, None, None
+    above, below = counts if counts is not None else column_threshold_counts(numeric_values(df), threshold)
 
-    # Ensure data is numeric type, if not, try to convert to numeric and handle conversion failures
-    try:
-        target_column_numeric = pd.to_numeric(target_column, errors='coerce').dropna()
-        background_numeric = pd.to_numeric(pd.Series(background_columns), errors='coerce').dropna() # Convert background data to Series and handle NaN
-    except Exception as e:
-        print(f"Data type conversion error: {e}. Please ensure that the relevant columns contain numeric data.")
-        return None, None, None
+    # Background = all columns minus the target column
+    observed_above_target, observed_below_equal_target = above[column_index], below[column_index]
+    observed_above_background = above.sum() - observed_above_target
+    observed_below_equal_background = below.sum() - observed_below_equal_target
 
-    if target_column_numeric.empty or background_numeric.empty:
+    if observed_above_target + observed_below_equal_target == 0 or observed_above_background + observed_below_equal_background == 0:
         print("Warning: After numeric conversion, the target column or background data is empty. Please check if there is non-numeric data in the data.")
         return None, None, None
 
-
     # Construct 2x2 contingency table
-    observed_above_05_target = target_column_numeric[target_column_numeric > 0.5].count()
-    observed_below_equal_05_target = target_column_numeric[target_column_numeric <= 0.5].count()
-    observed_above_05_background = background_numeric[background_numeric > 0.5].count()
-    observed_below_equal_05_background = background_numeric[background_numeric <= 0.5].count()
-
-    contingency_table = [[observed_above_05_target, observed_above_05_background],
-                         [observed_below_equal_05_target, observed_below_equal_05_background]]
+    contingency_table = [[observed_above_target, observed_above_background],
+                         [observed_below_equal_target, observed_below_equal_background]]
 
     # Perform Fisher's exact test (one-tailed test, testing for enrichment, i.e., alternative='greater')
     oddsratio, pvalue = fisher_exact(contingency_table, alternative='greater')
 
     # Construct DataFrame-formatted contingency table for easy display
     contingency_df = pd.DataFrame(contingency_table,
-                                  index=['>0.5', '<=0.5'],
+                                  index=[f'>{threshold}', f'<={threshold}'],
                                   columns=['Target Column', 'Background (Other Columns)'])
 
     return oddsratio, pvalue, contingency_df
 
 
+def threshold_sweep(df, thresholds, column_indices=None):
+    """
+    Fisher's exact enrichment test (alternative='greater') of every column at many thresholds in one pass.
+
+    Each column's numeric values are sorted once; the count above any threshold is then a
+    binary search in the sorted values, and the background counts are the totals over all
+    columns minus the target column. All (column, threshold) tables are tested in one batch.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing the data.
+        thresholds (array_like): Threshold values to test.
+        column_indices (list of int, optional): Columns to test (defaults to all columns).
+                                                The background always uses all other columns.
+
+    Returns:
+        pd.DataFrame: One row per (column, threshold) with 'Column Name', 'Threshold', the four
+                      contingency table counts, 'Odds Ratio', 'P-value' and 'FDR' (Benjamini-Hochberg
+                      over all rows).
+    """
+    values = numeric_values(df)
+    thresholds = np.asarray(thresholds, dtype=float)
+    column_indices = list(range(df.shape[1])) if column_indices is None else list(column_indices)
+
+    # Sorted-values index: NaN sorts to the end, so the first n_valid entries of each column are its numeric values
+    sorted_values = np.sort(values, axis=0)
+    n_valid = (~np.isnan(values)).sum(axis=0)
+    above = np.array([n_valid[j] - np.searchsorted(sorted_values[:n_valid[j], j], thresholds, side='right')
+                      for j in range(values.shape[1])])  # column x threshold
+    below = n_valid[:, None] - above
+
+    target_above, target_below = above[column_indices], below[column_indices]
+    background_above = above.sum(axis=0) - target_above
+    background_below = below.sum(axis=0) - target_below
+    odds_ratio, p_value = fisher_exact_batch(target_above, background_above, target_below, background_below,
+                                             alternative='greater')
+
+    results = pd.DataFrame({
+        'Column Name': np.repeat(df.columns[column_indices].to_numpy(), len(thresholds)),
+        'Threshold': np.tile(thresholds, len(column_indices)),
+        'Target Above': target_above.ravel(),
+        'Target Below or Equal': target_below.ravel(),
+        'Background Above': background_above.ravel(),
+        'Background Below or Equal': background_below.ravel(),
+        'Odds Ratio': odds_ratio,
+        'P-value': p_value,
+    })
+    # Tables with an empty target or background cannot be tested
+    results.loc[(results['Target Above'] + results['Target Below or Equal'] == 0)
+                | (results['Background Above'] + results['Background Below or Equal'] == 0), ['Odds Ratio', 'P-value']] = np.nan
+    tested = results['P-value'].notna()
+    results['FDR'] = np.nan
+    if tested.any():
+        results.loc[tested, 'FDR'] = multipletests(results.loc[tested, 'P-value'], method='fdr_bh')[1]
+    return results
+
+
 if __name__ == "__main__":
     excel_file_path = "complementary_and_config.xlsx"  # Replace with your Excel file path
     sheet_name = "raw data" # Specify Sheet name
     output_csv_file = "complementary_ratio_enrichment.csv" # Output CSV file name
+    threshold = 0.5 # Complementary ratio threshold of the per-column tests
+    sweep_thresholds = None # e.g. np.round(np.arange(0.05, 1.0, 0.05), 2) to also test many thresholds at once
+    sweep_output_csv_file = "complementary_ratio_threshold_sweep.csv"
     results_data = [] # List to store result data
 
     try:
@@ -80,9 +154,12 @@ if __name__ == "__main__":
     start_column_index = 1  # Index of the second column (starting from 0)
     end_column_index = 18   # Index of the 19th column (starting from 0)
 
+    # Convert to numbers and count values above/below the threshold once for all columns
+    counts = column_threshold_counts(numeric_values(df), threshold)
+
     for column_index in range(start_column_index, end_column_index + 1):
         col_name = df.columns[column_index] if column_index < len(df.columns) else f"Column {column_index + 1}" # Get column name, use default name if index out of range
-        odds_ratio, p_value, table = perform_fisher_enrichment_for_column(df, column_index)
+        odds_ratio, p_value, table = perform_fisher_enrichment_for_column(df, column_index, threshold, counts)
 
         if odds_ratio is not None:
             results_data.append([col_name, p_value]) # Store column name and p-value
@@ -91,16 +168,16 @@ if __name__ == "__main__":
             print("2x2 Contingency Table:")
             print(table)
             print("\nOdds Ratio: {:.4f}".format(odds_ratio))
-            print("P-value (One-tailed, testing for enrichment in >0.5): {:.4f}".format(p_value))
+            print("P-value (One-tailed, testing for enrichment in >{}): {:.4f}".format(threshold, p_value))
             print("-----------------------------------")
 
             alpha = 0.05  # Significance level
             if p_value < alpha:
                 print(f"P-value ({p_value:.4f}) < Significance level ({alpha}), reject the null hypothesis.")
-                print(f"Conclusion: Column '{col_name}' (Index: {column_index + 1}) data is significantly enriched in the range > 0.5 (compared to background values).")
+                print(f"Conclusion: Column '{col_name}' (Index: {column_index + 1}) data is significantly enriched in the range > {threshold} (compared to background values).")
             else:
                 print(f"P-value ({p_value:.4f}) >= Significance level ({alpha}), fail to reject the null hypothesis.")
-                print(f"Conclusion: There is not enough evidence to show that Column '{col_name}' (Index: {column_index + 1}) data is significantly enriched in the range > 0.5 (compared to background values).")
+                print(f"Conclusion: There is not enough evidence to show that Column '{col_name}' (Index: {column_index + 1}) data is significantly enriched in the range > {threshold} (compared to background values).")
         else:
             print(f"Column: '{col_name}' (Index: {column_index + 1}) - Fisher's Exact Test failed to execute successfully, please check error messages.")
         print("\n" + "="*50 + "\n") # Separator for each column's results
@@ -110,3 +187,10 @@ if __name__ == "__main__":
     results_df.to_csv(output_csv_file, index=False) # index=False prevents writing row index
 
     print(f"Results saved to CSV file: '{output_csv_file}'")
+
+    # Threshold sweep: all columns x all thresholds in one vectorized pass
+    if sweep_thresholds is not None:
+        column_indices = [i for i in range(start_column_index, end_column_index + 1) if i < len(df.columns)]
+        sweep_df = threshold_sweep(df, sweep_thresholds, column_indices)
+        sweep_df.to_csv(sweep_output_csv_file, index=False)
+        print(f"Threshold sweep results saved to CSV file: '{sweep_output_csv_file}'")
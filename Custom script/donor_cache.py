@@ -0,0 +1,91 @@
+import sqlite3
+import time
+
+# Lookup states stored in the cache
+#   ok                    - UID found and FASTA downloaded
+#   uid_found             - UID found, FASTA not downloaded yet (e.g. run interrupted between the two steps)
+#   uid_not_found         - no nuccore hit for the species
+#   fasta_download_failed - UID found, but no valid FASTA record came back
+#   error                 - the lookup or download raised an error (see 'message')
+retryable_statuses = ('uid_not_found', 'fasta_download_failed', 'error')
+
+
+class DonorCache:
+    """
+    On-disk SQLite cache of donor 16S lookups: species name -> UID -> FASTA, with status and timestamp.
+
+    Every record is committed as soon as it is written, so an interrupted run keeps all resolved lookups.
+
+    Args:
+        path (str): Path of the SQLite database file (created if missing).
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS lookups (
+                species TEXT PRIMARY KEY,
+                uid     TEXT,
+                fasta   TEXT,
+                status  TEXT NOT NULL,
+                message TEXT,
+                updated REAL NOT NULL
+            )""")
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def _write(self, species, uid, fasta, status, message=None):
+        with self.connection:  # Commits (checkpoints) the record
+            self.connection.execute(
+                "INSERT OR REPLACE INTO lookups (species, uid, fasta, status, message, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (species, uid, fasta, status, message, time.time()))
+
+    def get(self, species):
+        """
+        Cached record of a species as a dict (keys: species, uid, fasta, status, message, updated), or None.
+        """
+        row = self.connection.execute(
+            "SELECT species, uid, fasta, status, message, updated FROM lookups WHERE species = ?", (species,)).fetchone()
+        return dict(zip(['species', 'uid', 'fasta', 'status', 'message', 'updated'], row)) if row else None
+
+    def pending_searches(self, species_names, retry_failed=False):
+        """
+        Species that still need a UID search: not cached yet, or (with retry_failed) cached as
+        uid_not_found / fasta_download_failed / error.
+        """
+        statuses = dict(self.connection.execute("SELECT species, status FROM lookups").fetchall())
+        return [name for name in species_names
+                if name not in statuses or (retry_failed and statuses[name] in retryable_statuses)]
+
+    def pending_downloads(self, species_names):
+        """
+        species -> UID for the species whose UID is known but whose FASTA has not been downloaded.
+        """
+        wanted = set(species_names)
+        rows = self.connection.execute("SELECT species, uid FROM lookups WHERE status = 'uid_found'").fetchall()
+        return {species: uid for species, uid in rows if species in wanted}
+
+    def record_search(self, species, result):
+        """
+        Stores the result of a UID search: an accession, None (not found) or the exception raised.
+        """
+        if isinstance(result, Exception):
+            self._write(species, None, None, 'error', str(result))
+        elif result is None:
+            self._write(species, None, None, 'uid_not_found')
+        else:
+            self._write(species, result, None, 'uid_found')
+
+    def record_download(self, species, uid, fasta=None, error=None):
+        """
+        Stores the outcome of a FASTA download for a species whose UID was found.
+        """
+        if error is not None:
+            self._write(species, uid, None, 'error', str(error))
+        elif fasta and fasta.startswith(">"):
+            self._write(species, uid, fasta, 'ok')
+        else:
+            self._write(species, uid, None, 'fasta_download_failed')
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+from scipy.special import gammaln
+from statsmodels.stats.multitest import multipletests
+
+# Relative tolerance when comparing table probabilities in the two-sided test (as in R's fisher.test)
+two_sided_tolerance = 1e-7
+
+# Maximum number of (test x support) values held in memory at once
+chunk_elements = 1 << 22
+
+
+def _log_choose(n, k):
+    return gammaln(n + 1) - gammaln(k + 1) - gammaln(n - k + 1)
+
+
+def fisher_exact_batch(a, b, c, d, alternative='two-sided'):
+    """
+    Fisher's exact test of many 2x2 tables [[a, b], [c, d]] at once.
+
+    Gives the same odds ratios and p-values as scipy.stats.fisher_exact, table by table. The
+    count in cell a follows a hypergeometric distribution fixed by the table margins; its
+    log-pmf over the whole support is computed once per distinct set of margins and shared by
+    all tests with those margins. Tests are processed in chunks ordered by support size, so
+    memory stays bounded for any number of tests.
+
+    Args:
+        a, b, c, d (array_like): Non-negative integer cell counts, one value per table.
+        alternative (str): 'two-sided', 'less' or 'greater'.
+
+    Returns:
+        tuple: (odds_ratio, p_value) arrays. Tables with an empty row or column get NaN / 1.0.
+    """
+    if alternative not in ('two-sided', 'less', 'greater'):
+        raise ValueError(f"Unknown alternative '{alternative}'. Use 'two-sided', 'less' or 'greater'.")
+    a, b, c, d = (np.asarray(x, dtype=np.int64).ravel() for x in (a, b, c, d))
+    if min(np.min(x, initial=0) for x in (a, b, c, d)) < 0:
+        raise ValueError("All cell counts must be non-negative.")
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        odds_ratio = np.where((b > 0) & (c > 0), a * d / (b * c), np.inf)
+    p_value = np.ones(len(a))
+    empty = (a + b == 0) | (c + d == 0) | (a + c == 0) | (b + d == 0)
+    odds_ratio[empty] = np.nan
+
+    # Margins: population size, row 1 total and column 1 total
+    margins = np.column_stack([a + b + c + d, a + b, a + c])
+    tests = np.nonzero(~empty)[0]
+    if len(tests) == 0:
+        return odds_ratio, p_value
+    unique_margins, margin_of_test = np.unique(margins[tests], axis=0, return_inverse=True)
+    margin_of_test = margin_of_test.ravel()
+    M, n1, n = unique_margins.T
+    low = np.maximum(0, n - (M - n1))
+    support = np.minimum(n, n1) - low + 1
+
+    # Chunks of tests with similar support sizes
+    order = np.argsort(support[margin_of_test], kind='stable')
+    start = 0
+    while start < len(order):
+        width = support[margin_of_test[order[start]]]
+        stop = start + 1
+        while stop < len(order) and (stop - start + 1) * support[margin_of_test[order[stop]]] <= max(chunk_elements, width):
+            stop += 1
+        chunk = tests[order[start:stop]]
+        chunk_margins, row_of_test = np.unique(margin_of_test[order[start:stop]], return_inverse=True)
+        width = support[chunk_margins].max()
+
+        # Log-pmf table of every distinct set of margins in the chunk (-inf outside the support)
+        x = low[chunk_margins, None] + np.arange(width)
+        valid = x <= (low + support - 1)[chunk_margins, None]
+        Mc, n1c, nc = M[chunk_margins, None], n1[chunk_margins, None], n[chunk_margins, None]
+        with np.errstate(invalid='ignore'):
+            log_pmf = _log_choose(n1c, x) + _log_choose(Mc - n1c, nc - x) - _log_choose(Mc, nc)
+        log_pmf = np.where(valid, log_pmf, -np.inf)
+
+        rows = log_pmf[row_of_test.ravel()]
+        x_rows = x[row_of_test.ravel()]
+        observed = a[chunk][:, None]
+        if alternative == 'less':
+            mask = x_rows <= observed
+        elif alternative == 'greater':
+            mask = x_rows >= observed
+        else:
+            log_observed = np.take_along_axis(rows, observed - low[chunk_margins][row_of_test.ravel(), None], axis=1)
+            mask = rows <= log_observed + np.log1p(two_sided_tolerance)
+        p_value[chunk] = np.minimum(np.where(mask, np.exp(rows), 0).sum(axis=1), 1.0)
+        start = stop
+
+    return odds_ratio, p_value
+
+
+# Bottom-right cell of the 2x2 tables built by fisher_enrichment
+d_cell_options = ('group_complement', 'remainder')
+
+
+def fisher_enrichment(counts, totals=None, alternative='two-sided', fdr_method='fdr_bh', d_cell='group_complement'):
+    """
+    Fisher enrichment of every category in every group of a category x group count matrix.
+
+    For category i and group j the 2x2 table is
+        [[counts[i, j],                 totals[i] - counts[i, j]],
+         [group_total[j] - counts[i, j], d]]
+    where group_total[j] is the column sum. With d_cell='group_complement' (the table of the original
+    HGT_fishertest.py), d = grand_total - group_total[j]; with d_cell='remainder', d completes the
+    table to the grand total (grand_total - totals[i] - group_total[j] + counts[i, j]).
+    All tables are tested in one batch, and the p-values are FDR-corrected together.
+
+    Args:
+        counts (pd.DataFrame): Counts, one row per category (index) and one column per group.
+        totals (array_like, optional): Total count per category (defaults to the row sums).
+        alternative (str): 'two-sided', 'less' or 'greater' (enrichment).
+        fdr_method (str): Multiple testing correction passed to statsmodels' multipletests.
+        d_cell (str): 'group_complement' (default) or 'remainder', see above.
+
+    Returns:
+        pd.DataFrame: One row per (group, category), group-major, with 'Category', 'Group',
+                      'Count', 'Odds Ratio', 'P-value' and 'FDR'.
+    """
+    values = counts.to_numpy(dtype=np.int64)
+    totals = values.sum(axis=1) if totals is None else np.asarray(totals, dtype=np.int64)
+    group_totals = values.sum(axis=0)
+    grand_total = totals.sum()
+
+    # Group-major order: all categories of the first group, then the second group, ...
+    a = values.T.ravel()
+    b = np.tile(totals, values.shape[1]) - a
+    c = np.repeat(group_totals, values.shape[0]) - a
+    if d_cell == 'group_complement':
+        d = np.repeat(grand_total - group_totals, values.shape[0])
+    elif d_cell == 'remainder':
+        d = grand_total - a - b - c
+    else:
+        raise ValueError(f"Unknown d_cell '{d_cell}'. Use one of: {', '.join(d_cell_options)}.")
+    odds_ratio, p_value = fisher_exact_batch(a, b, c, d, alternative)
+
+    return pd.DataFrame({
+        'Category': np.tile(counts.index.to_numpy(), values.shape[1]),
+        'Group': np.repeat(counts.columns.to_numpy(), values.shape[0]),
+        'Count': a,
+        'Odds Ratio': odds_ratio,
+        'P-value': p_value,
+        'FDR': multipletests(p_value, method=fdr_method)[1],
+    })
+
+
+def read_count_matrix(path, sheet_name=0):
+    """
+    Reads a category x group count matrix from CSV or Excel; the first column holds the category names.
+    """
+    if str(path).lower().endswith(('.xlsx', '.xls')):
+        return pd.read_excel(path, sheet_name=sheet_name, index_col=0)
+    return pd.read_csv(path, index_col=0)
@@ -0,0 +1,179 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Relative tolerance of the objective between iterations (e1071::cmeans default reltol)
+default_tolerance = np.sqrt(np.finfo(float).eps)
+
+
+def standardise(data):
+    """
+    Standardises every gene (row) to mean 0 and standard deviation 1, as Mfuzz::standardise.
+
+    Genes with missing values or without variation (Mfuzz::filter.std with min.std = 0) are removed first.
+
+    Args:
+        data (pd.DataFrame): Expression table, one row per gene and one column per sample.
+
+    Returns:
+        pd.DataFrame: Standardised expression of the kept genes.
+    """
+    data = data.apply(pd.to_numeric, errors='coerce').dropna()
+    sd = data.std(axis=1, ddof=1)
+    data = data[sd > 0]
+    return data.sub(data.mean(axis=1), axis=0).div(sd[sd > 0], axis=0)
+
+
+def mestimate(n_genes, n_samples):
+    """
+    Fuzzifier m estimated from the data size (Mfuzz::mestimate, Schwaemmle and Jensen 2010).
+    """
+    N, D = n_genes, n_samples
+    return 1 + (1418 / N + 22.05) * D ** -2 + (12.33 / N + 0.243) * D ** (-0.0406 * np.log(N) - 0.1134)
+
+
+def _memberships(values, centers, m):
+    """
+    Fuzzy memberships u[i, k] = 1 / sum_j (d_ik / d_ij)^(2 / (m - 1)), with squared Euclidean distances d^2.
+    Returns the memberships and the squared distances.
+    """
+    distances = (np.sum(values ** 2, axis=1)[:, None] - 2 * values @ centers.T + np.sum(centers ** 2, axis=1)[None, :])
+    distances = np.maximum(distances, 0)
+    with np.errstate(divide='ignore'):
+        weights = distances ** (-1 / (m - 1))
+    # A gene lying on a center belongs fully to it
+    on_center = np.isinf(weights)
+    weights = np.where(on_center.any(axis=1)[:, None], on_center.astype(float), weights)
+    return weights / weights.sum(axis=1, keepdims=True), distances
+
+
+def cmeans(values, n_clusters, m, max_iter=100, tol=default_tolerance, seed=None):
+    """
+    Fuzzy c-means clustering (as e1071::cmeans, used by Mfuzz) from one random start.
+
+    Args:
+        values (np.ndarray): Gene x sample matrix (standardised).
+        n_clusters (int): Number of clusters.
+        m (float): Fuzzifier (> 1).
+        max_iter (int): Maximum number of iterations.
+        tol (float): Stops when the objective changes by less than tol relative to its value.
+        seed: Seed for the random choice of the initial centers (genes).
+
+    Returns:
+        dict: 'centers' (cluster x sample), 'membership' (gene x cluster), 'objective'
+              (sum of u^m * d^2), 'n_iter' and 'converged'.
+    """
+    rng = np.random.default_rng(seed)
+    centers = values[rng.choice(len(values), size=n_clusters, replace=False)]
+    membership, distances = _memberships(values, centers, m)
+    objective = np.sum(membership ** m * distances)
+    converged = False
+    for n_iter in range(1, max_iter + 1):
+        weights = membership ** m
+        centers = (weights.T @ values) / weights.sum(axis=0)[:, None]
+        membership, distances = _memberships(values, centers, m)
+        new_objective = np.sum(membership ** m * distances)
+        converged = abs(objective - new_objective) < tol * (objective + tol)
+        objective = new_objective
+        if converged:
+            break
+    return {'centers': centers, 'membership': membership, 'objective': objective, 'n_iter': n_iter,
+            'converged': converged}
+
+
+# Per-process state of the restart workers (set once by the pool initializer)
+_cmeans_context = {}
+
+
+def _init_cmeans_worker(values, n_clusters, m, max_iter, tol):
+    _cmeans_context.update(values=values, n_clusters=n_clusters, m=m, max_iter=max_iter, tol=tol)
+
+
+def _cmeans_restart(seed):
+    context = _cmeans_context
+    return cmeans(context['values'], context['n_clusters'], context['m'], context['max_iter'], context['tol'], seed)
+
+
+def fuzzy_cmeans(values, n_clusters, m=None, n_restarts=10, seed=0, max_iter=100, tol=default_tolerance,
+                 n_workers=None):
+    """
+    Fuzzy c-means with several random restarts run across a process pool; the restart with the lowest
+    objective is kept.
+
+    Every restart gets its own child of np.random.SeedSequence(seed), so the result does not depend
+    on the number of workers.
+
+    Args:
+        values (np.ndarray): Gene x sample matrix (standardised).
+        n_clusters (int): Number of clusters.
+        m (float, optional): Fuzzifier; estimated with mestimate when None.
+        n_restarts (int): Number of random starts.
+        seed (int): Seed for reproducible starts.
+        max_iter (int): Maximum number of iterations per start.
+        tol (float): Relative tolerance of the objective.
+        n_workers (int, optional): Number of worker processes (defaults to the number of CPUs; 1 runs serially).
+
+    Returns:
+        dict: The best run (see cmeans) plus 'm' and 'objectives' (objective of every restart).
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    if m is None:
+        m = mestimate(*values.shape)
+    seeds = np.random.SeedSequence(seed).spawn(n_restarts)
+    if n_workers == 1:
+        _init_cmeans_worker(values, n_clusters, m, max_iter, tol)
+        runs = [_cmeans_restart(s) for s in seeds]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers or os.cpu_count(), initializer=_init_cmeans_worker,
+                                 initargs=(values, n_clusters, m, max_iter, tol)) as executor:
+            runs = list(executor.map(_cmeans_restart, seeds))
+    best = min(runs, key=lambda run: run['objective'])
+    return dict(best, m=m, objectives=[run['objective'] for run in runs])
+
+
+def cluster_assignments(data, result):
+    """
+    Hard cluster assignments (highest membership, clusters numbered from 1) next to the expression values.
+
+    Args:
+        data (pd.DataFrame): Expression table of the clustered genes (rows in the order used for clustering).
+        result (dict): Result of fuzzy_cmeans.
+
+    Returns:
+        pd.DataFrame: `data` with 'Cluster', 'Membership' (highest membership) and one
+                      'Membership <k>' column per cluster.
+    """
+    membership = result['membership']
+    assignments = data.copy()
+    assignments['Cluster'] = membership.argmax(axis=1) + 1
+    assignments['Membership'] = membership.max(axis=1)
+    for k in range(membership.shape[1]):
+        assignments[f'Membership {k + 1}'] = membership[:, k]
+    return assignments
+
+
+if __name__ == "__main__":
+    # Expression table: first column = gene ID, one column per sample (same input as Clustergvis.R)
+    raw_data = pd.read_csv("all.csv", index_col=0)
+
+    n_clusters = 5          # cluster.num in Clustergvis.R
+    fuzzifier = None        # None estimates m as Mfuzz::mestimate
+    n_restarts = 20         # Random starts, run in parallel; the lowest objective is kept
+    seed = 1337             # Fixed seed for reproducible clusters
+
+    standardised = standardise(raw_data)
+    print(f"{len(raw_data) - len(standardised)} genes with missing values or no variation were removed.")
+
+    result = fuzzy_cmeans(standardised.to_numpy(), n_clusters, fuzzifier, n_restarts, seed)
+    print(f"m = {result['m']:.4f}, best objective = {result['objective']:.4f} "
+          f"({result['n_iter']} iterations, converged: {result['converged']})")
+
+    # Raw expression values with the cluster of every gene; use as input of ANOVA.py batch mode
+    # (excel_file_path = "fuzzy_cmeans_clusters.csv", batch_by = "Cluster", sample columns as groups)
+    assignments = cluster_assignments(raw_data.loc[standardised.index], result)
+    assignments.to_csv("fuzzy_cmeans_clusters.csv")
+    pd.DataFrame(result['centers'], columns=standardised.columns,
+                 index=[f"Cluster {k + 1}" for k in range(n_clusters)]).to_csv("fuzzy_cmeans_centers.csv")
+    print("Cluster assignments have been saved as 'fuzzy_cmeans_clusters.csv' (centers in 'fuzzy_cmeans_centers.csv')")
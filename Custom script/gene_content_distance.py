@@ -0,0 +1,162 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from presence_store import first_strain_column, open_presence_store, popcount
+
+# Output name of each supported metric
+metric_names = {"shared": "Shared_Gene", "jaccard": "Jaccard", "hamming": "Hamming"}
+
+
+def strain_order(strains, reference_labels):
+    """
+    Positions of `strains` in the order of `reference_labels` (e.g. the leaves of Genetic_Distance_Matrix.csv);
+    strains missing from the reference follow in their original order.
+    """
+    position = {str(label): k for k, label in enumerate(reference_labels)}
+    return np.array(sorted(range(len(strains)), key=lambda k: (position.get(str(strains[k]), len(position)), k)))
+
+
+def pair_distances(shared, size_rows, size_cols, metric):
+    """
+    Gene-content distances from the number of shared genes and the gene counts of both strains.
+
+    "shared" is 1 - shared / min(size) (Snel et al. 1999), "jaccard" is 1 - shared / union and
+    "hamming" is the number of gene clusters present in exactly one of the two strains.
+    """
+    size_rows, size_cols = size_rows[:, None].astype(np.float64), size_cols[None, :].astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if metric == "shared":
+            return 1 - shared / np.minimum(size_rows, size_cols)
+        if metric == "jaccard":
+            return 1 - shared / (size_rows + size_cols - shared)
+        if metric == "hamming":
+            return size_rows + size_cols - 2 * shared
+    raise ValueError(f"Unknown metric '{metric}'. Use one of: {', '.join(metric_names)}.")
+
+
+def shared_gene_counts(words_rows, words_cols, kernel="product", n_genes=None):
+    """
+    Number of genes shared by every pair of strains from two blocks of packed gene sets.
+
+    Args:
+        words_rows, words_cols (np.ndarray): Packed gene sets (PresenceStore.words layout).
+        kernel (str): "product" (unpacked 0/1 blocks multiplied with BLAS, X . Y^T) or
+                      "popcount" (popcount of the bitwise AND of every pair, word by word).
+        n_genes (int, optional): Number of genes (needed by the "product" kernel).
+
+    Returns:
+        np.ndarray: int64 matrix of shape (len(words_rows), len(words_cols)).
+    """
+    if kernel == "product":
+        # float32 holds integer counts exactly up to 2^24 genes
+        rows = np.unpackbits(words_rows.view(np.uint8), axis=1, count=n_genes).astype(np.float32)
+        cols = np.unpackbits(words_cols.view(np.uint8), axis=1, count=n_genes).astype(np.float32)
+        return np.rint(rows @ cols.T).astype(np.int64)
+    if kernel == "popcount":
+        return np.stack([popcount(row & words_cols).sum(axis=1, dtype=np.int64) for row in words_rows])
+    raise ValueError(f"Unknown kernel '{kernel}'. Use 'product' or 'popcount'.")
+
+
+# Per-process state of the tile workers (set once by the pool initializer)
+_distance_context = {}
+
+
+def _init_distance_worker(store, order, sizes, output_path, metric, kernel):
+    # The store is reopened in every worker, so the presence words are mapped rather than copied
+    _distance_context.update(words=store.words(), order=order, sizes=sizes, metric=metric, kernel=kernel,
+                             n_genes=store.n_genes, output=np.load(output_path, mmap_mode="r+"))
+
+
+def _strain_rows(start, stop):
+    words, order = _distance_context["words"], _distance_context["order"]
+    return words[start:stop] if order is None else words[order[start:stop]]
+
+
+def _distance_tile(tile):
+    row_start, row_stop, col_start, col_stop = tile
+    context = _distance_context
+    sizes, output = context["sizes"], context["output"]
+    shared = shared_gene_counts(_strain_rows(row_start, row_stop), _strain_rows(col_start, col_stop),
+                                context["kernel"], context["n_genes"])
+    block = pair_distances(shared, sizes[row_start:row_stop], sizes[col_start:col_stop], context["metric"]).astype(np.float32)
+    output[row_start:row_stop, col_start:col_stop] = block
+    output[col_start:col_stop, row_start:row_stop] = block.T
+    output.flush()
+    return tile
+
+
+def gene_content_distance_matrix(store, output_path, metric="jaccard", order=None, kernel="product", block_size=1024,
+                                 n_workers=None):
+    """
+    All-pairs gene-content distance between the strains of a presence store, computed tile by tile across a
+    process pool into a float32 memory-mapped .npy file.
+
+    Only tiles on or above the diagonal are computed; each one is mirrored into its transposed position.
+
+    Args:
+        store (PresenceStore): Presence store of the presence/absence table.
+        output_path (str): Path of the .npy file to create.
+        metric (str): "shared", "jaccard" or "hamming" (see pair_distances).
+        order (array_like, optional): Strain positions in output order (see strain_order); defaults to store order.
+        kernel (str): "product" or "popcount" (see shared_gene_counts).
+        block_size (int): Number of strains per tile side.
+        n_workers (int, optional): Number of worker processes (defaults to the number of CPUs).
+
+    Returns:
+        np.memmap: The (read-only) memory-mapped distance matrix.
+    """
+    # Genes per strain, block by block so the presence words are never held in memory at once
+    sizes = np.zeros(store.n_strains, dtype=np.int64)
+    for start in range(0, store.n_strains, block_size):
+        sizes[start:start + block_size] = popcount(store.words(start, start + block_size)).sum(axis=1, dtype=np.int64)
+    if order is not None:
+        order = np.asarray(order, dtype=np.int64)
+        sizes = sizes[order]
+    n = len(sizes)
+
+    output = np.lib.format.open_memmap(output_path, mode="w+", dtype=np.float32, shape=(n, n))
+    del output  # Workers reopen the file themselves
+
+    bounds = [(start, min(start + block_size, n)) for start in range(0, n, block_size)]
+    tiles = [(r0, r1, c0, c1) for i, (r0, r1) in enumerate(bounds) for (c0, c1) in bounds[i:]]
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_distance_worker,
+                             initargs=(store, order, sizes, output_path, metric, kernel)) as executor:
+        for _ in executor.map(_distance_tile, tiles):
+            pass
+
+    return np.load(output_path, mmap_mode="r")
+
+
+if __name__ == "__main__":
+    # --- Options ---
+    distance_metric = "jaccard"   # "shared" (1 - shared / smaller genome), "jaccard" or "hamming" (genes in only one strain)
+    use_hgt_subset = False        # True: only horizontally transferred genes ("HGT-genome distance")
+    kernel = "product"            # "product" (X . X^T with BLAS) or "popcount" (bitwise AND + popcount)
+    block_size = 1024             # Number of strains per tile side
+    strain_order_file = "Genetic_Distance_Matrix.csv"  # Output of Phylogenetic_distance.py; its strain order is used if present
+
+    if use_hgt_subset:
+        hgt_file = 'All_HGT_present_absence.csv'  # Roary layout: strain columns follow 'Avg group size nuc'
+        store = open_presence_store(hgt_file, first_strain_column(hgt_file), metadata_columns=['No. isolates', 'COG', 'Avg group size nuc'])
+        output_stem = f"HGT_Gene_Content_{metric_names[distance_metric]}_Distance_Matrix"
+    else:
+        store = open_presence_store('present_absent.xlsx', 6)  # Same input as Total_sequence_length.py
+        output_stem = f"Gene_Content_{metric_names[distance_metric]}_Distance_Matrix"
+
+    order = None
+    if os.path.exists(strain_order_file):
+        reference_labels = pd.read_csv(strain_order_file, index_col=0, usecols=[0]).index.astype(str).str.strip()
+        order = strain_order([s.strip() for s in store.strains], reference_labels)
+        missing = len(set(s.strip() for s in store.strains) - set(reference_labels))
+        if missing:
+            print(f"{missing} strains are not in '{strain_order_file}' and were placed after the tree strains.")
+    strains = [store.strains[k] for k in order] if order is not None else store.strains
+
+    gene_content_distance_matrix(store, f"{output_stem}.npy", distance_metric, order, kernel, block_size)
+    # Strain order of the matrix rows/columns
+    with open(f"{output_stem}_labels.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(map(str, strains)) + "\n")
+    print(f"Gene-content distance matrix has been saved as '{output_stem}.npy' (strain order in '{output_stem}_labels.txt')")
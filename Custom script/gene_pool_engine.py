@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from cog_index import build_cog_index, cog_letters, cog_matrix
+from presence_store import first_strain_column, open_presence_store
+
+# COG functional gene cluster classification
+cog_functions = list(cog_letters)
+
+
+def cumulative_threshold_table(data, cog_index=None, isolates_col='No. isolates', cog_col='COG', length_col='Avg group size nuc'):
+    """
+    Builds per-threshold gene counts and length sums for every 'No. isolates' cut-off in a single pass.
+
+    Each gene cluster is binned once by the largest integer threshold it still satisfies
+    ('No. isolates' >= i), and the bins are turned into "at least i isolates" totals with
+    reverse cumulative sums. The thresholds run from 1 to the observed maximum of 'No. isolates'.
+
+    Args:
+        data (pd.DataFrame): Gene cluster table (Roary-style presence/absence with a COG column).
+        cog_index (CogIndex, optional): Precomputed COG index of `data` (see cog_index.py).
+                                        Built from the COG column if not given.
+        isolates_col (str): Name of the 'No. isolates' column.
+        cog_col (str): Name of the COG category column.
+        length_col (str): Name of the average nucleotide length column.
+
+    Returns:
+        pd.DataFrame: Indexed by threshold, with columns 'Total_Count', 'Total_LenSum', 'Total_LenN'
+                      and '<COG>_Count', '<COG>_LenSum', '<COG>_LenN' for every COG letter.
+                      '_LenN' counts the genes with a non-missing length.
+    """
+    isolates = pd.to_numeric(data[isolates_col], errors='coerce').to_numpy(dtype=float)
+    valid = ~np.isnan(isolates)
+    max_isolates = int(np.floor(isolates[valid].max())) if valid.any() else 0
+    thresholds = np.arange(1, max_isolates + 1)
+
+    # Bin index = largest threshold satisfied; genes below 1 isolate never pass any threshold
+    bins = np.floor(np.where(valid, isolates, 0)).astype(np.int64)
+    keep = bins >= 1
+    bins = bins[keep]
+
+    lengths = data[length_col].to_numpy(dtype=float)[keep]
+    has_length = ~np.isnan(lengths)
+    lengths = np.where(has_length, lengths, 0.0)
+    if cog_index is None:
+        cog_index = build_cog_index(data[cog_col])
+    in_cogs = cog_matrix(cog_index, cog_functions)[keep]
+
+    def reverse_cumsum(weights):
+        counts = np.bincount(bins, weights=weights, minlength=max_isolates + 1)
+        return counts[::-1].cumsum()[::-1][1:]
+
+    table = {
+        'Total_Count': reverse_cumsum(None).astype(np.int64),
+        'Total_LenSum': reverse_cumsum(lengths),
+        'Total_LenN': reverse_cumsum(has_length.astype(float)).astype(np.int64),
+    }
+    for k, func in enumerate(cog_functions):
+        in_cog = in_cogs[:, k]
+        table[f'{func}_Count'] = reverse_cumsum(in_cog.astype(float)).astype(np.int64)
+        table[f'{func}_LenSum'] = reverse_cumsum(np.where(in_cog, lengths, 0.0))
+        table[f'{func}_LenN'] = reverse_cumsum((in_cog & has_length).astype(float)).astype(np.int64)
+
+    return pd.DataFrame(table, index=pd.Index(thresholds, name=isolates_col))
+
+
+def gene_pool_counts(table):
+    """
+    Number of gene clusters per COG category for each 'No. isolates' threshold (HGT_Functional_Gene_Counts.csv).
+    """
+    output_data = {'No. isolates': table.index.to_numpy()}
+    for func in cog_functions:
+        output_data[f'{func}_Count'] = table[f'{func}_Count'].to_numpy()
+    output_data['Total_Count'] = table['Total_Count'].to_numpy()
+    return pd.DataFrame(output_data)
+
+
+def gene_pool_proportion(table):
+    """
+    Proportion of gene clusters per COG category for each 'No. isolates' threshold (HGT_Functional_Gene_Ratio.csv).
+    'Total_Ratio' holds the number of gene clusters passing the threshold.
+    """
+    total = table['Total_Count'].to_numpy()
+    output_data = {'No. isolates': table.index.to_numpy()}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for func in cog_functions:
+            output_data[f'{func}_Ratio'] = np.where(total > 0, table[f'{func}_Count'].to_numpy() / total, 0)
+    output_data['Total_Ratio'] = total
+    return pd.DataFrame(output_data)
+
+
+def gene_pool_average_length(table):
+    """
+    Mean 'Avg group size nuc' per COG category for each 'No. isolates' threshold (HGT_Average_Length.csv).
+    Categories without any gene cluster at a threshold are reported as 0, as in the original script.
+    """
+    output_data = {'No. isolates': table.index.to_numpy()}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for func in cog_functions:
+            mean = table[f'{func}_LenSum'].to_numpy() / table[f'{func}_LenN'].to_numpy()
+            output_data[f'{func}_Avg_Nuc'] = np.where(table[f'{func}_Count'].to_numpy() > 0, mean, 0)
+        output_data['Overall_Avg_Nuc'] = table['Total_LenSum'].to_numpy() / table['Total_LenN'].to_numpy()
+    return pd.DataFrame(output_data)
+
+
+if __name__ == "__main__":
+    # Read the CSV file once (through its presence store) and write all three gene pool tables
+    file_path = 'All_HGT_present_absence.csv'
+    first_strain_col_index = first_strain_column(file_path)  # Roary layout: strain columns follow 'Avg group size nuc'
+    store = open_presence_store(file_path, first_strain_col_index, metadata_columns=['No. isolates', 'COG', 'Avg group size nuc'])
+    table = cumulative_threshold_table(store.metadata_frame(), store.cog_index('COG'))
+
+    for output_df, output_file_path in [(gene_pool_counts(table), 'HGT_Functional_Gene_Counts.csv'),
+                                        (gene_pool_proportion(table), 'HGT_Functional_Gene_Ratio.csv'),
+                                        (gene_pool_average_length(table), 'HGT_Average_Length.csv')]:
+        output_df.to_csv(output_file_path, index=False)
+        print(f'Results saved to {output_file_path}')
@@ -0,0 +1,253 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.spatial.distance import pdist, squareform
+from scipy.stats import rankdata
+
+from newick_tree import load_tree
+from Phylogenetic_distance import patristic_distance_matrix
+
+# Maximum number of matrix elements gathered at once per permutation batch
+batch_elements = 1 << 24
+# Extensions read as Newick trees (patristic distances between the leaves)
+tree_extensions = (".nwk", ".newick", ".tre", ".tree")
+
+
+def load_distance_matrix(path):
+    """
+    Reads a distance matrix written by the *_distance.py scripts.
+
+    Args:
+        path (str): CSV file with strain labels as index and header, a .npy file from the blocked
+                    mode with its '<stem>_labels.txt' label file next to it, or a Newick tree
+                    (patristic distances as Phylogenetic_distance.py, through the cached array tree).
+
+    Returns:
+        pd.DataFrame: Square matrix indexed by strain label (labels as stripped strings).
+    """
+    if str(path).endswith(".npy"):
+        with open(f"{os.path.splitext(path)[0]}_labels.txt", encoding="utf-8") as f:
+            labels = [line.strip() for line in f if line.strip()]
+        matrix = pd.DataFrame(np.load(path, mmap_mode="r").astype(np.float64), index=labels, columns=labels)
+    elif str(path).lower().endswith(tree_extensions):
+        labels, values = patristic_distance_matrix(load_tree(path))
+        matrix = pd.DataFrame(values, index=labels, columns=labels)
+    else:
+        matrix = pd.read_csv(path, index_col=0)
+    matrix.index = matrix.index.astype(str).str.strip()
+    matrix.columns = matrix.columns.astype(str).str.strip()
+    return matrix.loc[:, matrix.index]
+
+
+def distance_from_table(table, metric="euclidean"):
+    """
+    Distance matrix between the rows (strains) of a strain x variable table, e.g. relative fitness values.
+    """
+    values = table.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    labels = table.index.astype(str).str.strip()
+    return pd.DataFrame(squareform(pdist(values, metric=metric)), index=labels, columns=labels)
+
+
+def align_matrices(matrices):
+    """
+    Restricts distance matrices to the strains present in all of them, in the order of the first one.
+
+    Args:
+        matrices (dict): Name -> square pd.DataFrame indexed by strain label.
+
+    Returns:
+        dict: Name -> aligned np.ndarray, plus the shared labels under the key None.
+    """
+    frames = list(matrices.values())
+    shared = [label for label in frames[0].index if all(label in frame.index for frame in frames[1:])]
+    if len(shared) < 3:
+        raise ValueError(f"Only {len(shared)} strains are shared by all matrices; at least 3 are needed.")
+    aligned = {}
+    for name, frame in matrices.items():
+        values = frame.loc[shared, shared].to_numpy(dtype=np.float64)
+        if np.isnan(values).any():
+            raise ValueError(f"Distance matrix '{name}' contains NaN for the shared strains.")
+        aligned[name] = values
+    aligned[None] = shared
+    return aligned
+
+
+def _weights(matrix, method):
+    """
+    Upper triangle of a distance matrix, centred and scaled to unit norm, laid out as a square matrix
+    (zeros on and below the diagonal), so that the Pearson r with any matrix X is sum(X * weights).
+    """
+    upper = np.triu_indices(len(matrix), k=1)
+    values = matrix[upper]
+    if method == "spearman":
+        values = rankdata(values)
+    elif method != "pearson":
+        raise ValueError(f"Unknown method '{method}'. Use 'pearson' or 'spearman'.")
+    centred = values - values.mean()
+    weights = np.zeros(matrix.shape)
+    weights[upper] = centred / np.linalg.norm(centred)
+    return weights
+
+
+def _ranked(matrix, method):
+    # The permuted matrix, in the form the weights are applied to
+    if method == "pearson":
+        return matrix
+    upper = np.triu_indices(len(matrix), k=1)
+    ranked = np.zeros(matrix.shape)
+    ranked[upper] = rankdata(matrix[upper])
+    return ranked + ranked.T
+
+
+# Per-process state of the permutation workers (set once by the pool initializer)
+_mantel_context = {}
+
+
+def _init_mantel_worker(matrix, weights):
+    _mantel_context["matrix"] = matrix
+    _mantel_context["weights"] = weights
+
+
+def _permutation_batch(task):
+    """
+    Correlations of `size` random symmetric permutations of the matrix with every weight matrix.
+    """
+    seed, size = task
+    matrix, weights = _mantel_context["matrix"], _mantel_context["weights"]
+    n = len(matrix)
+    rng = np.random.default_rng(seed)
+    step = max(1, batch_elements // (n * n))
+    results = []
+    for start in range(0, size, step):
+        permutations = rng.permuted(np.tile(np.arange(n), (min(step, size - start), 1)), axis=1)
+        permuted = matrix[permutations[:, :, None], permutations[:, None, :]]
+        results.append(np.stack([np.einsum("bij,ij->b", permuted, w) for w in weights], axis=1))
+    return np.concatenate(results)
+
+
+def permutation_correlations(x, others, n_permutations=9999, method="pearson", seed=0, batch_size=250,
+                             n_workers=None):
+    """
+    Correlations of the upper triangles of `x` and each matrix in `others`, observed and under permutations
+    of the strains (rows and columns together) of `x`.
+
+    Permutations run in batches of `batch_size` across a process pool. Every batch gets its own child
+    of np.random.SeedSequence(seed), so results do not depend on the number of workers.
+
+    Returns:
+        tuple: (observed, permuted) with observed of shape (len(others),) and permuted of shape
+               (n_permutations, len(others)).
+    """
+    x = _ranked(np.asarray(x, dtype=np.float64), method)
+    weights = [_weights(np.asarray(other, dtype=np.float64), method) for other in others]
+    # Permuting x keeps the values of its upper triangle, so x is scaled once by their centred norm;
+    # centring x itself is not needed because the weights sum to 0
+    upper = x[np.triu_indices(len(x), k=1)]
+    matrix = x / np.linalg.norm(upper - upper.mean())
+    observed = np.array([np.sum(matrix * w) for w in weights])
+
+    sizes = [min(batch_size, n_permutations - start) for start in range(0, n_permutations, batch_size)]
+    tasks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+    if n_workers == 1:
+        _init_mantel_worker(matrix, weights)
+        permuted = [_permutation_batch(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_mantel_worker,
+                                 initargs=(matrix, weights)) as executor:
+            permuted = list(executor.map(_permutation_batch, tasks))
+    return observed, np.concatenate(permuted or [np.empty((0, len(others)))]).reshape(-1, len(others))
+
+
+def _permutation_p(observed, permuted, alternative):
+    if alternative == "greater":
+        exceed = np.sum(permuted >= observed)
+    elif alternative == "two-sided":
+        exceed = np.sum(np.abs(permuted) >= np.abs(observed))
+    else:
+        raise ValueError(f"Unknown alternative '{alternative}'. Use 'greater' or 'two-sided'.")
+    return (exceed + 1) / (len(permuted) + 1)
+
+
+def mantel_test(x, y, n_permutations=9999, method="pearson", alternative="greater", seed=0, n_workers=None):
+    """
+    Mantel test between two aligned distance matrices (p-value as in vegan::mantel: (exceedances + 1) / (permutations + 1)).
+
+    Returns:
+        tuple: (r, p)
+    """
+    observed, permuted = permutation_correlations(x, [y], n_permutations, method, seed, n_workers=n_workers)
+    return observed[0], _permutation_p(observed[0], permuted[:, 0], alternative)
+
+
+def partial_mantel_test(x, y, z, n_permutations=9999, method="pearson", alternative="greater", seed=0,
+                        n_workers=None):
+    """
+    Partial Mantel test between x and y controlling for z (as vegan::mantel.partial, permuting x).
+
+    Returns:
+        tuple: (r, p)
+    """
+    observed, permuted = permutation_correlations(x, [y, z], n_permutations, method, seed, n_workers=n_workers)
+    r_yz = np.sum(_weights(np.asarray(y, dtype=np.float64), method) * _weights(np.asarray(z, dtype=np.float64), method))
+
+    def partial(r_xy, r_xz):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (r_xy - r_xz * r_yz) / np.sqrt((1 - r_xz ** 2) * (1 - r_yz ** 2))
+
+    r = partial(observed[0], observed[1])
+    return r, _permutation_p(r, partial(permuted[:, 0], permuted[:, 1]), alternative)
+
+
+def mantel_pairs(matrices, control=None, n_permutations=9999, method="pearson", alternative="greater", seed=0,
+                 n_workers=None):
+    """
+    (Partial) Mantel test of every pair of distance matrices, after aligning them by strain label.
+
+    Args:
+        matrices (dict): Name -> square pd.DataFrame indexed by strain label.
+        control (str, optional): Name of a matrix in `matrices` to control for (partial Mantel test);
+                                 it is not tested itself.
+        n_permutations, method, alternative, seed, n_workers: See mantel_test.
+
+    Returns:
+        pd.DataFrame: One row per pair with 'Matrix 1', 'Matrix 2', 'Control', 'N Strains', 'r' and 'p'.
+    """
+    aligned = align_matrices(matrices)
+    names = [name for name in matrices if name != control]
+    rows = []
+    for first, second in itertools.combinations(names, 2):
+        if control is None:
+            r, p = mantel_test(aligned[first], aligned[second], n_permutations, method, alternative, seed, n_workers)
+        else:
+            r, p = partial_mantel_test(aligned[first], aligned[second], aligned[control], n_permutations, method,
+                                       alternative, seed, n_workers)
+        rows.append({"Matrix 1": first, "Matrix 2": second, "Control": control or "",
+                     "N Strains": len(aligned[None]), "r": r, "p": p})
+    return pd.DataFrame(rows, columns=["Matrix 1", "Matrix 2", "Control", "N Strains", "r", "p"])
+
+
+if __name__ == "__main__":
+    # Distance matrices written by Phenotypic_distance.py, Phylogenetic_distance.py and Transcriptomic_distance.py
+    # (a Newick file such as "PAN_PHYLOGENY_MOD.nwk" can be given instead of Genetic_Distance_Matrix.csv)
+    matrix_files = {
+        "Phenotypic": "Phenotypic_Manhattan_Distance_Matrix.csv",
+        "Phylogenetic": "Genetic_Distance_Matrix.csv",
+        "Transcriptomic": "Bacteria_Expression_Distance_Matrix.csv",
+    }
+    fitness_file = None             # Optional strain x fitness table (first column = strain), compared as Euclidean distances
+    control_matrix = None           # Name of a matrix to control for (partial Mantel test), e.g. "Phylogenetic"
+    n_permutations = 9999
+    method = "pearson"              # "pearson" or "spearman"
+    seed = 1337                     # Fixed seed for reproducible p-values
+
+    matrices = {name: load_distance_matrix(path) for name, path in matrix_files.items()}
+    if fitness_file is not None:
+        matrices["Fitness"] = distance_from_table(pd.read_csv(fitness_file, index_col=0))
+
+    results_df = mantel_pairs(matrices, control_matrix, n_permutations, method, seed=seed)
+    results_df.to_csv("Mantel_Test_Results.csv", index=False)
+    print(results_df.to_string(index=False))
+    print("Mantel test results have been saved as 'Mantel_Test_Results.csv'")
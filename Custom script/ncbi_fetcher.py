@@ -0,0 +1,212 @@
+import json
+import random
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+# NCBI E-utilities endpoint; point it at a local stand-in server for testing
+eutils_base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+
+# HTTP status codes worth retrying (rate limited or temporary server problems)
+retry_status_codes = {429, 500, 502, 503, 504}
+
+
+def body_error(text):
+    """
+    Error message of an E-utilities JSON error body (e.g. {"error": "API rate limit exceeded"}), which NCBI
+    can send with HTTP status 200; None for any other response.
+    """
+    if not text.lstrip().startswith("{"):
+        return None
+    try:
+        body = json.loads(text)
+    except ValueError:
+        return None
+    return str(body["error"]) if isinstance(body, dict) and "error" in body else None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: at most `rate` requests per second on average, with bursts up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a token is available, then takes it.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class EntrezFetcher:
+    """
+    Concurrent NCBI E-utilities client for 16S lookups, sharing one token-bucket rate limit across threads.
+
+    Args:
+        email (str): Contact e-mail (required by NCBI).
+        api_key (str): NCBI API key; raises the limit from 3 to 10 requests per second.
+        base_url (str): E-utilities base URL.
+        rate (float, optional): Requests per second (defaults to NCBI's limit for the API key setting).
+        max_retries (int): Retries per request on network errors, retryable HTTP status codes and JSON error bodies.
+        backoff (float): Base delay in seconds of the exponential backoff between retries.
+        timeout (float): Timeout in seconds of every HTTP request.
+        n_workers (int): Number of concurrent threads.
+    """
+
+    def __init__(self, email, api_key="", base_url=eutils_base_url, rate=None, max_retries=5, backoff=1.0,
+                 timeout=60, n_workers=8):
+        self.email = email
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/") + "/"
+        self.bucket = TokenBucket(rate or (10 if api_key else 3))
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.n_workers = n_workers
+
+    def request(self, endpoint, params):
+        """
+        POSTs `params` to an E-utility (e.g. "esearch.fcgi") and returns the response text.
+        Retries with exponential backoff (and jitter) on network errors, retryable status codes and
+        JSON error bodies (see body_error), which are treated like a 429.
+        """
+        params = dict(params, tool="HGT_donors", email=self.email)
+        if self.api_key:
+            params["api_key"] = self.api_key
+        data = urlencode(params).encode("utf-8")
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                with urlopen(Request(self.base_url + endpoint, data=data), timeout=self.timeout) as response:
+                    text = response.read().decode("utf-8")
+                error = body_error(text)
+                if error is None:
+                    return text
+                if attempt == self.max_retries:
+                    raise RuntimeError(f"{endpoint} failed: {error}")
+            except HTTPError as e:
+                if e.code not in retry_status_codes or attempt == self.max_retries:
+                    raise
+            except URLError:
+                if attempt == self.max_retries:
+                    raise
+            time.sleep(self.backoff * 2 ** attempt * (1 + random.random()))
+
+    def search_16s(self, species_name):
+        """
+        Accession.version of the top nuccore hit for "<species>[Organism] AND 16S[Title]", or None.
+        """
+        text = self.request("esearch.fcgi", {"db": "nuccore", "term": f"{species_name}[Organism] AND 16S[Title]",
+                                             "retmax": 1, "retmode": "json", "idtype": "acc"})
+        result = json.loads(text)["esearchresult"]
+        if result.get("ERROR"):
+            raise RuntimeError(f"esearch failed: {result['ERROR']}")
+        id_list = result.get("idlist", [])
+        return id_list[0] if id_list else None
+
+    def search_all(self, species_names, on_result=None):
+        """
+        Runs search_16s for all names concurrently.
+
+        Args:
+            species_names (list of str): Species names to look up.
+            on_result (callable, optional): Called as on_result(name, result) in the calling thread
+                                            as soon as each lookup finishes (e.g. to checkpoint it).
+
+        Returns:
+            dict: species name -> accession (None if not found) or the exception raised for it.
+        """
+        def search(name):
+            try:
+                return self.search_16s(name)
+            except Exception as e:
+                return e
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            futures = {executor.submit(search, name): name for name in species_names}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if on_result is not None:
+                    on_result(futures[future], results[futures[future]])
+        return {name: results[name] for name in species_names}
+
+    def fetch_fasta_batch(self, uids):
+        """
+        Downloads the FASTA records of a batch of accessions with one epost + one efetch (history server).
+
+        Returns:
+            dict: accession -> FASTA text, for the accessions that came back.
+        """
+        post = ET.fromstring(self.request("epost.fcgi", {"db": "nuccore", "id": ",".join(uids)}))
+        error = post.findtext("ERROR")
+        if error:
+            raise RuntimeError(f"epost failed: {error}")
+        text = self.request("efetch.fcgi", {"db": "nuccore", "query_key": post.findtext("QueryKey"),
+                                            "WebEnv": post.findtext("WebEnv"), "rettype": "fasta", "retmode": "text"})
+
+        # Match records to the requested accessions through the first word of the FASTA header
+        wanted = {uid: uid for uid in uids}
+        wanted.update({uid.split(".")[0]: uid for uid in uids})
+        records = {}
+        for record in text.split("\n>"):
+            record = record if record.startswith(">") else ">" + record
+            header_id = record[1:].split(None, 1)[0] if len(record) > 1 else ""
+            uid = wanted.get(header_id) or wanted.get(header_id.split(".")[0])
+            if uid:
+                records[uid] = record.rstrip("\n") + "\n"
+        return records
+
+    def fetch_all(self, uids, batch_size=200, on_batch=None):
+        """
+        Downloads the FASTA records of all accessions in concurrent batches.
+
+        Args:
+            uids (list of str): Accessions to download.
+            batch_size (int): Number of accessions per epost/efetch call.
+            on_batch (callable, optional): Called as on_batch(batch, records, error) in the calling
+                                           thread as soon as each batch finishes.
+
+        Returns:
+            tuple: (records, errors) where records maps accession -> FASTA text and
+                   errors maps accession -> exception for batches that failed.
+        """
+        uids = list(dict.fromkeys(uids))
+        batches = [uids[start:start + batch_size] for start in range(0, len(uids), batch_size)]
+
+        def fetch(batch):
+            try:
+                return batch, self.fetch_fasta_batch(batch), None
+            except Exception as e:
+                return batch, {}, e
+
+        records, errors = {}, {}
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            for future in as_completed([executor.submit(fetch, batch) for batch in batches]):
+                batch, batch_records, error = future.result()
+                records.update(batch_records)
+                if error is not None:
+                    errors.update({uid: error for uid in batch})
+                if on_batch is not None:
+                    on_batch(batch, batch_records, error)
+        return records, errors
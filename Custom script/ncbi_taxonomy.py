@@ -0,0 +1,205 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+# Taxonomic levels of the HGT donor table, from closest to most distant
+taxonomic_levels = ['Species', 'Genus', 'Family', 'Order', 'Class', 'Phylum']
+
+# NCBI taxonomy ID of Lactiplantibacillus plantarum
+reference_taxid = 1590
+
+
+def name_hash(names):
+    """
+    64-bit hashes of taxon names (case-insensitive, surrounding whitespace ignored).
+    """
+    return np.array([int.from_bytes(hashlib.blake2b(str(name).strip().lower().encode('utf-8'), digest_size=8).digest(), 'little')
+                     for name in names], dtype=np.uint64)
+
+
+def _read_dmp(path, columns):
+    # NCBI .dmp files separate fields with "\t|\t"; splitting on tabs puts the fields at even positions
+    return pd.read_csv(path, sep='\t', header=None, usecols=columns, quoting=3, dtype=str,
+                       keep_default_na=False, na_filter=False)
+
+
+class Taxonomy:
+    """
+    Array-backed NCBI taxonomy: parent and rank arrays indexed by taxonomy ID, plus a sorted
+    name-hash index for name lookups.
+
+    Attributes:
+        parent (np.ndarray): parent[taxid] = parent taxid (the root is its own parent, 0 = unused ID).
+        rank (np.ndarray): rank[taxid] = index into rank_names.
+        rank_names (list of str): NCBI rank names ('species', 'genus', ...).
+    """
+
+    def __init__(self, parent, rank, rank_names, hashes, hash_taxids):
+        self.parent = parent
+        self.rank = rank
+        self.rank_names = list(rank_names)
+        self.hashes = hashes
+        self.hash_taxids = hash_taxids
+        self.max_depth = 0
+        current = np.nonzero(parent)[0]
+        while len(current):  # Depth of the deepest node, which bounds every upward walk
+            current = np.unique(parent[current[parent[current] != current]])
+            self.max_depth += 1
+
+    def taxids(self, names):
+        """
+        Taxonomy IDs of taxon names (scientific names and synonyms); 0 where a name is unknown.
+        """
+        hashes = name_hash(names)
+        positions = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+        return np.where(self.hashes[positions] == hashes, self.hash_taxids[positions], 0)
+
+    def lineage(self, taxid):
+        """
+        Taxonomy IDs from `taxid` up to the root.
+        """
+        lineage = [int(taxid)]
+        while self.parent[lineage[-1]] not in (0, lineage[-1]):
+            lineage.append(int(self.parent[lineage[-1]]))
+        return lineage
+
+    def ancestor_at_rank(self, taxids, rank_name):
+        """
+        Ancestor of each taxid at the given rank (the taxid itself if it has that rank); 0 if there is none.
+        """
+        current = np.asarray(taxids, dtype=np.int64).copy()
+        if rank_name not in self.rank_names:
+            return np.zeros_like(current)
+        code = self.rank_names.index(rank_name)
+        ancestor = np.zeros_like(current)
+        for _ in range(self.max_depth + 1):
+            hit = (ancestor == 0) & (current > 0) & (self.rank[current] == code)
+            ancestor[hit] = current[hit]
+            current = self.parent[current]
+        return ancestor
+
+    def divergence_level(self, taxids, reference=reference_taxid, levels=taxonomic_levels):
+        """
+        Taxonomic level at which each taxon diverges from the reference taxon.
+
+        The level is the most inclusive of `levels` at which the taxon and the reference belong to
+        different taxa, e.g. 'Genus' for another genus of the same family, 'Phylum' for another phylum.
+        Levels missing from the lineage of the taxon or of the reference are skipped (a missing rank is
+        not evidence of divergence). If a skipped level lies between the last shared level and the first
+        differing one, the divergence level is ambiguous and the taxon gives None, as do taxa in the same
+        species as the reference and unknown taxa (taxid 0).
+
+        Returns:
+            np.ndarray: Level name (or None) per taxid.
+        """
+        taxids = np.asarray(taxids, dtype=np.int64)
+        result = np.full(len(taxids), None, dtype=object)
+        decided = taxids <= 0
+        gap = np.zeros(len(taxids), dtype=bool)  # A level was missing since the last shared one
+        for level in reversed(levels):  # From the most inclusive level downwards
+            ancestors = self.ancestor_at_rank(taxids, level.lower())
+            reference_ancestor = self.ancestor_at_rank([reference], level.lower())[0]
+            missing = (ancestors == 0) | (reference_ancestor == 0)
+            differs = ~decided & ~missing & (ancestors != reference_ancestor)
+            result[differs & ~gap] = level
+            decided |= differs
+            gap = (gap | missing) & ~(~missing & (ancestors == reference_ancestor))
+        return result
+
+
+def load_taxonomy(taxdump_dir):
+    """
+    Loads an NCBI taxonomy dump (nodes.dmp, names.dmp and, if present, merged.dmp).
+
+    The parsed arrays are cached in '<taxdump_dir>/taxonomy_index.npz' and reused until
+    nodes.dmp or names.dmp change (size or modification time).
+
+    Args:
+        taxdump_dir (str): Folder of the extracted taxdump archive.
+
+    Returns:
+        Taxonomy: The loaded taxonomy.
+    """
+    nodes_path = os.path.join(taxdump_dir, 'nodes.dmp')
+    names_path = os.path.join(taxdump_dir, 'names.dmp')
+    merged_path = os.path.join(taxdump_dir, 'merged.dmp')
+    cache_path = os.path.join(taxdump_dir, 'taxonomy_index.npz')
+    signature = np.array([value for path in (nodes_path, names_path)
+                          for value in (os.stat(path).st_size, os.stat(path).st_mtime_ns)], dtype=np.int64)
+
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            if np.array_equal(cached['signature'], signature):
+                return Taxonomy(cached['parent'], cached['rank'], cached['rank_names'].tolist(),
+                                cached['hashes'], cached['hash_taxids'])
+
+    print(f"Building taxonomy index from '{taxdump_dir}' ...")
+    nodes = _read_dmp(nodes_path, [0, 2, 4])
+    node_taxids = nodes[0].astype(np.int64).to_numpy()
+    rank_codes, rank_names = pd.factorize(nodes[4])
+    parent = np.zeros(node_taxids.max() + 1, dtype=np.int32)
+    rank = np.full(node_taxids.max() + 1, -1, dtype=np.int8 if len(rank_names) < 128 else np.int16)
+    parent[node_taxids] = nodes[2].astype(np.int64).to_numpy()
+    rank[node_taxids] = rank_codes
+
+    names = _read_dmp(names_path, [0, 2, 6])
+    names = names[names[6].isin(['scientific name', 'synonym', 'equivalent name', 'genbank synonym'])]
+    # Scientific names take precedence over synonyms that hash to the same name
+    names = names.assign(priority=(names[6] != 'scientific name').astype(int)).sort_values('priority', kind='stable')
+    hashes = name_hash(names[2])
+    hash_taxids = names[0].astype(np.int64).to_numpy()
+    _, first = np.unique(hashes, return_index=True)
+    hashes, hash_taxids = hashes[first], hash_taxids[first]
+
+    # Merged (retired) taxonomy IDs point to their replacement
+    if os.path.exists(merged_path):
+        merged = _read_dmp(merged_path, [0, 2]).astype(np.int64).to_numpy()
+        merged = merged[(merged[:, 1] < len(parent)) & (merged[:, 0] < len(parent))]
+        # Retired IDs become leaves under their replacement; only IDs inside the array range are kept
+        parent[merged[:, 0]] = merged[:, 1]
+        rank[merged[:, 0]] = rank_names.get_loc('no rank') if 'no rank' in rank_names else -1
+
+    order = np.argsort(hashes)
+    np.savez(cache_path, parent=parent, rank=rank, rank_names=np.array(rank_names, dtype=str),
+             hashes=hashes[order], hash_taxids=hash_taxids[order], signature=signature)
+    return Taxonomy(parent, rank, list(rank_names), hashes[order], hash_taxids[order])
+
+
+def level_counts(donors, taxonomy, cog_categories, cog_col='COG', donor_col='Donor', reference=reference_taxid):
+    """
+    Builds the COG category x taxonomic level count table of HGT genes from a donor list.
+
+    Args:
+        donors (pd.DataFrame): One row per HGT gene, with its COG category string and donor
+                               (species name, or NCBI taxonomy ID).
+        taxonomy (Taxonomy): Loaded NCBI taxonomy.
+        cog_categories (list of str): COG categories (rows of the table).
+        cog_col (str): Name of the COG column.
+        donor_col (str): Name of the donor column.
+        reference (int): Taxonomy ID the donors are compared with (L. plantarum by default).
+
+    Returns:
+        tuple: (table, unresolved) where table has columns 'Level', the taxonomic levels and 'Total'
+               (one row per COG category; a gene with several COG letters counts for each), and
+               unresolved lists the donors that were not found, belong to the reference species or
+               have an ambiguous divergence level (see Taxonomy.divergence_level).
+    """
+    donor_values = donors[donor_col].astype(str).str.strip()
+    is_taxid = donor_values.str.fullmatch(r'\d+')
+    taxids = np.where(is_taxid, pd.to_numeric(donor_values.where(is_taxid), errors='coerce').fillna(0).astype(np.int64),
+                      taxonomy.taxids(donor_values))
+    taxids = np.where(taxids < len(taxonomy.parent), taxids, 0)
+    levels = taxonomy.divergence_level(taxids, reference)
+
+    cog_values = donors[cog_col].fillna('').astype(str)
+    table = {'Level': list(cog_categories)}
+    for level in taxonomic_levels:
+        at_level = levels == level
+        table[level] = [int((at_level & cog_values.str.contains(category, regex=False)).sum()) for category in cog_categories]
+    table = pd.DataFrame(table)
+    table['Total'] = table[taxonomic_levels].sum(axis=1)
+
+    unresolved = sorted(set(donor_values[pd.isna(levels)]))
+    return table, unresolved
@@ -0,0 +1,249 @@
+import os
+import re
+
+import numpy as np
+
+from presence_store import hash_file
+
+# Version of the cached '<tree file>.tree.npz' layout
+tree_cache_version = 1
+# Branch length of nodes without one in the Newick string (ete3's default, so distances match trees read with ete3)
+default_branch_length = 1.0
+
+_newick_token = re.compile(r"\s*(?:(\[[^\]]*\])|([(),;])|:\s*([^\s,():;\[\]]*)|'((?:[^']|'')*)'|([^\s,():;\[\]']+))")
+
+
+def parse_newick(text):
+    """
+    Parses the first tree of a Newick string into flat node arrays, nodes numbered in preorder.
+
+    Leaf and internal node labels are read (as ete3 format=1), quoted labels are unquoted and
+    [comments] are skipped.
+
+    Returns:
+        tuple: (parent, length, names) with parent an int32 array (-1 for the root), branch lengths
+               as float64 and node labels as a str array ('' for unnamed nodes).
+    """
+    parent, length, names = [], [], []
+    stack = []           # Open internal nodes
+    current = -1         # Node the next label or branch length belongs to
+    expect_node = True   # After '(' or ',' (or at the start) a new node begins
+
+    def new_node(name=''):
+        parent.append(stack[-1] if stack else -1)
+        length.append(np.nan)
+        names.append(name)
+        return len(parent) - 1
+
+    position = 0
+    while position < len(text):
+        match = _newick_token.match(text, position)
+        if match is None:
+            if not text[position:].strip():
+                break
+            raise ValueError(f"Invalid Newick string at position {position}: '{text[position:position + 20]}'")
+        position = match.end()
+        comment, symbol, branch_length, quoted, label = match.groups()
+        if comment is not None:
+            continue
+        if symbol == '(':
+            stack.append(new_node())
+            expect_node = True
+        elif symbol in (',', ')', ';'):
+            if expect_node and (symbol != ';' or not parent):
+                new_node()  # Empty leaf, as in '(,A)'
+            if symbol == ')':
+                if not stack:
+                    raise ValueError("Invalid Newick string: unbalanced ')'")
+                current = stack.pop()
+            expect_node = symbol == ','
+            if symbol == ';':
+                break
+        else:
+            if expect_node:
+                current = new_node()
+                expect_node = False
+            if branch_length is not None:
+                if branch_length:
+                    length[current] = float(branch_length)
+            else:
+                names[current] = quoted.replace("''", "'") if quoted is not None else label
+    if stack:
+        raise ValueError("Invalid Newick string: unbalanced '('")
+    if not parent:
+        raise ValueError("Invalid Newick string: no tree found")
+
+    length = np.array(length, dtype=np.float64)
+    length[0] = np.nan_to_num(length[0])  # The root has no branch unless one is given
+    length[np.isnan(length)] = default_branch_length
+    return np.array(parent, dtype=np.int32), length, np.array(names, dtype=str)
+
+
+def _path_sums(parent, weights):
+    """
+    Sum of `weights` from every node up to the root (root weight excluded), by pointer jumping.
+    """
+    total = np.where(parent >= 0, weights, 0.0)
+    ancestor = parent.astype(np.int64)
+    while np.any(ancestor >= 0):
+        active = ancestor >= 0
+        total[active] += total[ancestor[active]]
+        ancestor[active] = ancestor[ancestor[active]]
+    return total
+
+
+class ArrayTree:
+    """
+    Rooted tree stored as flat arrays, nodes numbered in preorder (node 0 is the root, the subtree of
+    node v is the node range [v, v + size[v])).
+
+    Attributes:
+        parent (np.ndarray): Parent index of every node (-1 for the root).
+        length (np.ndarray): Branch length to the parent.
+        names (np.ndarray): Node labels ('' for unnamed nodes).
+        level (np.ndarray): Number of branches from the root.
+        depth (np.ndarray): Sum of branch lengths from the root.
+        size (np.ndarray): Number of nodes in the subtree of every node (itself included).
+        is_leaf (np.ndarray): True for leaves.
+        leaves (np.ndarray): Leaf nodes in preorder (the leaf order of ete3's iter_leaves).
+        preorder, postorder (np.ndarray): Nodes in pre- and postorder.
+    """
+
+    def __init__(self, parent, length, names):
+        self.parent = np.asarray(parent, dtype=np.int32)
+        self.length = np.asarray(length, dtype=np.float64)
+        self.names = np.asarray(names, dtype=str)
+        n = len(self.parent)
+        if n == 0 or self.parent[0] != -1 or np.any(self.parent[1:] >= np.arange(1, n)) or np.any(self.parent[1:] < 0):
+            raise ValueError("Nodes must be numbered in preorder with the root first.")
+
+        self.level = _path_sums(self.parent, np.ones(n)).astype(np.int32)
+        self.depth = _path_sums(self.parent, self.length)
+        self.is_leaf = np.bincount(self.parent[1:], minlength=n) == 0
+        self.leaves = np.flatnonzero(self.is_leaf)
+
+        # Subtree sizes, accumulated bottom-up one level at a time
+        self.size = np.ones(n, dtype=np.int64)
+        by_level = np.argsort(self.level, kind='stable')
+        bounds = np.searchsorted(self.level[by_level], np.arange(self.level.max() + 2))
+        for lv in range(self.level.max(), 0, -1):
+            nodes = by_level[bounds[lv]:bounds[lv + 1]]
+            np.add.at(self.size, self.parent[nodes], self.size[nodes])
+
+        self.preorder = np.arange(n)
+        # A node follows its descendants and every earlier node that is not its ancestor
+        self.postorder = np.empty(n, dtype=np.int64)
+        self.postorder[self.preorder + self.size - 1 - self.level] = self.preorder
+        self._leaf_lookup = None
+
+    @property
+    def n_nodes(self):
+        return len(self.parent)
+
+    @property
+    def leaf_names(self):
+        return self.names[self.leaves].tolist()
+
+    def leaf_nodes(self, leaf_names):
+        """
+        Nodes of the named leaves (KeyError for unknown names).
+        """
+        if self._leaf_lookup is None:
+            self._leaf_lookup = {name: node for name, node in zip(self.leaf_names, self.leaves)}
+        return np.array([self._leaf_lookup[name] for name in leaf_names], dtype=np.int64)
+
+    def subtree(self, node):
+        """
+        The subtree below `node` as a new ArrayTree (its root gets branch length 0).
+        """
+        stop = node + self.size[node]
+        parent = self.parent[node:stop] - node
+        parent[0] = -1
+        length = self.length[node:stop].copy()
+        length[0] = 0.0
+        return ArrayTree(parent, length, self.names[node:stop])
+
+    def mrca(self, leaf_names):
+        """
+        Most recent common ancestor of the named leaves.
+        """
+        nodes = self.leaf_nodes(leaf_names)
+        node, last = nodes.min(), nodes.max()
+        while node + self.size[node] <= last:
+            node = self.parent[node]
+        return int(node)
+
+    def clade(self, leaf_names):
+        """
+        The smallest clade containing all named leaves, as a new ArrayTree.
+        """
+        return self.subtree(self.mrca(leaf_names))
+
+    def rotate(self, leaf_order):
+        """
+        Reorders the children of every node so the leaves follow `leaf_order` as closely as the topology allows.
+
+        Children are sorted by the earliest position in `leaf_order` of any leaf below them; leaves not in
+        `leaf_order` keep their relative order after the others. Topology and branch lengths are unchanged.
+
+        Returns:
+            ArrayTree: The rotated tree (renumbered in its new preorder).
+        """
+        n = self.n_nodes
+        rank = np.full(n, len(leaf_order) + n, dtype=np.int64)
+        rank[self.leaves] = len(leaf_order) + self.leaves  # Unlisted leaves after the listed ones, in current order
+        known = set(self.leaf_names)
+        listed = list(dict.fromkeys(name for name in leaf_order if name in known))
+        rank[self.leaf_nodes(listed)] = np.arange(len(listed))
+        # Earliest rank below every node, bottom-up one level at a time
+        by_level = np.argsort(self.level, kind='stable')
+        bounds = np.searchsorted(self.level[by_level], np.arange(self.level.max() + 2))
+        for lv in range(self.level.max(), 0, -1):
+            nodes = by_level[bounds[lv]:bounds[lv + 1]]
+            np.minimum.at(rank, self.parent[nodes], rank[nodes])
+
+        # Children of every node in their new order, then a depth-first walk for the new preorder
+        children = np.lexsort((rank[1:], self.parent[1:])) + 1
+        starts = np.searchsorted(self.parent[children], np.arange(n + 1))
+        order, stack = [], [0]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(children[starts[node]:starts[node + 1]][::-1].tolist())
+        order = np.array(order, dtype=np.int64)
+        new_index = np.empty(n, dtype=np.int64)
+        new_index[order] = np.arange(n)
+        parent = np.where(self.parent[order] >= 0, new_index[self.parent[order]], -1)
+        return ArrayTree(parent, self.length[order], self.names[order])
+
+
+def load_tree(path):
+    """
+    Reads a Newick file into an ArrayTree.
+
+    The parsed arrays are cached in '<path>.tree.npz' and reused while the SHA-256 hash of the file
+    content is unchanged.
+
+    Args:
+        path (str): Newick tree file.
+
+    Returns:
+        ArrayTree: The tree.
+    """
+    cache_path = f"{path}.tree.npz"
+    source_hash = hash_file(path)
+    if os.path.exists(cache_path):
+        try:
+            with np.load(cache_path) as cached:
+                if int(cached['version']) == tree_cache_version and str(cached['source_hash']) == source_hash:
+                    return ArrayTree(cached['parent'], cached['length'], cached['names'])
+        except Exception as e:
+            print(f"Warning: Could not read tree cache '{cache_path}' ({e}). It will be rebuilt.")
+
+    with open(path, encoding='utf-8') as f:
+        parent, length, names = parse_newick(f.read())
+    try:
+        np.savez(cache_path, version=tree_cache_version, source_hash=source_hash, parent=parent, length=length, names=names)
+    except OSError as e:
+        print(f"Warning: Could not save tree cache to '{cache_path}': {e}")
+    return ArrayTree(parent, length, names)
@@ -0,0 +1,114 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cog_index import cog_letters, cog_matrix
+from presence_store import open_presence_store, pack_words, popcount
+
+
+def category_masks(store, cog_col=None, letters=cog_letters):
+    """
+    Gene masks of 'Total' (all genes) and every COG category, packed as uint64 words.
+
+    Returns:
+        tuple: (categories, masks) with masks of shape (len(categories), n_words).
+    """
+    genes = np.ones((store.n_genes, 1), dtype=bool)
+    if cog_col is not None:
+        genes = np.hstack([genes, cog_matrix(store.cog_index(cog_col), letters)])
+    return ['Total'] + (list(letters) if cog_col is not None else []), pack_words(genes.T)
+
+
+# Per-process state of the permutation workers (set once by the pool initializer)
+_curve_context = {}
+
+
+def _init_curve_worker(store, masks):
+    # The store is reopened in every worker, so the presence words are mapped rather than copied
+    _curve_context["words"] = store.words()
+    _curve_context["masks"] = masks
+
+
+def _count_by_category(sets, masks):
+    # Popcount of (set & mask) for every set and category: (n_categories, n_sets)
+    return np.stack([popcount(sets & mask).sum(axis=1, dtype=np.int64) for mask in masks]).astype(np.int32)
+
+
+def _permutation_curves(seeds):
+    """
+    Pan- and core-genome sizes per category after adding strains in a random order, one order per seed.
+    """
+    words, masks = _curve_context["words"], _curve_context["masks"]
+    pan, core = [], []
+    for seed in seeds:
+        order = np.random.default_rng(seed).permutation(len(words))
+        ordered = words[order]
+        # Pan genome grows by OR, core genome shrinks by AND of the gene sets of the strains added so far
+        pan.append(_count_by_category(np.bitwise_or.accumulate(ordered, axis=0), masks))
+        core.append(_count_by_category(np.bitwise_and.accumulate(ordered, axis=0), masks))
+    return np.stack(pan), np.stack(core)
+
+
+def accumulation_curves(store, cog_col=None, n_permutations=100, quantiles=(0.025, 0.975), seed=0, batch_size=10,
+                        n_workers=None):
+    """
+    Pan- and core-genome accumulation curves over random strain orders, overall and per COG category.
+
+    The gene set of every strain is a packed bitset; pan and core sets grow with bitwise OR/AND over
+    the strains added so far and are counted per category with popcount. Permutations run in batches
+    across a process pool, each permutation seeded from np.random.SeedSequence(seed), so the curves do
+    not depend on the number of workers.
+
+    Args:
+        store (PresenceStore): Presence store of the presence/absence table.
+        cog_col (str or None): COG metadata column (None for the overall curves only).
+        n_permutations (int): Number of random strain orders.
+        quantiles (tuple of float): Quantiles reported next to the mean.
+        seed (int): Seed for reproducible strain orders.
+        batch_size (int): Number of permutations per task.
+        n_workers (int, optional): Number of worker processes (defaults to the number of CPUs; 1 runs serially).
+
+    Returns:
+        pd.DataFrame: One row per category and number of strains, with 'Category', 'Strains',
+                      'Pan Mean', 'Pan Q<q>' ..., 'Core Mean' and 'Core Q<q>' ...
+    """
+    categories, masks = category_masks(store, cog_col)
+    seeds = np.random.SeedSequence(seed).spawn(n_permutations)
+    batches = [seeds[start:start + batch_size] for start in range(0, n_permutations, batch_size)]
+    if n_workers == 1:
+        _init_curve_worker(store, masks)
+        results = [_permutation_curves(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers or os.cpu_count(), initializer=_init_curve_worker,
+                                 initargs=(store, masks)) as executor:
+            results = list(executor.map(_permutation_curves, batches))
+    pan = np.concatenate([r[0] for r in results])  # permutation x category x strains added
+    core = np.concatenate([r[1] for r in results])
+
+    curves = pd.DataFrame({'Category': np.repeat(categories, store.n_strains),
+                           'Strains': np.tile(np.arange(1, store.n_strains + 1), len(categories))})
+    for name, sizes in (('Pan', pan), ('Core', core)):
+        curves[f'{name} Mean'] = sizes.mean(axis=0).ravel()
+        for q, values in zip(quantiles, np.quantile(sizes, quantiles, axis=0)):
+            curves[f'{name} Q{100 * q:g}'] = values.ravel()
+    return curves
+
+
+if __name__ == "__main__":
+    # Read the presence/absence table through its presence store (built on the first run);
+    # same input and column layout as Total_sequence_length.py, so both scripts share one store
+    file_path = 'present_absent.xlsx'
+    cog_col_index = 4            # Fifth column (COG category)
+    first_strain_col_index = 6   # Seventh column onwards (Strains)
+    store = open_presence_store(file_path, first_strain_col_index)
+
+    n_permutations = 200         # Random strain orders
+    seed = 1337                  # Fixed seed for reproducible curves
+
+    curves = accumulation_curves(store, store.columns[cog_col_index], n_permutations, seed=seed)
+
+    output_file_path = 'Pangenome_Accumulation_Curves.csv'
+    curves.to_csv(output_file_path, index=False)
+    print(f'Results saved to {output_file_path}')
@@ -0,0 +1,288 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from cog_index import CogIndex, build_cog_index
+
+# Layout of a store directory ('<source>.presence_store/'):
+#   meta.json        - source hash, shape, strain names and metadata column descriptions
+#   presence.bits    - strain x gene presence matrix, bit-packed along genes (one row per strain, zero-padded
+#                      to whole uint64 words so the rows can be memory-mapped as words without copying)
+#   column_<k>.npy   - one file per gene metadata column (int64/float64 for numeric, fixed-width text otherwise)
+#   cog_<col>.npz    - COG index of a metadata column, added on first use
+store_version = 3
+csv_chunk_rows = 8 * 4096  # Multiple of 8 so every chunk packs into whole bytes
+# Last gene metadata column of a Roary gene_presence_absence table; the strain columns follow it
+roary_last_metadata_column = 'Avg group size nuc'
+
+
+def popcount(words):
+    """
+    Number of set bits of every element of an unsigned integer array.
+    """
+    if hasattr(np, 'bitwise_count'):  # NumPy >= 2.0
+        return np.bitwise_count(words)
+    table = np.array([bin(k).count('1') for k in range(256)], dtype=np.uint8)
+    words = np.asarray(words)
+    return table[words.view(np.uint8)].reshape(words.shape + (words.itemsize,)).sum(axis=-1, dtype=np.uint8)
+
+
+def pack_words(mask):
+    """
+    Packs boolean rows (..., n_genes) into uint64 words, in the bit layout of PresenceStore.words.
+    """
+    packed = np.packbits(np.asarray(mask, dtype=bool), axis=-1)
+    padding = [(0, 0)] * (packed.ndim - 1) + [(0, -packed.shape[-1] % 8)]
+    return np.ascontiguousarray(np.pad(packed, padding)).view(np.uint64)
+
+
+def hash_file(path, block_size=1 << 20):
+    """
+    SHA-256 hex digest of a file's content, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PresenceStore:
+    """
+    Read-only view of a presence/absence store. Presence bits and metadata columns are memory-mapped.
+
+    A store passed to worker processes is pickled as its directory and metadata only; every process
+    maps the files itself, so the presence matrix is never copied between processes.
+
+    Attributes:
+        n_genes (int): Number of gene clusters (rows of the source table).
+        strains (list of str): Strain names, in source column order.
+        columns (list of str): Gene metadata column names, in source column order.
+        bits (np.memmap): Packed presence matrix of shape (n_strains, ceil(n_genes / 8)) (a view of the word rows).
+    """
+
+    def __init__(self, store_dir, meta):
+        self.store_dir = store_dir
+        self.meta = meta
+        self.n_genes = meta['n_genes']
+        self.strains = meta['strains']
+        self.columns = [column['name'] for column in meta['columns']]
+        n_words = (self.n_genes + 63) // 64
+        if self.strains and n_words:
+            self._words = np.memmap(os.path.join(store_dir, 'presence.bits'), dtype=np.uint64, mode='r',
+                                    shape=(len(self.strains), n_words))
+        else:
+            self._words = np.zeros((len(self.strains), n_words), dtype=np.uint64)
+        self.bits = self._words.view(np.uint8)[:, :(self.n_genes + 7) // 8]
+
+    def __reduce__(self):
+        return PresenceStore, (self.store_dir, self.meta)
+
+    @property
+    def n_strains(self):
+        return len(self.strains)
+
+    def column(self, name):
+        """
+        Memory-mapped values of a gene metadata column (int64/float64, or text with '' for missing values).
+        """
+        k = self.columns.index(name)
+        return np.load(os.path.join(self.store_dir, f'column_{k}.npy'), mmap_mode='r')
+
+    def metadata_frame(self):
+        """
+        Gene metadata columns as a DataFrame (missing text values restored as NaN).
+
+        Unlike column(), this copies every metadata column into memory (text columns as object arrays);
+        use column() for memory-mapped access to single columns.
+        """
+        data = {}
+        for column in self.meta['columns']:
+            values = self.column(column['name'])
+            if column['kind'] == 'text':
+                values = pd.Series(values, dtype=object).replace('', np.nan)
+            data[column['name']] = values
+        return pd.DataFrame(data)
+
+    def strain_block(self, start, stop):
+        """
+        Unpacks the presence rows of strains [start, stop) into a boolean (stop - start) x n_genes matrix.
+        """
+        return np.unpackbits(self.bits[start:stop], axis=1, count=self.n_genes).astype(bool)
+
+    def words(self, start=0, stop=None):
+        """
+        Presence rows of strains [start, stop) as uint64 words (the packed bytes zero-padded to whole words),
+        for bitwise OR/AND and popcount over gene sets; gene masks in the same layout come from pack_words.
+
+        Returns a read-only view of the memory-mapped file (no copy).
+        """
+        return self._words[start:stop]
+
+    def cog_index(self, cog_col):
+        """
+        COG index of a metadata column, built on first use and kept inside the store.
+        """
+        index_path = os.path.join(self.store_dir, f'cog_{self.columns.index(cog_col)}.npz')
+        if os.path.exists(index_path):
+            with np.load(index_path) as cached:
+                return CogIndex(cached['bitmask'], cached['n_chars'], cached['letters'].tolist())
+        index = build_cog_index(self.column(cog_col))
+        np.savez(index_path, bitmask=index.bitmask, n_chars=index.n_chars, letters=np.array(index.letters))
+        return index
+
+
+def first_strain_column(source_path, after=roary_last_metadata_column, sheet_name=0):
+    """
+    Index of the first strain column of a presence/absence table: the column following `after`.
+
+    Raises:
+        ValueError: If the header has no column named `after` (the table does not have the expected layout).
+    """
+    if source_path.lower().endswith('.csv'):
+        header = pd.read_csv(source_path, nrows=0).columns.tolist()
+    else:
+        header = pd.read_excel(source_path, sheet_name=sheet_name, nrows=0).columns.tolist()
+    if after not in header:
+        raise ValueError(f"'{source_path}' has no '{after}' column, so its first strain column cannot be located; "
+                         f"pass the index of the first strain column explicitly.")
+    return header.index(after) + 1
+
+
+def _split_columns(all_columns, first_strain_col, metadata_columns):
+    strain_columns = [c for c in all_columns[first_strain_col:] if c not in metadata_columns]
+    gene_columns = [c for c in all_columns if c not in strain_columns]
+    return gene_columns, strain_columns
+
+
+def _read_source_chunks(source_path, sheet_name):
+    if source_path.lower().endswith('.csv'):
+        yield from pd.read_csv(source_path, chunksize=csv_chunk_rows)
+    else:
+        # openpyxl cannot stream rows into pandas, so Excel sources are parsed in one go
+        yield pd.read_excel(source_path, sheet_name=sheet_name, header=0)
+
+
+def build_presence_store(source_path, first_strain_col, metadata_columns=(), sheet_name=0, source_hash=None):
+    """
+    Converts a Roary-style presence/absence table (CSV or Excel) into a presence store.
+
+    A gene is present in a strain when the strain's cell is not blank/NaN. Columns before
+    `first_strain_col`, plus any column named in `metadata_columns`, are stored as gene metadata.
+
+    Args:
+        source_path (str): Path to the presence/absence table.
+        first_strain_col (int): Index of the first strain column (0-based).
+        metadata_columns (list of str): Columns after `first_strain_col` that are gene metadata, not strains.
+        sheet_name (str or int): Sheet to read for Excel sources.
+        source_hash (str, optional): Precomputed content hash of the source.
+
+    Returns:
+        PresenceStore: The newly built store.
+    """
+    store_dir = f"{source_path}.presence_store"
+    if os.path.exists(store_dir):
+        shutil.rmtree(store_dir)
+    os.makedirs(store_dir)
+
+    stat = os.stat(source_path)
+    meta = {
+        'version': store_version,
+        'source_hash': source_hash or hash_file(source_path),
+        'source_size': stat.st_size,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'first_strain_col': first_strain_col,
+        'metadata_columns': list(metadata_columns),
+        'sheet_name': sheet_name,
+    }
+
+    gene_chunks = []
+    bit_chunks_path = os.path.join(store_dir, 'presence.chunks')
+    strain_columns = None
+    n_genes = 0
+    with open(bit_chunks_path, 'wb') as chunk_file:
+        for chunk in _read_source_chunks(source_path, sheet_name):
+            if strain_columns is None:
+                gene_columns, strain_columns = _split_columns(chunk.columns.tolist(), first_strain_col, metadata_columns)
+            gene_chunks.append(chunk[gene_columns])
+            # Gene-major packed bits of this chunk; transposed to strain-major once all chunks are known
+            packed = np.packbits(chunk[strain_columns].notna().to_numpy(), axis=0)
+            chunk_file.write(np.ascontiguousarray(packed).tobytes())
+            n_genes += len(chunk)
+
+    # Rearrange the per-chunk (gene byte x strain) blocks into one strain x gene byte matrix, rows padded to whole words
+    n_strains, n_bytes = len(strain_columns), (n_genes + 7) // 8
+    if n_strains and n_bytes:
+        chunk_bytes = np.memmap(bit_chunks_path, dtype=np.uint8, mode='r', shape=(n_bytes, n_strains))
+        bits = np.memmap(os.path.join(store_dir, 'presence.bits'), dtype=np.uint8, mode='w+',
+                         shape=(n_strains, (n_genes + 63) // 64 * 8))
+        for start in range(0, n_bytes, csv_chunk_rows // 8):
+            stop = min(start + csv_chunk_rows // 8, n_bytes)
+            bits[:, start:stop] = chunk_bytes[start:stop].T
+        bits.flush()
+        del bits, chunk_bytes
+    os.remove(bit_chunks_path)
+
+    genes = pd.concat(gene_chunks, ignore_index=True) if gene_chunks else pd.DataFrame(columns=gene_columns)
+    columns = []
+    for k, name in enumerate(genes.columns):
+        values = genes[name]
+        # Only columns the reader parsed as numbers are numeric; text columns stay text even if every value looks numeric
+        if pd.api.types.is_numeric_dtype(values):
+            kind, array = 'numeric', values.to_numpy(dtype=np.int64 if pd.api.types.is_integer_dtype(values) else float)
+        else:
+            kind, array = 'text', values.fillna('').astype(str).to_numpy(dtype=str)
+        np.save(os.path.join(store_dir, f'column_{k}.npy'), array)
+        columns.append({'name': str(name), 'kind': kind})
+
+    meta.update({'n_genes': n_genes, 'strains': [str(s) for s in strain_columns], 'columns': columns})
+    with open(os.path.join(store_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+    return PresenceStore(store_dir, meta)
+
+
+def open_presence_store(source_path, first_strain_col, metadata_columns=(), sheet_name=0):
+    """
+    Opens the presence store of `source_path`, (re)building it when the source content has changed.
+
+    The store is keyed on the SHA-256 of the source file. When the source's size and
+    modification time are unchanged the hash is not recomputed, so opening an up-to-date
+    store only reads 'meta.json' and memory-maps the data files.
+
+    Args:
+        source_path (str): Path to the presence/absence table (CSV or Excel).
+        first_strain_col (int): Index of the first strain column (0-based).
+        metadata_columns (list of str): Columns after `first_strain_col` that are gene metadata, not strains.
+        sheet_name (str or int): Sheet to read for Excel sources.
+
+    Returns:
+        PresenceStore: The store for the current content of `source_path`.
+    """
+    store_dir = f"{source_path}.presence_store"
+    meta_path = os.path.join(store_dir, 'meta.json')
+    layout = {'version': store_version, 'first_strain_col': first_strain_col,
+              'metadata_columns': list(metadata_columns), 'sheet_name': sheet_name}
+
+    source_hash = None
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if all(meta.get(key) == value for key, value in layout.items()):
+            stat = os.stat(source_path)
+            if meta['source_size'] == stat.st_size and meta['source_mtime_ns'] == stat.st_mtime_ns:
+                return PresenceStore(store_dir, meta)
+            source_hash = hash_file(source_path)
+            if meta['source_hash'] == source_hash:
+                # Touched but unchanged: record the new modification time and reuse the store
+                meta['source_mtime_ns'] = stat.st_mtime_ns
+                with open(meta_path, 'w', encoding='utf-8') as f:
+                    json.dump(meta, f)
+                return PresenceStore(store_dir, meta)
+
+    print(f"Building presence store for '{source_path}' ...")
+    return build_presence_store(source_path, first_strain_col, metadata_columns, sheet_name, source_hash)
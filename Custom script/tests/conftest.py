@@ -0,0 +1,34 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The scripts import each other as top-level modules from the 'Custom script' folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+cog_choices = ['J', 'K', 'L', 'KL', 'CE', 'S', 'EGP', '', 'V']
+
+
+@pytest.fixture
+def presence_table(tmp_path):
+    """
+    Small Roary-style presence/absence CSV: 4 metadata columns plus COG and length, then 23 strains
+    (301 genes, so the packed rows end in a partial byte and a partial word).
+    """
+    rng = np.random.default_rng(0)
+    n_genes, n_strains = 301, 23
+    table = pd.DataFrame({
+        'Gene': [f'group_{k}' for k in range(n_genes)],
+        'No. isolates': rng.integers(1, n_strains + 1, n_genes),
+        'Annotation': 'hypothetical protein',
+        'Avg group size nuc': rng.integers(100, 3000, n_genes).astype(float),
+        'COG': rng.choice(cog_choices, n_genes),
+        'Length': rng.integers(100, 3000, n_genes),
+    })
+    for k in range(n_strains):
+        table[f'strain_{k}'] = pd.Series(np.where(rng.random(n_genes) < 0.6, f'gene_{k}', None), dtype=object)
+    path = tmp_path / 'presence_absence.csv'
+    table.to_csv(path, index=False)
+    return str(path), table
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from ANOVA import _studentized_range_sf, batch_anova
+
+
+def _replicate_table(seed=4, n_rows=20):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(n_rows, 9)) + np.repeat([0.0, 2.0, 5.0], 3) * (np.arange(n_rows) % 2)[:, None]
+    values[::5, 4] = np.nan  # Unequal group sizes (Tukey-Kramer)
+    return pd.DataFrame(values, columns=[f'rep_{k}' for k in range(9)])
+
+
+groups = {'Close': [1, 2, 3], 'Intermediate': [4, 5, 6], 'Far': [7, 8, 9]}
+
+
+def test_per_row_anova_matches_f_oneway():
+    df = _replicate_table()
+    anova_df, _ = batch_anova(df, groups)
+    for row, values in enumerate(df.to_numpy()):
+        expected = stats.f_oneway(*[v[~np.isnan(v)] for v in (values[0:3], values[3:6], values[6:9])])
+        np.testing.assert_allclose(anova_df['F Statistic'][row], expected.statistic, rtol=1e-9)
+        np.testing.assert_allclose(anova_df['P-value'][row], expected.pvalue, rtol=1e-9)
+
+
+def test_tukey_matches_scipy():
+    df = _replicate_table()
+    _, tukey_df = batch_anova(df, groups)
+    assert len(tukey_df) > 0
+    names = list(groups)
+    for _, row in tukey_df.iterrows():
+        values = df.loc[row['Test']].to_numpy()
+        expected = stats.tukey_hsd(*[v[~np.isnan(v)] for v in (values[0:3], values[3:6], values[6:9])])
+        i, j = names.index(row['Group 1']), names.index(row['Group 2'])
+        np.testing.assert_allclose(row['P-value'], expected.pvalue[i, j], rtol=1e-4, atol=1e-8)
+        interval = expected.confidence_interval()
+        np.testing.assert_allclose([row['Lower CI'], row['Upper CI']], [interval.low[i, j], interval.high[i, j]], rtol=1e-6)
+
+
+def test_studentized_range_interpolation_large_df():
+    q = np.array([0.5, 2.0, 4.0, 6.0, 9.0])
+    np.testing.assert_allclose(_studentized_range_sf(q, 3, 5000), stats.studentized_range.sf(q, 3, 5000), rtol=1e-4)
+
+
+def test_per_row_mode_needs_replicates():
+    with pytest.raises(ValueError):
+        batch_anova(_replicate_table(), {'Close': [1], 'Far': [2]})
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from cog_index import build_cog_index, cog_letters, cog_matrix, load_cog_index
+
+
+def test_cog_matrix_matches_str_contains():
+    values = pd.Series(['K', 'KL', np.nan, 'CE', '', 'S', 'EGP', 'nan', 'X', 'KK'])
+    index = build_cog_index(values)
+    matrix = cog_matrix(index, cog_letters + ['X'])
+    for j, letter in enumerate(cog_letters + ['X']):
+        expected = values.fillna('').replace('nan', '').str.contains(letter, regex=False).to_numpy()
+        np.testing.assert_array_equal(matrix[:, j], expected)
+    np.testing.assert_array_equal(index.n_chars, [1, 2, 0, 2, 0, 1, 3, 0, 1, 2])
+
+
+def test_cached_index_is_keyed_on_column(tmp_path):
+    path = tmp_path / 'table.csv'
+    table = pd.DataFrame({'COG': ['K', 'L', 'KL'], 'COG_alt': ['J', 'J', 'S']})
+    table.to_csv(path, index=False)
+    first = load_cog_index(str(path), table['COG'])
+    other = load_cog_index(str(path), table['COG_alt'])
+    np.testing.assert_array_equal(cog_matrix(first, ['K', 'L']), [[True, False], [False, True], [True, True]])
+    np.testing.assert_array_equal(cog_matrix(other, ['J', 'S']), [[True, False], [True, False], [False, True]])
+    np.testing.assert_array_equal(load_cog_index(str(path), table['COG']).bitmask, first.bitmask)
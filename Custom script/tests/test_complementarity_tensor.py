@@ -0,0 +1,26 @@
+import numpy as np
+
+from cog_index import cog_letters
+from complementarity_tensor import complementarity_tensor
+from presence_store import open_presence_store
+
+
+def test_tensor_matches_pair_loop(tmp_path, presence_table):
+    path, table = presence_table
+    store = open_presence_store(path, 6)
+    tensors = complementarity_tensor(store, str(tmp_path / 'tensor'), 'COG', 'Length', block_size=5, n_workers=2)
+
+    # Reference: set differences of every ordered strain pair, category by category
+    presence = table.iloc[:, 6:].notna().to_numpy().T
+    lengths = table['Length'].to_numpy(dtype=float)
+    cogs = table['COG'].fillna('')
+    for a in range(0, store.n_strains, 4):
+        for b in range(store.n_strains):
+            for c, letter in enumerate(cog_letters):
+                in_category = cogs.str.contains(letter, regex=False).to_numpy()
+                only_a = presence[a] & ~presence[b] & in_category
+                pool = (presence[a] | presence[b]) & in_category
+                assert tensors['genes'][a, b, c] == only_a.sum()
+                np.testing.assert_allclose(tensors['length'][a, b, c], lengths[only_a].sum(), rtol=1e-6)
+                expected_ratio = only_a.sum() / pool.sum() if pool.any() else np.nan
+                np.testing.assert_allclose(tensors['ratio'][a, b, c], expected_ratio, rtol=1e-6)
@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+from complementary_ratio_fisher import perform_fisher_enrichment_for_column, threshold_sweep
+
+
+def test_threshold_sweep_matches_single_column_tests():
+    rng = np.random.default_rng(22)
+    df = pd.DataFrame(rng.uniform(0, 1, (40, 4)), columns=['A', 'B', 'C', 'D']).round(2).astype(object)
+    df.iloc[::7, 1] = 'n/a'
+    thresholds = [0.25, 0.5, 0.75]
+    sweep = threshold_sweep(df, thresholds).set_index(['Column Name', 'Threshold'])
+    for column_index, name in enumerate(df.columns):
+        for threshold in thresholds:
+            oddsratio, pvalue, _ = perform_fisher_enrichment_for_column(df, column_index, threshold)
+            np.testing.assert_allclose(sweep.loc[(name, threshold), 'P-value'], pvalue, rtol=1e-9)
+            np.testing.assert_allclose(sweep.loc[(name, threshold), 'Odds Ratio'], oddsratio, rtol=1e-9)
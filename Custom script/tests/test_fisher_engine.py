@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import fisher_exact
+
+from fisher_engine import fisher_enrichment, fisher_exact_batch
+
+
+@pytest.mark.parametrize('alternative', ['two-sided', 'less', 'greater'])
+def test_batch_matches_scipy(alternative):
+    rng = np.random.default_rng(3)
+    tables = rng.integers(0, 40, (300, 4))
+    tables[:5] = [[0, 0, 3, 4], [5, 0, 0, 2], [7, 7, 7, 7], [0, 12, 9, 0], [250, 3, 1, 300]]
+    odds_ratio, p_value = fisher_exact_batch(*tables.T, alternative=alternative)
+    for k, (a, b, c, d) in enumerate(tables):
+        if min(a + b, c + d, a + c, b + d) == 0:
+            assert np.isnan(odds_ratio[k]) and p_value[k] == 1.0
+            continue
+        expected = fisher_exact([[a, b], [c, d]], alternative=alternative)
+        np.testing.assert_allclose(odds_ratio[k], expected.statistic)
+        np.testing.assert_allclose(p_value[k], expected.pvalue, rtol=1e-9, atol=1e-300)
+
+
+def test_enrichment_tables_match_original_layout():
+    # Reference: the 2x2 tables of the original HGT_fishertest.py loop
+    counts = pd.DataFrame([[5, 1, 0], [3, 8, 2], [0, 4, 9]], index=['J', 'K', 'L'], columns=['Species', 'Genus', 'Family'])
+    results = fisher_enrichment(counts).set_index(['Group', 'Category'])
+    grand_total = counts.to_numpy().sum()
+    for group in counts.columns:
+        for category in counts.index:
+            a = counts.loc[category, group]
+            table = [[a, counts.loc[category].sum() - a],
+                     [counts[group].sum() - a, grand_total - counts[group].sum()]]
+            np.testing.assert_allclose(results.loc[(group, category), 'P-value'], fisher_exact(table).pvalue, rtol=1e-9)
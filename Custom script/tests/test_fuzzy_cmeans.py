@@ -0,0 +1,37 @@
+import numpy as np
+
+from fuzzy_cmeans import cmeans, fuzzy_cmeans
+
+
+def _reference_cmeans(values, n_clusters, m, n_iter, seed):
+    # Reference: the e1071::cmeans updates written out gene by gene, from the same initial centers
+    rng = np.random.default_rng(seed)
+    centers = values[rng.choice(len(values), size=n_clusters, replace=False)]
+    for _ in range(n_iter + 1):
+        membership = np.empty((len(values), n_clusters))
+        for i, x in enumerate(values):
+            d = np.array([np.sum((x - c) ** 2) for c in centers])
+            if np.any(d == 0):  # A gene on a center belongs fully to it
+                membership[i] = d == 0
+                continue
+            for k in range(n_clusters):
+                membership[i, k] = 1 / np.sum((d[k] / d) ** (1 / (m - 1)))
+        new_centers = np.array([(membership[:, k] ** m) @ values / np.sum(membership[:, k] ** m) for k in range(n_clusters)])
+        centers, last_centers = new_centers, centers
+    return last_centers, membership
+
+
+def test_cmeans_matches_reference_updates():
+    values = np.random.default_rng(25).normal(size=(60, 5))
+    result = cmeans(values, 3, 1.6, max_iter=6, tol=0, seed=7)
+    centers, membership = _reference_cmeans(values, 3, 1.6, 6, seed=7)
+    np.testing.assert_allclose(result['centers'], centers, rtol=1e-9)
+    np.testing.assert_allclose(result['membership'], membership, rtol=1e-9)
+
+
+def test_restarts_do_not_depend_on_worker_count():
+    values = np.random.default_rng(26).normal(size=(80, 6))
+    serial = fuzzy_cmeans(values, 4, n_restarts=4, seed=1, n_workers=1)
+    parallel = fuzzy_cmeans(values, 4, n_restarts=4, seed=1, n_workers=2)
+    np.testing.assert_allclose(serial['objectives'], parallel['objectives'])
+    np.testing.assert_allclose(serial['membership'].sum(axis=1), 1.0)
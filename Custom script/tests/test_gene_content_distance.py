@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from scipy.spatial.distance import cdist
+
+from gene_content_distance import gene_content_distance_matrix, strain_order
+from presence_store import open_presence_store
+
+
+@pytest.mark.parametrize('kernel', ['product', 'popcount'])
+@pytest.mark.parametrize('metric', ['shared', 'jaccard', 'hamming'])
+def test_distances_match_dense_reference(tmp_path, presence_table, metric, kernel):
+    path, table = presence_table
+    store = open_presence_store(path, 6)
+    presence = table.iloc[:, 6:].notna().to_numpy().T
+    order = strain_order(store.strains, store.strains[::-3])
+    result = gene_content_distance_matrix(store, str(tmp_path / 'distances.npy'), metric, order, kernel,
+                                          block_size=7, n_workers=2)
+
+    ordered = presence[order].astype(float)
+    shared, sizes = ordered @ ordered.T, ordered.sum(axis=1)
+    expected = {'shared': 1 - shared / np.minimum.outer(sizes, sizes),
+                'jaccard': cdist(ordered, ordered, 'jaccard'),
+                'hamming': cdist(ordered, ordered, 'hamming') * presence.shape[1]}[metric]
+    np.testing.assert_allclose(result, expected, rtol=1e-6, atol=1e-6)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from gene_pool_engine import (cog_functions, cumulative_threshold_table, gene_pool_average_length, gene_pool_counts,
+                              gene_pool_proportion)
+
+
+def _gene_pool_table(seed=1, n_genes=400, max_isolates=30):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(100, 3000, n_genes).astype(float)
+    lengths[rng.random(n_genes) < 0.05] = np.nan
+    return pd.DataFrame({
+        'No. isolates': rng.integers(1, max_isolates + 1, n_genes),
+        'COG': rng.choice(['J', 'K', 'KL', 'CE', 'S', 'EGP', '-'], n_genes),
+        'Avg group size nuc': lengths,
+    })
+
+
+def test_counts_match_row_loop():
+    # Reference: the original Gene_pool_counts.py loop over rows and thresholds
+    data = _gene_pool_table()
+    thresholds = range(1, int(data['No. isolates'].max()) + 1)
+    counts = gene_pool_counts(cumulative_threshold_table(data))
+    for func in cog_functions:
+        expected = [sum(1 for n, cog in zip(data['No. isolates'], data['COG']) if n >= i and func in cog) for i in thresholds]
+        np.testing.assert_array_equal(counts[f'{func}_Count'], expected)
+    np.testing.assert_array_equal(counts['Total_Count'], [(data['No. isolates'] >= i).sum() for i in thresholds])
+
+
+def test_proportion_and_average_length_match_filtering():
+    # Reference: the original Gene_pool_proportion.py / Gene_pool_average length.py filters per threshold
+    data = _gene_pool_table()
+    table = cumulative_threshold_table(data)
+    proportion, average = gene_pool_proportion(table), gene_pool_average_length(table)
+    for row, i in enumerate(table.index):
+        filtered = data[data['No. isolates'] >= i]
+        np.testing.assert_allclose(average['Overall_Avg_Nuc'][row], filtered['Avg group size nuc'].mean())
+        for func in cog_functions:
+            in_cog = filtered[filtered['COG'].str.contains(func, na=False)]
+            np.testing.assert_allclose(proportion[f'{func}_Ratio'][row], len(in_cog) / len(filtered))
+            expected = in_cog['Avg group size nuc'].mean() if len(in_cog) else 0
+            np.testing.assert_allclose(average[f'{func}_Avg_Nuc'][row], expected)
+
+
+def test_thresholds_run_to_observed_maximum():
+    data = _gene_pool_table(max_isolates=7)
+    assert cumulative_threshold_table(data).index.tolist() == list(range(1, int(data['No. isolates'].max()) + 1))
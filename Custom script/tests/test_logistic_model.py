@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+from Logistic_Model import fit_all_wells, logistic
+
+
+def test_fit_recovers_parameters_and_flags_flat_wells():
+    time = np.linspace(0, 24, 49)
+    rng = np.random.default_rng(24)
+    wells = pd.DataFrame({
+        'A': logistic(time, 1.2, 0.6, 8.0) + rng.normal(0, 0.01, len(time)),
+        'B': logistic(time, 0.8, 0.4, 12.0) + rng.normal(0, 0.01, len(time)),
+        'Flat': np.full(len(time), 0.05),
+    })
+    fits = fit_all_wells(time, wells, n_workers=1).set_index('Strain')
+    np.testing.assert_allclose(fits.loc['A', ['K', 'r', 't0']].to_numpy(float), [1.2, 0.6, 8.0], rtol=0.05)
+    np.testing.assert_allclose(fits.loc['B', ['K', 'r', 't0']].to_numpy(float), [0.8, 0.4, 12.0], rtol=0.05)
+    assert fits.loc['A', 'Converged'] and fits.loc['B', 'Converged']
+    assert not fits.loc['Flat', 'Converged']
+    assert fits['Converged'].tolist() == fit_all_wells(time, wells, n_workers=2)['Converged'].tolist()
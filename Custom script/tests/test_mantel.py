@@ -0,0 +1,46 @@
+import itertools
+
+import numpy as np
+from scipy.spatial.distance import pdist, squareform
+from scipy.stats import pearsonr, spearmanr
+
+from mantel import mantel_test, partial_mantel_test
+
+
+def _distances(seed, n=6):
+    return squareform(pdist(np.random.default_rng(seed).normal(size=(n, 3))))
+
+
+def _upper(matrix):
+    return matrix[np.triu_indices(len(matrix), k=1)]
+
+
+def _exact_p(x, y, statistic):
+    # Reference: the full permutation distribution of a 6-strain matrix
+    observed = statistic(x, y)
+    permuted = [statistic(x[np.ix_(p, p)], y) for p in map(list, itertools.permutations(range(len(x))))]
+    return observed, np.mean(np.array(permuted) >= observed - 1e-12)
+
+
+def test_mantel_matches_exact_permutation_distribution():
+    x, y = _distances(8), _distances(9)
+    y = y + 0.5 * x
+    for method, correlation in [('pearson', pearsonr), ('spearman', spearmanr)]:
+        observed, exact_p = _exact_p(x, y, lambda a, b: correlation(_upper(a), _upper(b))[0])
+        r, p = mantel_test(x, y, n_permutations=4000, method=method, seed=1, n_workers=1)
+        np.testing.assert_allclose(r, observed, rtol=1e-9)
+        assert abs(p - exact_p) < 0.03
+
+
+def test_partial_mantel_statistic():
+    x, y, z = _distances(10), _distances(11), _distances(12)
+    r_xy, r_xz, r_yz = (pearsonr(_upper(a), _upper(b))[0] for a, b in [(x, y), (x, z), (y, z)])
+    expected = (r_xy - r_xz * r_yz) / np.sqrt((1 - r_xz ** 2) * (1 - r_yz ** 2))
+    r, p = partial_mantel_test(x, y, z, n_permutations=99, seed=1, n_workers=1)
+    np.testing.assert_allclose(r, expected, rtol=1e-9)
+    assert 0 < p <= 1
+
+
+def test_worker_count_does_not_change_p_value():
+    x, y = _distances(13, n=12), _distances(14, n=12)
+    assert mantel_test(x, y, 600, seed=3, n_workers=1) == mantel_test(x, y, 600, seed=3, n_workers=2)
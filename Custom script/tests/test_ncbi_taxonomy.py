@@ -0,0 +1,62 @@
+import numpy as np
+
+from ncbi_taxonomy import load_taxonomy, taxonomic_levels
+
+# taxid: (parent, rank, name)
+nodes = {
+    1: (1, 'no rank', 'root'),
+    10: (1, 'phylum', 'Bacillota'), 11: (1, 'phylum', 'Pseudomonadota'),
+    20: (10, 'class', 'Bacilli'), 21: (11, 'class', 'Gammaproteobacteria'),
+    30: (20, 'order', 'Lactobacillales'), 31: (20, 'order', 'Bacillales'), 32: (21, 'order', 'Enterobacterales'),
+    40: (30, 'family', 'Lactobacillaceae'), 41: (30, 'family', 'Streptococcaceae'), 42: (31, 'family', 'Bacillaceae'),
+    43: (32, 'family', 'Enterobacteriaceae'),
+    50: (40, 'genus', 'Lactiplantibacillus'), 51: (40, 'genus', 'Lacticaseibacillus'), 52: (41, 'genus', 'Streptococcus'),
+    53: (42, 'genus', 'Bacillus'), 54: (43, 'genus', 'Escherichia'), 55: (30, 'genus', 'Unplaced genus'),
+    1590: (50, 'species', 'Lactiplantibacillus plantarum'), 60: (50, 'species', 'Lactiplantibacillus pentosus'),
+    61: (51, 'species', 'Lacticaseibacillus casei'), 62: (52, 'species', 'Streptococcus thermophilus'),
+    63: (53, 'species', 'Bacillus subtilis'), 64: (54, 'species', 'Escherichia coli'), 65: (55, 'species', 'Unplaced species'),
+}
+
+
+def _write_taxdump(directory):
+    with open(directory / 'nodes.dmp', 'w') as f:
+        for taxid, (parent, rank, _) in nodes.items():
+            f.write(f"{taxid}\t|\t{parent}\t|\t{rank}\t|\tXX\t|\n")
+    with open(directory / 'names.dmp', 'w') as f:
+        for taxid, (_, _, name) in nodes.items():
+            f.write(f"{taxid}\t|\t{name}\t|\t\t|\tscientific name\t|\n")
+
+
+def _reference_level(taxid, reference=1590):
+    # Reference: compare the lineages rank by rank from the most inclusive level
+    def ranks(t):
+        lineage = {}
+        while t != 1:
+            lineage[nodes[t][1]] = t
+            t = nodes[t][0]
+        return lineage
+    if taxid == 0:
+        return None
+    own, other = ranks(taxid), ranks(reference)
+    gap = False
+    for level in reversed(taxonomic_levels):
+        rank = level.lower()
+        if rank not in own or rank not in other:
+            gap = True
+        elif own[rank] != other[rank]:
+            return None if gap else level
+        else:
+            gap = False
+    return None
+
+
+def test_divergence_level_matches_lineage_comparison(tmp_path):
+    _write_taxdump(tmp_path)
+    taxonomy = load_taxonomy(str(tmp_path))
+    names = [name for _, _, name in nodes.values()] + ['Unknown bacterium']
+    taxids = taxonomy.taxids(names)
+    np.testing.assert_array_equal(taxids, list(nodes) + [0])
+    levels = taxonomy.divergence_level(taxids)
+    assert levels.tolist() == [_reference_level(int(t)) for t in taxids]
+    assert levels[list(nodes).index(65)] is None  # Missing family between shared order and differing genus
+    assert load_taxonomy(str(tmp_path)).divergence_level(taxids).tolist() == levels.tolist()  # From the cache
@@ -0,0 +1,52 @@
+import numpy as np
+from ete3 import Tree
+
+from newick_tree import load_tree, parse_newick, ArrayTree
+from Phylogenetic_distance import patristic_distance_matrix
+
+
+def _random_newick(n_leaves, seed, negative=False):
+    rng = np.random.default_rng(seed)
+    nodes = [f'S{k}:{rng.uniform(0.01, 1):.4f}' for k in range(n_leaves)]
+    while len(nodes) > 1:
+        i, j = sorted(rng.choice(len(nodes), 2, replace=False))
+        length = rng.uniform(-0.2 if negative else 0.01, 1)
+        merged = f'({nodes[i]},{nodes[j]}):{length:.4f}'
+        nodes = [node for k, node in enumerate(nodes) if k not in (i, j)] + [merged]
+    return nodes[0] + ';'
+
+
+def _ete3_distances(newick):
+    tree = Tree(newick, format=1)
+    leaves = tree.get_leaves()
+    return [leaf.name for leaf in leaves], np.array([[a.get_distance(b) for b in leaves] for a in leaves])
+
+
+def test_patristic_distances_match_ete3():
+    for seed, negative in [(5, False), (6, True)]:
+        newick = _random_newick(40, seed, negative)
+        names, distances = patristic_distance_matrix(ArrayTree(*parse_newick(newick)))
+        expected_names, expected = _ete3_distances(newick)
+        assert names == expected_names
+        np.testing.assert_allclose(distances, expected, atol=1e-9)
+
+
+def test_parse_labels_comments_and_defaults():
+    parent, length, names = parse_newick("(('A b':0.1,B[&comment]:0.2)90:0.3,C);")
+    assert names.tolist() == ['', '90', 'A b', 'B', 'C']
+    np.testing.assert_array_equal(parent, [-1, 0, 1, 1, 0])
+    np.testing.assert_allclose(length, [0.0, 0.3, 0.1, 0.2, 1.0])
+
+
+def test_clade_and_cache(tmp_path):
+    path = tmp_path / 'tree.nwk'
+    path.write_text(_random_newick(20, 7))
+    tree = load_tree(str(path))
+    assert (tmp_path / 'tree.nwk.tree.npz').exists()
+    cached = load_tree(str(path))
+    np.testing.assert_array_equal(cached.parent, tree.parent)
+
+    clade = tree.clade(['S3', 'S11'])
+    reference = Tree(path.read_text(), format=1)
+    expected = reference.get_common_ancestor('S3', 'S11').get_leaf_names()
+    assert sorted(clade.leaf_names) == sorted(expected)
@@ -0,0 +1,30 @@
+import numpy as np
+
+from cog_index import cog_letters
+from pangenome_curves import accumulation_curves
+from presence_store import open_presence_store
+
+
+def test_curves_match_set_accumulation(presence_table):
+    path, table = presence_table
+    store = open_presence_store(path, 6)
+    n_permutations, seed = 6, 5
+    curves = accumulation_curves(store, 'COG', n_permutations, seed=seed, batch_size=4, n_workers=2)
+    assert curves.equals(accumulation_curves(store, 'COG', n_permutations, seed=seed, batch_size=4, n_workers=1))
+
+    # Reference: grow pan/core gene sets strain by strain in the same seeded orders
+    presence = table.iloc[:, 6:].notna().to_numpy().T
+    cogs = table['COG'].fillna('')
+    categories = {'Total': np.ones(len(table), dtype=bool)}
+    categories.update({letter: cogs.str.contains(letter, regex=False).to_numpy() for letter in cog_letters})
+    pan = {name: np.zeros(store.n_strains) for name in categories}
+    core = {name: np.zeros(store.n_strains) for name in categories}
+    for child in np.random.SeedSequence(seed).spawn(n_permutations):
+        order = np.random.default_rng(child).permutation(store.n_strains)
+        for name, mask in categories.items():
+            pan[name] += np.logical_or.accumulate(presence[order], axis=0)[:, mask].sum(axis=1)
+            core[name] += np.logical_and.accumulate(presence[order], axis=0)[:, mask].sum(axis=1)
+    for name in categories:
+        rows = curves[curves['Category'] == name]
+        np.testing.assert_allclose(rows['Pan Mean'], pan[name] / n_permutations)
+        np.testing.assert_allclose(rows['Core Mean'], core[name] / n_permutations)
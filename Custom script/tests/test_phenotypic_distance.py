@@ -0,0 +1,13 @@
+import numpy as np
+import pytest
+from scipy.spatial.distance import pdist, squareform
+
+from Phenotypic_distance import blocked_distance_matrix
+
+
+@pytest.mark.parametrize('metric, scipy_metric', [('cityblock', 'cityblock'), ('euclidean', 'euclidean'),
+                                                  ('standardized', 'seuclidean')])
+def test_blocked_matrix_matches_pdist(tmp_path, metric, scipy_metric):
+    values = np.random.default_rng(23).normal(size=(37, 3))
+    result = blocked_distance_matrix(values, str(tmp_path / 'distances.npy'), metric, block_size=8, n_workers=2)
+    np.testing.assert_allclose(result, squareform(pdist(values, scipy_metric)), rtol=1e-5, atol=1e-5)
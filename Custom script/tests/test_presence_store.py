@@ -0,0 +1,31 @@
+import pickle
+
+import numpy as np
+
+from presence_store import first_strain_column, open_presence_store, pack_words, popcount
+
+
+def test_store_matches_table(presence_table):
+    path, table = presence_table
+    store = open_presence_store(path, first_strain_column(path, after='Length'))
+    presence = table.iloc[:, 6:].notna().to_numpy().T
+    assert store.strains == table.columns[6:].tolist()
+    np.testing.assert_array_equal(store.strain_block(0, store.n_strains), presence)
+    np.testing.assert_array_equal(store.words(), pack_words(presence))
+    np.testing.assert_array_equal(store.column('Length'), table['Length'])
+    np.testing.assert_array_equal(store.metadata_frame()['COG'].fillna(''), table['COG'].fillna(''))
+
+
+def test_words_are_a_memory_map_and_reopen_after_pickling(presence_table):
+    path, _ = presence_table
+    store = open_presence_store(path, 6)
+    assert isinstance(store.words(), np.memmap)
+    reopened = pickle.loads(pickle.dumps(store))
+    assert isinstance(reopened.words(), np.memmap)
+    np.testing.assert_array_equal(reopened.words(), store.words())
+
+
+def test_popcount_matches_bin_count():
+    words = np.random.default_rng(2).integers(0, np.iinfo(np.int64).max, (5, 7), dtype=np.int64).view(np.uint64)
+    expected = np.vectorize(lambda w: bin(int(w)).count('1'))(words)
+    np.testing.assert_array_equal(popcount(words), expected)
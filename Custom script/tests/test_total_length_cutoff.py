@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from Total_length_cutoff import find_cutoff, permutation_cutoff_pvalue
+
+
+def _loop_find_cutoff(df, target_col, r_col, p_threshold=0.05):
+    # Reference: the original loop of find_cutoff
+    df_sorted = df.sort_values(target_col)
+    best_cutoff, best_p_value, best_r_direction = None, 1.0, None
+    for i in range(1, len(df_sorted) - 1):
+        cutoff_value = df_sorted[target_col].iloc[i]
+        group1 = df_sorted[df_sorted[target_col] < cutoff_value]
+        group2 = df_sorted[df_sorted[target_col] >= cutoff_value]
+        if len(group1) >= 2 and len(group2) >= 2:
+            p_value = stats.ttest_ind(group1[r_col], group2[r_col], equal_var=False).pvalue
+            if p_value < best_p_value:
+                best_p_value, best_cutoff = p_value, cutoff_value
+                best_r_direction = 1 if group2[r_col].mean() > group1[r_col].mean() else -1
+    if best_p_value < p_threshold:
+        return best_cutoff, best_p_value, best_r_direction
+    return None, None, None
+
+
+def _cutoff_table(seed):
+    rng = np.random.default_rng(seed)
+    target = np.round(rng.uniform(0, 10, 60), 1)  # Ties between target values
+    return pd.DataFrame({'distantly': target, 'r': 0.5 * (target > 6) + rng.normal(0, 0.2, 60)})
+
+
+def test_find_cutoff_matches_loop():
+    for seed in range(17, 22):
+        df = _cutoff_table(seed)
+        cutoff, p_value, direction = find_cutoff(df)
+        expected = _loop_find_cutoff(df, 'distantly', 'r')
+        assert (cutoff, direction) == (expected[0], expected[2])
+        np.testing.assert_allclose(p_value, expected[1], rtol=1e-9)
+
+
+def test_permutation_pvalue_is_reproducible():
+    df = _cutoff_table(17)
+    p = permutation_cutoff_pvalue(df, n_permutations=300, seed=2, batch_size=64, n_workers=2)
+    assert p == permutation_cutoff_pvalue(df, n_permutations=300, seed=2, batch_size=64, n_workers=1)
+    assert 1 / 301 <= p < 0.05
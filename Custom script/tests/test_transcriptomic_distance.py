@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial.distance import jensenshannon
+
+from Transcriptomic_distance import cog_expression, jensen_shannon_matrix
+
+
+def test_jensen_shannon_matches_scipy_on_shared_rows():
+    rng = np.random.default_rng(15)
+    expression = rng.gamma(2.0, 10.0, (30, 7))
+    expression[rng.random(expression.shape) < 0.2] = np.nan
+    distances = jensen_shannon_matrix(expression, n_workers=2)
+    for i in range(7):
+        for j in range(i + 1, 7):
+            pair = pd.DataFrame({'p': expression[:, i], 'q': expression[:, j]}).dropna()
+            np.testing.assert_allclose(distances[i, j], jensenshannon(pair['p'], pair['q'], base=2), atol=1e-12)
+    np.testing.assert_array_equal(distances, distances.T)
+
+
+def test_cog_expression_matches_gene_loop():
+    rng = np.random.default_rng(16)
+    n_genes = 50
+    table = pd.DataFrame({'Gene': range(n_genes), 'Name': 'x',
+                          'COG_category': rng.choice(np.array(['J', 'KL', 'CE', None, 'S'], dtype=object), n_genes)})
+    for sample in ['A', 'B', 'C']:
+        table[sample] = np.where(rng.random(n_genes) < 0.1, np.nan, rng.gamma(2.0, 10.0, n_genes))
+    chunks = [table.iloc[start:start + 16] for start in range(0, n_genes, 16)]
+    result = cog_expression(chunks)
+
+    # Reference: every gene adds TPM / number of letters to each of its COG letters
+    expected = {}
+    for _, row in table.dropna(subset=['COG_category']).iterrows():
+        for letter in row['COG_category']:
+            for sample in ['A', 'B', 'C']:
+                if not np.isnan(row[sample]):
+                    expected[letter, sample] = expected.get((letter, sample), 0) + row[sample] / len(row['COG_category'])
+    for (letter, sample), value in expected.items():
+        np.testing.assert_allclose(result.loc[letter, sample], value)
+    assert result.notna().sum().sum() == len(expected)